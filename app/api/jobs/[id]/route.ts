@@ -0,0 +1,32 @@
+import { type NextRequest, NextResponse } from "next/server"
+import { getJobQueue } from "@/lib/job-queue"
+
+export const dynamic = "force-dynamic"
+
+// Poll a job submitted with POST /api/run-task { wait: false }:
+// GET /api/jobs/<id> returns its status, queue position, latest progress event
+// and, once finished, the result or error. DELETE cancels it.
+export async function GET(_request: NextRequest, { params }: { params: Promise<{ id: string }> }) {
+  const { id } = await params
+  const queue = getJobQueue()
+  const job = queue.get(id)
+
+  if (!job) {
+    return NextResponse.json({ error: "Job not found" }, { status: 404 })
+  }
+
+  return NextResponse.json(queue.view(job))
+}
+
+export async function DELETE(_request: NextRequest, { params }: { params: Promise<{ id: string }> }) {
+  const { id } = await params
+  const queue = getJobQueue()
+  const job = queue.get(id)
+
+  if (!job) {
+    return NextResponse.json({ error: "Job not found" }, { status: 404 })
+  }
+
+  queue.cancel(id)
+  return NextResponse.json(queue.view(job))
+}
@@ -1,61 +1,84 @@
 import { type NextRequest, NextResponse } from "next/server"
-import { exec } from "child_process"
-import { promisify } from "util"
+import http from "http"
+import { getJobQueue, jobError, QueueFullError, queueFullResponse } from "@/lib/job-queue"
+import { streamJob } from "@/lib/job-stream"
+import { parseModelServerRequest } from "@/lib/model-server"
+import { isTaskName } from "@/lib/task-runner"
 
-const execAsync = promisify(exec)
+// When MODEL_SERVER_URL is set (e.g. http://127.0.0.1:8765), requests are forwarded
+// to the persistent Python worker in scripts/model_server.py instead of spawning a
+// cold Python process per call. Sockets are reused through a keep-alive pool.
+const MODEL_SERVER_URL = process.env.MODEL_SERVER_URL
+const modelServerAgent = new http.Agent({ keepAlive: true, maxSockets: 8 })
+// A call that has not completed by then is aborted and answered with 504. The first
+// evaluate of a task may train its model, so the default allows for that.
+const MODEL_SERVER_TIMEOUT_MS = Number(process.env.MODEL_SERVER_TIMEOUT_MS) || 10 * 60 * 1000
+
+class ModelServerTimeoutError extends Error {}
+
+// Without a model server, runs go through the job queue: a bounded worker pool per
+// task, a FIFO queue that answers 429 when full, and identical concurrent requests
+// sharing one run. `wait: false` returns a job ID to poll at /api/jobs/<id>.
 
 export async function POST(request: NextRequest) {
   try {
-    const { task } = await request.json()
+    const { task, operation = "run", params = {}, stream = false, wait = true } = await request.json()
 
-    if (!task || !["task1", "task2", "task3"].includes(task)) {
+    if (!isTaskName(task)) {
       return NextResponse.json({ error: "Invalid task specified" }, { status: 400 })
     }
 
-    const scriptPath = `scripts/${task}_${getScriptName(task)}.py`
+    if (MODEL_SERVER_URL) {
+      const checked = parseModelServerRequest(task, operation, params)
+      if (!checked.ok) {
+        return NextResponse.json({ error: "Invalid model server request", details: checked.error }, { status: 400 })
+      }
 
-    // Execute the Python script
-    const { stdout, stderr } = await execAsync(`python ${scriptPath}`)
+      const { status, body } = await callModelServer(`/${task}/${checked.operation}`, checked.params)
+      if (status !== 200) {
+        return NextResponse.json({ error: "Model server request failed", details: body }, { status })
+      }
 
-    if (stderr) {
-      console.error("Script error:", stderr)
-      return NextResponse.json({ error: "Script execution failed", details: stderr }, { status: 500 })
+      return NextResponse.json({
+        success: true,
+        output: JSON.stringify(body),
+        message: `${task} ${operation} completed successfully`,
+      })
     }
 
-    // Extract JSON results from the output
-    let jsonResults = null
-    const lines = stdout.split('\n')
-    let inJsonSection = false
-    let jsonLines: string[] = []
+    if (stream) {
+      return streamJob(task, request.signal, "ndjson")
+    }
 
-    for (const line of lines) {
-      if (line.includes('JSON RESULTS:')) {
-        inJsonSection = true
-        continue
-      }
-      if (inJsonSection && line.trim() === '') {
-        break
-      }
-      if (inJsonSection) {
-        jsonLines.push(line)
-      }
+    const queue = getJobQueue()
+    if (!wait) {
+      const { job, deduplicated } = queue.submit(task, { detached: true })
+      return NextResponse.json(
+        { ...queue.view(job), deduplicated },
+        { status: 202, headers: { Location: `/api/jobs/${job.id}` } },
+      )
     }
 
-    if (jsonLines.length > 0) {
-      try {
-        const jsonString = jsonLines.join('\n')
-        jsonResults = JSON.parse(jsonString)
-      } catch (parseError) {
-        console.error("Failed to parse JSON results:", parseError)
-      }
+    const job = await queue.submit(task, { signal: request.signal }).done
+
+    if (job.status !== "succeeded") {
+      console.error("Script error:", jobError(job))
+      return NextResponse.json({ error: "Script execution failed", details: jobError(job) }, { status: 500 })
     }
 
     return NextResponse.json({
       success: true,
-      output: jsonResults ? JSON.stringify(jsonResults) : stdout,
+      jobId: job.id,
+      output: JSON.stringify(job.outcome?.result),
       message: `${task} completed successfully`,
     })
   } catch (error) {
+    if (error instanceof QueueFullError) {
+      return queueFullResponse(error)
+    }
+    if (error instanceof ModelServerTimeoutError) {
+      return NextResponse.json({ error: "Model server timed out", details: error.message }, { status: 504 })
+    }
     console.error("API error:", error)
     return NextResponse.json({ 
       error: "Internal server error", 
@@ -64,15 +87,44 @@ export async function POST(request: NextRequest) {
   }
 }
 
-function getScriptName(task: string): string {
-  switch (task) {
-    case "task1":
-      return "iris_classification"
-    case "task2":
-      return "mnist_cnn"
-    case "task3":
-      return "nlp_spacy"
-    default:
-      return ""
-  }
+function callModelServer(path: string, payload: unknown): Promise<{ status: number; body: any }> {
+  const url = new URL(path, MODEL_SERVER_URL)
+  const data = JSON.stringify(payload)
+
+  return new Promise((resolve, reject) => {
+    const req = http.request(
+      url,
+      {
+        method: "POST",
+        agent: modelServerAgent,
+        headers: {
+          "Content-Type": "application/json",
+          "Content-Length": Buffer.byteLength(data),
+        },
+      },
+      (res) => {
+        const chunks: Buffer[] = []
+        res.on("data", (chunk) => chunks.push(chunk))
+        res.on("error", reject)
+        res.on("end", () => {
+          clearTimeout(timer)
+          try {
+            resolve({ status: res.statusCode ?? 500, body: JSON.parse(Buffer.concat(chunks).toString("utf-8")) })
+          } catch (parseError) {
+            reject(parseError)
+          }
+        })
+      },
+    )
+    // Reject first so the timeout, not the socket reset it causes, settles the promise
+    const timer = setTimeout(() => {
+      reject(new ModelServerTimeoutError(`No response from ${url.pathname} within ${MODEL_SERVER_TIMEOUT_MS} ms`))
+      req.destroy()
+    }, MODEL_SERVER_TIMEOUT_MS)
+    req.on("error", (error) => {
+      clearTimeout(timer)
+      reject(error)
+    })
+    req.end(data)
+  })
 }
@@ -0,0 +1,22 @@
+import { type NextRequest, NextResponse } from "next/server"
+import { streamJob } from "@/lib/job-stream"
+import { isTaskName } from "@/lib/task-runner"
+
+export const dynamic = "force-dynamic"
+
+// Server-Sent Events endpoint: GET /api/run-task/stream?task=task2
+//
+// Forwards the script's progress/batch/epoch/result/error events as they are
+// emitted. Runs go through the job queue, so a viewer opening the stream while an
+// identical run is in flight attaches to it. Closing the EventSource detaches;
+// once no viewer is left the Python process is terminated, so users can cancel
+// a long training run early.
+export async function GET(request: NextRequest) {
+  const task = request.nextUrl.searchParams.get("task")
+
+  if (!isTaskName(task)) {
+    return NextResponse.json({ error: "Invalid task specified" }, { status: 400 })
+  }
+
+  return streamJob(task, request.signal, "sse")
+}
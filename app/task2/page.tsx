@@ -1,6 +1,6 @@
 "use client"
 
-import { useState } from "react"
+import { useEffect, useRef, useState } from "react"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { Badge } from "@/components/ui/badge"
@@ -27,10 +27,25 @@ interface CNNResults {
   status: "completed" | "running" | "idle"
 }
 
+interface TrainingEvent {
+  epoch: number
+  epochs: number
+  batch?: number
+  loss: number
+  accuracy: number
+  val_loss?: number | null
+  val_accuracy?: number | null
+  samples_per_sec: number
+  learning_rate: number
+}
+
 export default function Task2Page() {
   const [results, setResults] = useState<CNNResults | null>(null)
   const [isRunning, setIsRunning] = useState(false)
   const [currentEpoch, setCurrentEpoch] = useState(0)
+  const [totalEpochs, setTotalEpochs] = useState(15)
+  const [liveMetrics, setLiveMetrics] = useState<TrainingEvent | null>(null)
+  const eventSourceRef = useRef<EventSource | null>(null)
 
   // Mock data for demonstration
   const mockResults: CNNResults = {
@@ -53,44 +68,53 @@ export default function Task2Page() {
     status: "completed",
   }
 
-  const runTask = async () => {
+  const stopTask = () => {
+    eventSourceRef.current?.close()
+    eventSourceRef.current = null
+    setIsRunning(false)
+  }
+
+  // Stop listening if the user navigates away mid-training
+  useEffect(() => () => eventSourceRef.current?.close(), [])
+
+  const runTask = () => {
+    eventSourceRef.current?.close()
     setIsRunning(true)
     setCurrentEpoch(0)
+    setLiveMetrics(null)
 
-    try {
-      const response = await fetch('/api/run-task', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ task: 'task2' }),
-      })
+    // Progress arrives as Server-Sent Events; closing the stream cancels the run
+    const source = new EventSource("/api/run-task/stream?task=task2")
+    eventSourceRef.current = source
+    let receivedResults = false
 
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`)
+    const onProgress = (message: MessageEvent) => {
+      const event = JSON.parse(message.data) as TrainingEvent
+      setTotalEpochs(event.epochs)
+      setLiveMetrics(event)
+      if (message.type === "epoch") {
+        setCurrentEpoch(event.epoch)
       }
+    }
 
-      const data = await response.json()
-      
-      if (data.success) {
-        // Parse the output from the Python script
-        try {
-          const scriptResults = JSON.parse(data.output)
-          setResults(scriptResults)
-        } catch (parseError) {
-          // If the output is not JSON, use mock data as fallback
-          setResults(mockResults)
-        }
-      } else {
-        throw new Error(data.error || 'Task execution failed')
+    source.addEventListener("batch", onProgress)
+    source.addEventListener("epoch", onProgress)
+    source.addEventListener("result", (message) => {
+      receivedResults = true
+      setResults(JSON.parse(message.data).data)
+    })
+    source.addEventListener("error", (message) => {
+      // Either a script "error" event or a broken connection. Never let the
+      // browser auto-reconnect, since that would start a new training run.
+      const data = message instanceof MessageEvent ? message.data : null
+      console.error("Error running task:", data ? JSON.parse(data).message : "connection lost")
+      if (!receivedResults) {
+        // Fallback to mock data if the run fails
+        setResults(mockResults)
       }
-    } catch (error) {
-      console.error('Error running task:', error)
-      // Fallback to mock data if API fails
-      setResults(mockResults)
-    } finally {
-      setIsRunning(false)
-    }
+      stopTask()
+    })
+    source.addEventListener("done", stopTask)
   }
 
   return (
@@ -196,29 +220,42 @@ export default function Task2Page() {
                   Train the convolutional neural network and achieve {">"} 95% accuracy
                 </p>
               </div>
-              <Button onClick={runTask} disabled={isRunning} className="min-w-[120px]">
-                {isRunning ? (
-                  <>
-                    <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-white mr-2"></div>
-                    Training...
-                  </>
-                ) : (
-                  <>
-                    <Play className="h-4 w-4 mr-2" />
-                    Start Training
-                  </>
+              <div className="flex gap-2">
+                {isRunning && (
+                  <Button variant="outline" onClick={stopTask}>
+                    Cancel
+                  </Button>
                 )}
-              </Button>
+                <Button onClick={runTask} disabled={isRunning} className="min-w-[120px]">
+                  {isRunning ? (
+                    <>
+                      <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-white mr-2"></div>
+                      Training...
+                    </>
+                  ) : (
+                    <>
+                      <Play className="h-4 w-4 mr-2" />
+                      Start Training
+                    </>
+                  )}
+                </Button>
+              </div>
             </div>
 
             {isRunning && (
               <div className="mt-4">
                 <div className="flex justify-between text-sm mb-2">
-                  <span>Epoch {currentEpoch}/10</span>
-                  <span>{((currentEpoch / 10) * 100).toFixed(0)}% Complete</span>
+                  <span>Epoch {currentEpoch}/{totalEpochs}</span>
+                  <span>{((currentEpoch / totalEpochs) * 100).toFixed(0)}% Complete</span>
                 </div>
-                <Progress value={(currentEpoch / 10) * 100} className="w-full" />
-                <p className="text-sm text-gray-600 mt-2">Training CNN model on MNIST dataset...</p>
+                <Progress value={(currentEpoch / totalEpochs) * 100} className="w-full" />
+                <p className="text-sm text-gray-600 mt-2">
+                  {liveMetrics
+                    ? `Epoch ${liveMetrics.epoch}${liveMetrics.batch ? `, batch ${liveMetrics.batch}` : ""} — ` +
+                      `loss ${liveMetrics.loss.toFixed(4)}, accuracy ${(liveMetrics.accuracy * 100).toFixed(2)}%, ` +
+                      `${Math.round(liveMetrics.samples_per_sec)} samples/sec, lr ${liveMetrics.learning_rate.toExponential(1)}`
+                    : "Training CNN model on MNIST dataset..."}
+                </p>
               </div>
             )}
           </CardContent>
@@ -0,0 +1,350 @@
+import { randomUUID } from "crypto"
+import { TASKS, runTask, type RunTaskOptions, type TaskEvent, type TaskName, type TaskOutcome } from "@/lib/task-runner"
+
+export type JobStatus = "queued" | "running" | "succeeded" | "failed" | "cancelled"
+
+// Anything with runTask's signature can execute jobs, e.g. an in-process stand-in
+export type JobRunner = (task: TaskName, options: RunTaskOptions) => Promise<TaskOutcome>
+
+export interface Job {
+  id: string
+  task: TaskName
+  args: string[]
+  key: string
+  status: JobStatus
+  createdAt: number
+  startedAt: number | null
+  finishedAt: number | null
+  outcome: TaskOutcome | null
+  // Recent events, replayed to callers that attach after the job started
+  events: TaskEvent[]
+  // Callers waiting on this job; a job nobody waits for any more is cancelled
+  waiters: number
+  // Submitted for polling: keep running even with no waiters attached
+  detached: boolean
+}
+
+export interface JobView {
+  id: string
+  task: TaskName
+  status: JobStatus
+  position: number | null
+  createdAt: number
+  startedAt: number | null
+  finishedAt: number | null
+  waiters: number
+  progress: TaskEvent | null
+  result: unknown | null
+  error: string | null
+}
+
+export interface JobQueueOptions {
+  runner?: JobRunner
+  // Jobs of one task type that may run at the same time
+  concurrency?: Partial<Record<TaskName, number>>
+  // Jobs of one task type that may wait; further submissions are rejected
+  maxQueued?: number
+  // How long finished jobs stay pollable
+  retainMs?: number
+  maxEventsKept?: number
+}
+
+export interface SubmitOptions {
+  args?: string[]
+  detached?: boolean
+  onEvent?: (event: TaskEvent) => void
+  signal?: AbortSignal
+}
+
+export interface Submission {
+  job: Job
+  // True when an identical queued or running job was joined instead of started
+  deduplicated: boolean
+  // Resolves when the job finishes; aborting `signal` only detaches this caller
+  done: Promise<Job>
+}
+
+// Training is CPU-bound and already uses every core, so task 2 runs alone by default
+const DEFAULT_CONCURRENCY: Record<TaskName, number> = { task1: 2, task2: 1, task3: 1 }
+const DEFAULT_MAX_QUEUED = 8
+const DEFAULT_RETAIN_MS = 10 * 60 * 1000
+const DEFAULT_MAX_EVENTS_KEPT = 200
+
+export class QueueFullError extends Error {
+  readonly task: TaskName
+  readonly retryAfterSeconds: number
+
+  constructor(task: TaskName, retryAfterSeconds: number) {
+    super(`Too many queued ${task} jobs; retry later`)
+    this.name = "QueueFullError"
+    this.task = task
+    this.retryAfterSeconds = retryAfterSeconds
+  }
+}
+
+export function queueFullResponse(error: QueueFullError): Response {
+  return Response.json(
+    { error: "Task queue is full", details: error.message, retryAfter: error.retryAfterSeconds },
+    { status: 429, headers: { "Retry-After": String(error.retryAfterSeconds) } },
+  )
+}
+
+function isFinished(status: JobStatus): boolean {
+  return status === "succeeded" || status === "failed" || status === "cancelled"
+}
+
+/**
+ * In-process scheduler for task runs.
+ *
+ * Each task type has its own worker pool and FIFO queue. Submitting a task
+ * with the same arguments as a queued or running job attaches to that job
+ * (single flight) instead of starting another run.
+ */
+export class JobQueue {
+  private readonly runner: JobRunner
+  private readonly concurrency: Record<TaskName, number>
+  private readonly maxQueued: number
+  private readonly retainMs: number
+  private readonly maxEventsKept: number
+
+  private readonly jobs = new Map<string, Job>()
+  private readonly inFlight = new Map<string, Job>()
+  private readonly queues = new Map<TaskName, Job[]>()
+  private readonly running = new Map<TaskName, number>()
+  private readonly listeners = new Map<string, Set<(event: TaskEvent) => void>>()
+  private readonly finished = new Map<string, Promise<Job>>()
+  private readonly resolvers = new Map<string, (job: Job) => void>()
+  private readonly controllers = new Map<string, AbortController>()
+
+  constructor(options: JobQueueOptions = {}) {
+    this.runner = options.runner ?? runTask
+    this.concurrency = { ...DEFAULT_CONCURRENCY, ...options.concurrency }
+    this.maxQueued = options.maxQueued ?? DEFAULT_MAX_QUEUED
+    this.retainMs = options.retainMs ?? DEFAULT_RETAIN_MS
+    this.maxEventsKept = options.maxEventsKept ?? DEFAULT_MAX_EVENTS_KEPT
+  }
+
+  submit(task: TaskName, options: SubmitOptions = {}): Submission {
+    const { args = [], detached = false, onEvent, signal } = options
+    this.prune()
+
+    const key = JSON.stringify([task, args])
+    const existing = this.inFlight.get(key)
+    const job = existing ?? this.enqueue(task, args, key, detached)
+    job.detached ||= detached
+
+    const done = this.attach(job, onEvent, signal)
+    this.drain(task)
+    return { job, deduplicated: existing !== undefined, done }
+  }
+
+  private enqueue(task: TaskName, args: string[], key: string, detached: boolean): Job {
+    const queue = this.queueFor(task)
+    if (queue.length >= this.maxQueued) {
+      throw new QueueFullError(task, this.estimateRetryAfter(task))
+    }
+    const job: Job = {
+      id: randomUUID(),
+      task,
+      args,
+      key,
+      status: "queued",
+      createdAt: Date.now(),
+      startedAt: null,
+      finishedAt: null,
+      outcome: null,
+      events: [],
+      waiters: 0,
+      detached,
+    }
+    this.jobs.set(job.id, job)
+    this.inFlight.set(key, job)
+    this.finished.set(job.id, new Promise((resolve) => this.resolvers.set(job.id, resolve)))
+    queue.push(job)
+    return job
+  }
+
+  get(id: string): Job | undefined {
+    this.prune()
+    return this.jobs.get(id)
+  }
+
+  view(job: Job): JobView {
+    const queue = this.queueFor(job.task)
+    const index = queue.indexOf(job)
+    const progress = [...job.events].reverse().find((event) => event.type === "progress") ?? null
+    return {
+      id: job.id,
+      task: job.task,
+      status: job.status,
+      position: index === -1 ? null : index + 1,
+      createdAt: job.createdAt,
+      startedAt: job.startedAt,
+      finishedAt: job.finishedAt,
+      waiters: job.waiters,
+      progress,
+      result: job.outcome?.result ?? null,
+      error: job.status === "failed" || job.status === "cancelled" ? jobError(job) : null,
+    }
+  }
+
+  cancel(id: string): boolean {
+    const job = this.jobs.get(id)
+    if (!job || isFinished(job.status)) return false
+    if (job.status === "queued") {
+      const queue = this.queueFor(job.task)
+      queue.splice(queue.indexOf(job), 1)
+      this.finish(job, { result: null, error: "Task was cancelled", exitCode: null, stderrTail: "" }, "cancelled")
+    } else {
+      // New identical submissions start a fresh run rather than join one being torn down
+      this.releaseKey(job)
+      this.controllers.get(id)?.abort()
+    }
+    return true
+  }
+
+  private attach(job: Job, onEvent?: (event: TaskEvent) => void, signal?: AbortSignal): Promise<Job> {
+    const done = this.finished.get(job.id)!
+    if (isFinished(job.status)) return done
+
+    job.waiters += 1
+    if (onEvent) {
+      job.events.forEach(onEvent)
+      this.listenersFor(job.id).add(onEvent)
+    }
+
+    let attached = true
+    const detach = () => {
+      if (!attached) return
+      attached = false
+      job.waiters -= 1
+      if (onEvent) this.listeners.get(job.id)?.delete(onEvent)
+      signal?.removeEventListener("abort", detach)
+      if (job.waiters === 0 && !job.detached) this.cancel(job.id)
+    }
+    if (signal?.aborted) {
+      detach()
+    } else {
+      signal?.addEventListener("abort", detach, { once: true })
+      done.then(detach)
+    }
+    return done
+  }
+
+  private drain(task: TaskName) {
+    const queue = this.queueFor(task)
+    while (queue.length > 0 && (this.running.get(task) ?? 0) < this.concurrency[task]) {
+      this.start(queue.shift()!)
+    }
+  }
+
+  private start(job: Job) {
+    const controller = new AbortController()
+    this.controllers.set(job.id, controller)
+    this.running.set(job.task, (this.running.get(job.task) ?? 0) + 1)
+    job.status = "running"
+    job.startedAt = Date.now()
+
+    const onEvent = (event: TaskEvent) => {
+      job.events.push(event)
+      if (job.events.length > this.maxEventsKept) job.events.shift()
+      this.listeners.get(job.id)?.forEach((listener) => listener(event))
+    }
+
+    Promise.resolve()
+      .then(() => this.runner(job.task, { args: job.args, signal: controller.signal, onEvent }))
+      .catch((error): TaskOutcome => ({ result: null, error: String(error), exitCode: null, stderrTail: "" }))
+      .then((outcome) => {
+        this.running.set(job.task, (this.running.get(job.task) ?? 1) - 1)
+        const status = controller.signal.aborted
+          ? "cancelled"
+          : outcome.error === null && outcome.result !== null
+            ? "succeeded"
+            : "failed"
+        this.finish(job, outcome, status)
+        this.drain(job.task)
+      })
+  }
+
+  private finish(job: Job, outcome: TaskOutcome, status: JobStatus) {
+    job.outcome = outcome
+    job.status = status
+    job.finishedAt = Date.now()
+    this.releaseKey(job)
+    this.controllers.delete(job.id)
+    this.listeners.delete(job.id)
+    this.resolvers.get(job.id)?.(job)
+    this.resolvers.delete(job.id)
+  }
+
+  private releaseKey(job: Job) {
+    if (this.inFlight.get(job.key) === job) this.inFlight.delete(job.key)
+  }
+
+  // Rough wait: queued runs ahead of this one, times the last run's duration, over the pool size
+  private estimateRetryAfter(task: TaskName): number {
+    let lastDurationMs = 30_000
+    for (const job of this.jobs.values()) {
+      if (job.task === task && job.startedAt && job.finishedAt) lastDurationMs = job.finishedAt - job.startedAt
+    }
+    const waves = Math.ceil(this.queueFor(task).length / this.concurrency[task])
+    return Math.max(1, Math.round((waves * lastDurationMs) / 1000))
+  }
+
+  private prune() {
+    const cutoff = Date.now() - this.retainMs
+    for (const [id, job] of this.jobs) {
+      if (job.finishedAt !== null && job.finishedAt < cutoff) {
+        this.jobs.delete(id)
+        this.finished.delete(id)
+      }
+    }
+  }
+
+  private queueFor(task: TaskName): Job[] {
+    let queue = this.queues.get(task)
+    if (!queue) {
+      queue = []
+      this.queues.set(task, queue)
+    }
+    return queue
+  }
+
+  private listenersFor(id: string): Set<(event: TaskEvent) => void> {
+    let listeners = this.listeners.get(id)
+    if (!listeners) {
+      listeners = new Set()
+      this.listeners.set(id, listeners)
+    }
+    return listeners
+  }
+}
+
+export function jobError(job: Job): string {
+  const outcome = job.outcome
+  if (!outcome) return "Job has not finished"
+  return (
+    outcome.error ??
+    (outcome.stderrTail || `Script exited with code ${outcome.exitCode} without a result`)
+  )
+}
+
+function envInt(name: string): number | undefined {
+  const value = Number.parseInt(process.env[name] ?? "", 10)
+  return Number.isFinite(value) && value > 0 ? value : undefined
+}
+
+// One queue per server process; kept on globalThis so dev-mode reloads don't fork it
+const globalForJobs = globalThis as unknown as { jobQueue?: JobQueue }
+
+export function getJobQueue(): JobQueue {
+  if (!globalForJobs.jobQueue) {
+    const concurrency: Partial<Record<TaskName, number>> = {}
+    for (const task of TASKS) {
+      const value = envInt(`JOB_CONCURRENCY_${task.toUpperCase()}`)
+      if (value) concurrency[task] = value
+    }
+    globalForJobs.jobQueue = new JobQueue({ concurrency, maxQueued: envInt("JOB_QUEUE_MAX") })
+  }
+  return globalForJobs.jobQueue
+}
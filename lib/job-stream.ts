@@ -0,0 +1,74 @@
+import { getJobQueue, jobError, QueueFullError, queueFullResponse, type Submission } from "@/lib/job-queue"
+import type { TaskEvent, TaskName } from "@/lib/task-runner"
+
+// Wire formats for a job's live events: newline-delimited JSON for fetch readers
+// (POST /api/run-task with `stream: true`) and Server-Sent Events for EventSource
+// (GET /api/run-task/stream). EventSource has no end-of-stream signal, so SSE ends
+// with an explicit "done" event.
+export type JobStreamFormat = "ndjson" | "sse"
+
+const FORMATS: Record<JobStreamFormat, { encode: (event: TaskEvent) => string; end: boolean; headers: HeadersInit }> = {
+  ndjson: {
+    encode: (event) => JSON.stringify(event) + "\n",
+    end: false,
+    headers: { "Content-Type": "application/x-ndjson", "Cache-Control": "no-cache" },
+  },
+  sse: {
+    encode: (event) => `event: ${event.type}\ndata: ${JSON.stringify(event)}\n\n`,
+    end: true,
+    headers: { "Content-Type": "text/event-stream", "Cache-Control": "no-cache, no-transform", Connection: "keep-alive" },
+  },
+}
+
+/**
+ * Submit a task to the job queue and stream its events as they are emitted.
+ *
+ * The first event names the job; events replayed when attaching to an identical
+ * run already in flight follow it. A run that fails without reporting an error
+ * event gets one from the job's outcome. Aborting `signal` detaches this viewer,
+ * and the run is cancelled once no viewer is left. A full queue is answered with
+ * a plain 429 before any streaming starts.
+ */
+export function streamJob(task: TaskName, signal: AbortSignal, format: JobStreamFormat): Response {
+  const { encode, end, headers } = FORMATS[format]
+  const encoder = new TextEncoder()
+  let controller: ReadableStreamDefaultController<Uint8Array> | null = null
+  // Events that arrive before the stream starts (e.g. replayed when joining a running job)
+  const backlog: TaskEvent[] = []
+  const send = (event: TaskEvent) => {
+    if (signal.aborted) return
+    if (controller) controller.enqueue(encoder.encode(encode(event)))
+    else backlog.push(event)
+  }
+  const now = () => Date.now() / 1000
+
+  let submission: Submission
+  try {
+    submission = getJobQueue().submit(task, { signal, onEvent: send })
+  } catch (error) {
+    if (error instanceof QueueFullError) return queueFullResponse(error)
+    throw error
+  }
+  const { job, done } = submission
+  backlog.unshift({ type: "job", time: now(), id: job.id, status: job.status })
+
+  const body = new ReadableStream<Uint8Array>({
+    start(streamController) {
+      controller = streamController
+      backlog.splice(0).forEach(send)
+      done
+        .then((finished) => {
+          if (finished.status !== "succeeded" && !finished.events.some((event) => event.type === "error")) {
+            send({ type: "error", time: now(), message: jobError(finished) })
+          }
+        })
+        .catch((error) => send({ type: "error", time: now(), message: String(error) }))
+        .finally(() => {
+          if (end) send({ type: "done", time: now() })
+          if (!signal.aborted) streamController.close()
+        })
+    },
+  })
+
+  return new Response(body, { headers })
+}
@@ -0,0 +1,113 @@
+import type { TaskName } from "@/lib/task-runner"
+
+// Requests the web app may forward to scripts/model_server.py. Training data paths,
+// explicit "train" calls, `retrain` and task 2 `epochs` (a different value makes the
+// server retrain the CNN) are deliberately absent: those are only available from the
+// Python CLI or a direct request to the server (model_server.py --task1-data / --warm).
+export type ModelServerOperation = "evaluate" | "predict" | "run"
+
+export const MODEL_SERVER_OPERATIONS: ModelServerOperation[] = ["evaluate", "predict", "run"]
+
+const MAX_FEATURE_ROWS = 1000
+const MAX_FEATURES = 64
+const MAX_IMAGES = 256
+const IMAGE_SIZE = 28
+const MAX_PIXEL = 255
+const MAX_REVIEWS = 100
+const MAX_REVIEW_CHARS = 5000
+
+export type ModelServerRequest =
+  | { ok: true; operation: ModelServerOperation; params: Record<string, unknown> }
+  | { ok: false; error: string }
+
+type Params = Record<string, unknown>
+type Validator = (params: Params) => Params | string
+
+function isNumberArray(value: unknown, maxLength: number): value is number[] {
+  return (
+    Array.isArray(value) &&
+    value.length > 0 &&
+    value.length <= maxLength &&
+    value.every((item) => typeof item === "number" && Number.isFinite(item))
+  )
+}
+
+// Images are raw 0-255 pixels; the server rejects anything outside that range
+function isImage(value: unknown): value is number[][] {
+  return (
+    Array.isArray(value) &&
+    value.length === IMAGE_SIZE &&
+    value.every(
+      (row) =>
+        isNumberArray(row, IMAGE_SIZE) &&
+        row.length === IMAGE_SIZE &&
+        row.every((pixel) => pixel >= 0 && pixel <= MAX_PIXEL),
+    )
+  )
+}
+
+const noParams: Validator = () => ({})
+
+const VALIDATORS: Record<TaskName, Record<ModelServerOperation, Validator>> = {
+  task1: {
+    evaluate: noParams,
+    run: noParams,
+    predict: ({ features }) => {
+      if (!Array.isArray(features) || features.length === 0 || features.length > MAX_FEATURE_ROWS) {
+        return `features must be a list of 1 to ${MAX_FEATURE_ROWS} rows`
+      }
+      if (!features.every((row) => isNumberArray(row, MAX_FEATURES))) {
+        return `each feature row must hold 1 to ${MAX_FEATURES} finite numbers`
+      }
+      return { features }
+    },
+  },
+  task2: {
+    evaluate: noParams,
+    run: noParams,
+    predict: ({ image, images }) => {
+      if (image !== undefined) {
+        return isImage(image) ? { image } : `image must be a ${IMAGE_SIZE}x${IMAGE_SIZE} array of 0-255 pixels`
+      }
+      if (!Array.isArray(images) || images.length === 0 || images.length > MAX_IMAGES) {
+        return `send one image or a list of 1 to ${MAX_IMAGES} images`
+      }
+      return images.every(isImage) ? { images } : `each image must be a ${IMAGE_SIZE}x${IMAGE_SIZE} array of 0-255 pixels`
+    },
+  },
+  task3: {
+    evaluate: noParams,
+    run: noParams,
+    predict: ({ reviews }) => {
+      if (reviews === undefined) return {}
+      if (
+        !Array.isArray(reviews) ||
+        reviews.length === 0 ||
+        reviews.length > MAX_REVIEWS ||
+        !reviews.every((review) => typeof review === "string" && review.length <= MAX_REVIEW_CHARS)
+      ) {
+        return `reviews must be a list of 1 to ${MAX_REVIEWS} strings of at most ${MAX_REVIEW_CHARS} characters`
+      }
+      return { reviews }
+    },
+  },
+}
+
+/**
+ * Check a browser request against the per-task whitelist.
+ *
+ * Only whitelisted parameters are copied into the forwarded payload, so
+ * anything else the client sends (file paths, `retrain`, ...) never reaches
+ * the model server.
+ */
+export function parseModelServerRequest(task: TaskName, operation: unknown, params: unknown): ModelServerRequest {
+  if (typeof operation !== "string" || !(MODEL_SERVER_OPERATIONS as string[]).includes(operation)) {
+    return { ok: false, error: `Invalid operation; expected one of ${MODEL_SERVER_OPERATIONS.join(", ")}` }
+  }
+  if (params === null || typeof params !== "object" || Array.isArray(params)) {
+    return { ok: false, error: "params must be an object" }
+  }
+  const checked = VALIDATORS[task][operation as ModelServerOperation](params as Params)
+  if (typeof checked === "string") return { ok: false, error: checked }
+  return { ok: true, operation: operation as ModelServerOperation, params: checked }
+}
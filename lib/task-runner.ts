@@ -0,0 +1,103 @@
+import { spawn, type ChildProcess } from "child_process"
+import readline from "readline"
+
+export type TaskName = "task1" | "task2" | "task3"
+
+export const TASKS: TaskName[] = ["task1", "task2", "task3"]
+
+// Newline-delimited JSON events written by scripts/events.py
+export interface TaskEvent {
+  type: "progress" | "result" | "error" | string
+  time: number
+  [key: string]: unknown
+}
+
+export interface TaskOutcome {
+  result: unknown | null
+  error: string | null
+  exitCode: number | null
+  stderrTail: string
+}
+
+export interface RunTaskOptions {
+  onEvent?: (event: TaskEvent) => void
+  signal?: AbortSignal
+  args?: string[]
+}
+
+// The event channel is the child's fd 3, so stdout/stderr only carry human logs
+const EVENTS_FD = 3
+const LOG_TAIL_BYTES = 8 * 1024
+
+export function isTaskName(task: unknown): task is TaskName {
+  return typeof task === "string" && (TASKS as string[]).includes(task)
+}
+
+export function getScriptPath(task: TaskName): string {
+  switch (task) {
+    case "task1":
+      return "scripts/task1_iris_classification.py"
+    case "task2":
+      return "scripts/task2_mnist_cnn.py"
+    case "task3":
+      return "scripts/task3_nlp_spacy.py"
+  }
+}
+
+function appendTail(tail: string, chunk: Buffer): string {
+  const next = tail + chunk.toString("utf-8")
+  return next.length > LOG_TAIL_BYTES ? next.slice(-LOG_TAIL_BYTES) : next
+}
+
+/**
+ * Run a task script headless and collect its structured events.
+ *
+ * Only the final result payload and a bounded tail of stderr are kept in
+ * memory; progress output, Keras progress bars, etc. are discarded as they
+ * stream past.
+ */
+export function runTask(task: TaskName, options: RunTaskOptions = {}): Promise<TaskOutcome> {
+  const { onEvent, signal, args = [] } = options
+
+  return new Promise((resolve, reject) => {
+    const child: ChildProcess = spawn("python", [getScriptPath(task), ...args], {
+      stdio: ["ignore", "pipe", "pipe", "pipe"],
+      env: { ...process.env, ML_HEADLESS: "1", ML_EVENTS_FD: String(EVENTS_FD) },
+    })
+
+    let result: unknown | null = null
+    let error: string | null = null
+    let stderrTail = ""
+
+    child.stdout?.resume()
+    child.stderr?.on("data", (chunk: Buffer) => {
+      stderrTail = appendTail(stderrTail, chunk)
+    })
+
+    const eventStream = child.stdio[EVENTS_FD] as NodeJS.ReadableStream
+    const lines = readline.createInterface({ input: eventStream, crlfDelay: Infinity })
+    lines.on("line", (line) => {
+      if (!line.trim()) return
+      let event: TaskEvent
+      try {
+        event = JSON.parse(line)
+      } catch {
+        console.error("Ignoring malformed task event:", line)
+        return
+      }
+      if (event.type === "result") result = event.data
+      if (event.type === "error") error = String(event.message)
+      onEvent?.(event)
+    })
+
+    const abort = () => child.kill("SIGTERM")
+    signal?.addEventListener("abort", abort, { once: true })
+
+    child.on("error", reject)
+    child.on("close", (exitCode) => {
+      signal?.removeEventListener("abort", abort)
+      if (signal?.aborted && error === null) error = "Task was cancelled"
+      resolve({ result, error, exitCode, stderrTail })
+    })
+  })
+}
@@ -0,0 +1,372 @@
+"""
+Pipeline Benchmark: Per-stage wall time, peak memory and throughput for the three tasks
+Drives each task's stage functions on synthetic inputs of growing size, one fresh process per run
+Goal: Keep a JSON history and flag stages that regress against a stored baseline
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from instrumentation import _round, peak_rss_mb
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), ".benchmarks")
+DEFAULT_HISTORY = os.path.join(BENCHMARK_DIR, "pipeline_history.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "pipeline_baseline.json")
+
+DEFAULT_SIZES = {
+    "task1": [10_000, 100_000, 1_000_000],
+    "task2": [2_000, 10_000, 30_000],
+    "task3": [1_000, 10_000, 50_000],
+}
+# A stage regresses when it is this much slower (or larger) than the baseline
+DEFAULT_TIME_TOLERANCE = 0.20
+DEFAULT_MEMORY_TOLERANCE = 0.20
+# Ignore differences below these floors; tiny stages are mostly noise
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA_MB = 16
+
+# Import time depends on the OS page cache and is not part of any pipeline, so
+# the "imports" stage is recorded but never flagged as a regression
+UNCHECKED_STAGES = {"imports"}
+
+
+class StageRecorder:
+    """Times named stages and records how much each one raised the process's peak RSS
+
+    ru_maxrss only ever grows, so the peak after a stage also covers every
+    earlier stage. The growth during the stage is what the stage itself added;
+    it is 0 when the stage stayed below an earlier peak and None where RSS is
+    unavailable.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name, items=None):
+        peak_before = peak_rss_mb()
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        peak_after = peak_rss_mb()
+        growth = None if peak_before is None or peak_after is None else peak_after - peak_before
+        self.stages.append({
+            "stage": name,
+            "seconds": round(seconds, 4),
+            "peak_rss_growth_mb": _round(growth, 1),
+            "items": items,
+            "items_per_sec": round(items / seconds, 1) if items and seconds > 0 else None,
+        })
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+def synthetic_table(path, rows, seed=0):
+    """Write an Iris-shaped CSV (4 features, 3 classes, ~1% missing) with `rows` rows"""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, 3, rows)
+    centers = np.array([[5.0, 3.4, 1.5, 0.2], [5.9, 2.8, 4.3, 1.3], [6.6, 3.0, 5.6, 2.0]])
+    X = centers[labels] + rng.normal(0, 0.4, (rows, 4))
+    X[rng.random(X.shape) < 0.01] = np.nan
+    df = pd.DataFrame(X.astype(np.float32), columns=["sepal length", "sepal width", "petal length", "petal width"])
+    df["species"] = np.array(["setosa", "versicolor", "virginica"])[labels]
+    df.to_csv(path, index=False)
+
+
+def mnist_shards(directory, train_size, test_size, seed=0):
+    """Write an MNIST-shaped store, subsampled from the real MNIST store when it exists
+
+    Returns "mnist" or "synthetic". Synthetic digits are noisy class-specific
+    templates, so the CNN still has something to learn offline.
+    """
+    import dataset_store
+    import task2_mnist_cnn as task2
+
+    rng = np.random.default_rng(seed)
+    splits = {}
+    try:
+        mnist = dataset_store.open_dataset(task2.DATA_DIR)
+        for name, size in (("train", train_size), ("test", test_size)):
+            split = mnist[name]
+            indices = np.sort(rng.choice(len(split), size=min(size, len(split)), replace=False))
+            splits[name] = (split.take(indices), split.labels()[indices])
+        source = "mnist"
+    except (OSError, KeyError, ValueError):
+        templates = rng.integers(0, 256, (10, 28, 28)).astype(np.int16)
+        for name, size in (("train", train_size), ("test", test_size)):
+            y = rng.integers(0, 10, size).astype(np.uint8)
+            x = templates[y] + rng.integers(-60, 61, (size, 28, 28))
+            splits[name] = (np.clip(x, 0, 255).astype(np.uint8), y)
+        source = "synthetic"
+    dataset_store.write_dataset(directory, splits, name=f"mnist-{source}", source=source)
+    return source
+
+
+# ---------------------------------------------------------------------------
+# Per-task stage drivers (run inside the worker process)
+# ---------------------------------------------------------------------------
+
+def run_task1(size, workdir, recorder):
+    import task1_iris_classification as task1
+
+    path = os.path.join(workdir, "table.csv")
+    synthetic_table(path, size)
+
+    with recorder.stage("imports"):
+        import sklearn.model_selection  # noqa: F401
+        import sklearn.tree  # noqa: F401
+    with recorder.stage("load_data", items=size):
+        data = task1.load_and_explore_data(path, "species")
+    with recorder.stage("preprocess", items=size):
+        X, y = task1.preprocess_data(data)
+    with recorder.stage("train", items=int(size * 0.7)):
+        model, X_train, X_test, y_train, y_test = task1.train_decision_tree(X, y)
+    with recorder.stage("evaluate", items=len(X_test)):
+        accuracy, precision, recall, cm, feature_importance = task1.evaluate_model(
+            model, X_test, y_test, data.target_names
+        )
+    with recorder.stage("plot"):
+        task1.visualize_results(cm, data.target_names)
+        task1.plotting.wait_for_plots()
+    return {"dataset": "synthetic"}
+
+
+def run_task2(size, workdir, recorder):
+    import task2_mnist_cnn as task2
+    from mnist_inference import MnistPredictor
+
+    test_size = max(size // 5, 500)
+    directory = os.path.join(workdir, "mnist")
+    dataset = mnist_shards(directory, size, test_size)
+
+    with recorder.stage("imports"):
+        import tensorflow  # noqa: F401
+    with recorder.stage("load_data", items=size + test_size):
+        train_split, test_split = task2.load_and_preprocess_data(directory)
+    with recorder.stage("build_model"):
+        model = task2.build_cnn_model()
+    with recorder.stage("train", items=size):
+        history = task2.train_model(model, train_split, test_split, epochs=1)
+    with recorder.stage("evaluate", items=test_size):
+        task2.evaluate_model(model, test_split)
+    images = test_split.take(np.arange(len(test_split)))
+    with recorder.stage("predict", items=len(images)):
+        MnistPredictor(model).predict(images)
+    with recorder.stage("plot"):
+        task2.visualize_predictions(model, test_split, num_samples=5)
+        task2.plot_training_history(history)
+        task2.plotting.wait_for_plots()
+    return {"dataset": dataset}
+
+
+def run_task3(size, workdir, recorder):
+    import task3_nlp_spacy as task3
+
+    df = task3.synthetic_reviews(size)
+
+    with recorder.stage("imports"):
+        import scipy.sparse  # noqa: F401
+        import spacy  # noqa: F401
+    with recorder.stage("load_model"):
+        nlp = task3.add_review_signals(task3.load_spacy_model())
+    with recorder.stage("process_reviews", items=size):
+        entities, brands, product_names = task3.process_reviews(nlp, df)
+    with recorder.stage("analyze", items=size):
+        sentiment_counts, brand_counter, product_counter = task3.analyze_results(
+            df, entities, brands, product_names
+        )
+    with recorder.stage("plot"):
+        task3.visualize_results(df, sentiment_counts, brand_counter)
+        task3.plotting.wait_for_plots()
+    return {"dataset": "synthetic"}
+
+
+TASK_RUNNERS = {"task1": run_task1, "task2": run_task2, "task3": run_task3}
+
+
+def run_worker(task, size, output):
+    """Run one task at one size in this process and write its stage records
+
+    Heavy libraries are imported in an explicit "imports" stage so that the
+    first real stage is not charged for them.
+    """
+    import plotting
+
+    recorder = StageRecorder()
+    with tempfile.TemporaryDirectory() as workdir:
+        plotting.configure(headless=True, plot_dir=os.path.join(workdir, "plots"))
+        baseline_rss = peak_rss_mb()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            info = TASK_RUNNERS[task](size, workdir, recorder)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"startup_rss_mb": _round(baseline_rss, 1), "stages": recorder.stages, **info}, f)
+
+
+# ---------------------------------------------------------------------------
+# Orchestration, history and regression checks
+# ---------------------------------------------------------------------------
+
+def measure(task, size, timeout=None):
+    """Run `task` at `size` in a fresh interpreter so peak RSS is not shared"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "result.json")
+        env = {**os.environ, "MODEL_CACHE_DISABLE": "1", "ML_HEADLESS": "1"}
+        env.pop("ML_EVENTS_FD", None)
+        env.pop("ML_EVENTS_FILE", None)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", task, "--size", str(size), "--output", output],
+            cwd=SCRIPTS_DIR, env=env, capture_output=True, text=True, timeout=timeout
+        )
+        if proc.returncode != 0 or not os.path.exists(output):
+            raise RuntimeError(f"{task} at size {size} failed:\n{proc.stderr[-2000:]}")
+        with open(output, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def stage_index(run):
+    """Map (task, size, stage) to its record"""
+    return {
+        (result["task"], result["size"], stage["stage"]): stage
+        for result in run["results"]
+        for stage in result["stages"]
+    }
+
+
+def find_regressions(run, baseline, time_tolerance, memory_tolerance):
+    """Stages slower or larger than the baseline beyond tolerance and noise floor
+
+    A metric missing on either side (no RSS on Windows, or a baseline from
+    before the metric existed) is not compared.
+    """
+    regressions = []
+    previous = stage_index(baseline)
+    for key, stage in stage_index(run).items():
+        before = previous.get(key)
+        if before is None or key[2] in UNCHECKED_STAGES:
+            continue
+        checks = (
+            ("seconds", time_tolerance, MIN_SECONDS_DELTA),
+            ("peak_rss_growth_mb", memory_tolerance, MIN_RSS_DELTA_MB),
+        )
+        for metric, tolerance, floor in checks:
+            old, new = before.get(metric), stage.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append({
+                    "task": key[0], "size": key[1], "stage": key[2], "metric": metric,
+                    "baseline": old, "current": new, "change": round(new / old - 1, 3) if old else None,
+                })
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every task stage on growing synthetic inputs")
+    parser.add_argument("--tasks", nargs="+", choices=sorted(TASK_RUNNERS), default=sorted(TASK_RUNNERS))
+    parser.add_argument("--sizes", type=int, nargs="+", help="Input sizes (default: per-task presets)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON file that runs are appended to")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON baseline to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    parser.add_argument("--timeout", type=float, help="Seconds allowed per (task, size) run")
+    parser.add_argument("--json", action="store_true", help="Print the run as JSON")
+    # Internal: run a single measurement in this process
+    parser.add_argument("--worker", choices=sorted(TASK_RUNNERS), help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args.size, args.output)
+        return 0
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": [],
+    }
+    for task in args.tasks:
+        for size in args.sizes or DEFAULT_SIZES[task]:
+            if not args.json:
+                print(f"Running {task} at size {size:,}...", flush=True)
+            result = measure(task, size, args.timeout)
+            run["results"].append({"task": task, "size": size, **result})
+
+    history = load_json(args.history, [])
+    history.append(run)
+    save_json(args.history, history)
+
+    baseline = load_json(args.baseline, None)
+    regressions = []
+    if baseline is not None:
+        regressions = find_regressions(run, baseline, args.time_tolerance, args.memory_tolerance)
+    run["regressions"] = regressions
+    if args.update_baseline or baseline is None:
+        save_json(args.baseline, run)
+
+    if args.json:
+        print(json.dumps(run, indent=2))
+    else:
+        print(f"\n{'Task':<7}{'Size':>10}  {'Stage':<14}{'Seconds':>10}{'Peak +RSS':>11}{'Items/s':>13}")
+        for result in run["results"]:
+            for stage in result["stages"]:
+                rate = f"{stage['items_per_sec']:,.0f}" if stage["items_per_sec"] else "-"
+                growth = stage.get("peak_rss_growth_mb")
+                rss = f"{growth:>9.0f}MB" if growth is not None else f"{'-':>11}"
+                print(f"{result['task']:<7}{result['size']:>10,}  {stage['stage']:<14}{stage['seconds']:>10.3f}"
+                      f"{rss}{rate:>13}")
+        print(f"\nHistory: {args.history} ({len(history)} runs)")
+        if baseline is None:
+            print(f"No baseline found; stored this run as {args.baseline}")
+        elif regressions:
+            print(f"\n✗ {len(regressions)} regression(s) against {args.baseline}:")
+            for r in regressions:
+                # A zero baseline has no relative change
+                change = "new" if r["change"] is None else f"{r['change']:+.0%}"
+                print(f"  {r['task']} size {r['size']:,} {r['stage']}: {r['metric']} "
+                      f"{r['baseline']} -> {r['current']} ({change})")
+        else:
+            print(f"✓ No regressions against {args.baseline}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
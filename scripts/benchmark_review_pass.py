@@ -0,0 +1,95 @@
+"""
+Review Pass Benchmark: Fused single-pass task 3 processing vs the separate passes
+Times NER + brand matching + lexicon sentiment as three passes and as one review_signals pass
+Goal: Show what tokenizing each review once saves on a large corpus
+"""
+
+import argparse
+import contextlib
+import gc
+import os
+import time
+
+import numpy as np
+
+
+def _timed(fn):
+    # Collect first so neither path pays for the other's garbage
+    gc.collect()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        value = fn()
+    return time.perf_counter() - start, value
+
+
+def benchmark(reviews=1_000_000, batch_size=1000):
+    """Run both paths over the same synthetic corpus and check they agree"""
+    import task3_nlp_spacy as task3
+
+    corpus = task3.synthetic_reviews(reviews)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        separate_nlp = task3.load_spacy_model()
+        fused_nlp = task3.add_review_signals(task3.load_spacy_model())
+    matcher = task3.BrandMatcher(separate_nlp)
+
+    separate = corpus.copy()
+    ner_seconds, (separate_entities, separate_brands, separate_products) = _timed(
+        lambda: task3.perform_named_entity_recognition(separate_nlp, separate, matcher)
+    )
+    sentiment_seconds, _ = _timed(lambda: task3.rule_based_sentiment_analysis(separate))
+
+    fused = corpus.copy()
+    fused_seconds, (fused_entities, fused_brands, fused_products) = _timed(
+        lambda: task3.process_reviews(fused_nlp, fused, batch_size=batch_size)
+    )
+
+    separate_seconds = ner_seconds + sentiment_seconds
+    identical = bool(
+        np.array_equal(separate['sentiment_score'].to_numpy(), fused['sentiment_score'].to_numpy())
+        and separate_brands.most_common() == fused_brands.most_common()
+        and separate_products.most_common() == fused_products.most_common()
+        and np.array_equal(separate_entities.review_offsets, fused_entities.review_offsets)
+    )
+    return {
+        "reviews": reviews,
+        "pipeline": list(separate_nlp.pipe_names),
+        "identical_outputs": identical,
+        "separate_passes": {
+            "ner_and_brands_seconds": round(ner_seconds, 2),
+            "sentiment_seconds": round(sentiment_seconds, 2),
+            "total_seconds": round(separate_seconds, 2),
+            "reviews_per_sec": round(reviews / separate_seconds),
+        },
+        "fused_pass": {
+            "total_seconds": round(fused_seconds, 2),
+            "reviews_per_sec": round(reviews / fused_seconds),
+        },
+        "speedup": round(separate_seconds / fused_seconds, 2),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fused task 3 review pass")
+    parser.add_argument("--reviews", type=int, default=1_000_000, help="Synthetic reviews in the corpus")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per nlp.pipe batch")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = benchmark(args.reviews, args.batch_size)
+
+    print("\n" + "=" * 30)
+    print("REVIEW PASS BENCHMARK")
+    print("=" * 30)
+    print(f"Pipeline: {results['pipeline'] or 'tokenizer only'}")
+    print(f"Identical outputs on {results['reviews']:,} reviews: {results['identical_outputs']}")
+    separate, fused = results["separate_passes"], results["fused_pass"]
+    print(f"Separate passes  {separate['total_seconds']:>8.2f}s  {separate['reviews_per_sec']:>10,} reviews/s"
+          f"  (NER + brands {separate['ner_and_brands_seconds']:.2f}s, sentiment {separate['sentiment_seconds']:.2f}s)")
+    print(f"Fused pass       {fused['total_seconds']:>8.2f}s  {fused['reviews_per_sec']:>10,} reviews/s")
+    print(f"Speedup: {results['speedup']}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Startup Benchmark: Cold import time budget for the task entry points
+Runs `python -X importtime` in fresh interpreters and checks each module's cumulative time
+Goal: Fail fast when a heavy dependency creeps back onto the import path
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cold-import budgets in milliseconds; heavy libraries must load lazily
+DEFAULT_BUDGETS_MS = {
+    "task1_iris_classification": 400,
+    "task2_mnist_cnn": 400,
+    "task3_nlp_spacy": 400,
+    "model_server": 1000,
+}
+
+
+def measure_import_ms(module):
+    """Cumulative import time of `module` in a fresh interpreter, in ms"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True
+    )
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000.0
+    raise RuntimeError(f"No importtime entry found for {module}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold-start import time against a budget")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (median is used)")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="Override a module budget, e.g. task2_mnist_cnn=300")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for override in args.budget:
+        module, _, ms = override.partition("=")
+        budgets[module] = float(ms)
+
+    results = []
+    for module, budget in budgets.items():
+        samples = [measure_import_ms(module) for _ in range(args.repeat)]
+        median = statistics.median(samples)
+        results.append({
+            "module": module,
+            "median_ms": round(median, 1),
+            "min_ms": round(min(samples), 1),
+            "budget_ms": budget,
+            "passed": median <= budget,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Module':<28}{'Median':>10}{'Min':>10}{'Budget':>10}")
+        for r in results:
+            status = "✓" if r["passed"] else "✗ OVER BUDGET"
+            print(f"{r['module']:<28}{r['median_ms']:>8.1f}ms{r['min_ms']:>8.1f}ms"
+                  f"{r['budget_ms']:>8.0f}ms  {status}")
+
+    return 0 if all(r["passed"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
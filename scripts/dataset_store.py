@@ -0,0 +1,426 @@
+"""
+Dataset Store: Uncompressed, memory-mappable image datasets with a checksummed manifest
+Materializes MNIST (or any local image dataset) once as uint8 .npy shards
+Goal: Open datasets zero-copy with np.load(mmap_mode='r'), fully offline after seeding
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+DATA_ROOT = os.environ.get(
+    "DATASET_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+)
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+SHARD_SIZE = 10000
+HASH_CHUNK_BYTES = 16 * 1024 * 1024
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff")
+# Keras keeps its downloads here; a cached mnist.npz lets us seed without network
+KERAS_MNIST_NPZ = os.path.join(os.path.expanduser("~"), ".keras", "datasets", "mnist.npz")
+
+
+class ShardedSplit:
+    """One dataset split stored as memory-mapped uint8 .npy shards"""
+
+    def __init__(self, x_shards, y_shards):
+        self.x_shards = x_shards
+        self.y_shards = y_shards
+        self.offsets = np.cumsum([0] + [len(y) for y in y_shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def image_shape(self):
+        return self.x_shards[0].shape[1:]
+
+    def labels(self):
+        """All labels as one in-memory array (small relative to the images)"""
+        return np.concatenate([np.asarray(y) for y in self.y_shards])
+
+    def take(self, indices):
+        """Gather uint8 images by global index without loading whole shards"""
+        indices = np.asarray(indices)
+        shard_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        return np.stack([
+            self.x_shards[shard][index - self.offsets[shard]]
+            for shard, index in zip(shard_ids, indices)
+        ])
+
+
+def _shard_names(split, index):
+    return f"{split}-x-{index:05d}.npy", f"{split}-y-{index:05d}.npy"
+
+
+def _check_uint8(array, what):
+    """Raise ValueError unless every value is a whole number in 0..255"""
+    array = np.asarray(array)
+    if array.dtype == np.uint8 or array.size == 0:
+        return
+    if not (np.issubdtype(array.dtype, np.integer) or np.issubdtype(array.dtype, np.floating)):
+        raise ValueError(f"{what} must be numeric, got dtype {array.dtype}")
+    low, high = array.min(), array.max()
+    if low < 0 or high > 255:
+        raise ValueError(f"{what} must lie in 0..255 to be stored as uint8, got {low}..{high}")
+    if np.issubdtype(array.dtype, np.floating) and not np.all(np.mod(array, 1) == 0):
+        raise ValueError(f"{what} must be whole numbers in 0..255; rescale 0-1 floats "
+                         f"with np.round(x * 255) before storing")
+
+
+def write_shards(x, y, directory, split, shard_size=SHARD_SIZE):
+    """Write a split as uint8 .npy shard files that can be memory-mapped
+
+    Images and labels are checked before anything is written: values that
+    are not whole numbers in 0..255 raise ValueError instead of wrapping.
+    """
+    if len(x) != len(y):
+        raise ValueError(f"{split}: {len(x)} images but {len(y)} labels")
+    _check_uint8(x, f"{split} images")
+    _check_uint8(y, f"{split} labels")
+    os.makedirs(directory, exist_ok=True)
+    for i, start in enumerate(range(0, len(x), shard_size)):
+        x_name, y_name = _shard_names(split, i)
+        np.save(os.path.join(directory, x_name),
+                np.ascontiguousarray(x[start:start + shard_size], dtype=np.uint8))
+        np.save(os.path.join(directory, y_name),
+                np.ascontiguousarray(y[start:start + shard_size], dtype=np.uint8))
+
+
+def load_shards(directory, split, names=None):
+    """Open every shard of a split with np.load(mmap_mode='r')"""
+    if names is None:
+        names = sorted(n for n in os.listdir(directory) if n.startswith(f"{split}-x-"))
+    x_shards = [np.load(os.path.join(directory, n), mmap_mode='r') for n in names]
+    y_shards = [np.load(os.path.join(directory, n.replace("-x-", "-y-")), mmap_mode='r') for n in names]
+    return ShardedSplit(x_shards, y_shards)
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def build_manifest(directory, name, source, class_names=None):
+    """Describe the shards already in `directory`, with a size and sha256 per file
+
+    open_dataset checks only the sizes by default; the hashes are compared
+    with open_dataset(verify=True) or `dataset_store.py verify`, so a
+    corrupted shard of the right size loads silently until then.
+    """
+    splits = {}
+    files = {}
+    for x_name in sorted(n for n in os.listdir(directory) if "-x-" in n and n.endswith(".npy")):
+        split = x_name.split("-x-")[0]
+        y_name = x_name.replace("-x-", "-y-")
+        x = np.load(os.path.join(directory, x_name), mmap_mode='r')
+        entry = splits.setdefault(split, {"count": 0, "image_shape": list(x.shape[1:]), "shards": []})
+        entry["count"] += len(x)
+        entry["shards"].append(x_name)
+        for file_name in (x_name, y_name):
+            path = os.path.join(directory, file_name)
+            files[file_name] = {"bytes": os.path.getsize(path), "sha256": file_sha256(path)}
+    if not splits:
+        raise ValueError(f"No .npy shards found in {directory}")
+    return {
+        "name": name,
+        "format_version": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": source,
+        "class_names": class_names,
+        "splits": splits,
+        "files": files,
+    }
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+class StoredDataset:
+    """A dataset directory opened through its manifest"""
+
+    def __init__(self, directory, manifest, splits):
+        self.directory = directory
+        self.manifest = manifest
+        self.splits = splits
+
+    def __getitem__(self, split):
+        return self.splits[split]
+
+    @property
+    def class_names(self):
+        return self.manifest.get("class_names")
+
+
+def open_dataset(directory, verify=False):
+    """Memory-map every split listed in the manifest
+
+    By default only file sizes are checked (cheap), which catches truncated
+    shards but not corrupted ones of the right size; `verify=True` also
+    re-hashes every shard against its recorded sha256.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported dataset format in {directory}: {manifest.get('format_version')}")
+
+    for file_name, expected in manifest["files"].items():
+        path = os.path.join(directory, file_name)
+        if not os.path.exists(path) or os.path.getsize(path) != expected["bytes"]:
+            raise ValueError(f"Dataset file {path} is missing or truncated; re-seed the store")
+        if verify and file_sha256(path) != expected["sha256"]:
+            raise ValueError(f"Checksum mismatch for {path}; re-seed the store")
+
+    splits = {
+        split: load_shards(directory, split, entry["shards"])
+        for split, entry in manifest["splits"].items()
+    }
+    return StoredDataset(directory, manifest, splits)
+
+
+def has_dataset(directory):
+    return os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+
+def write_dataset(directory, splits, name=None, source=None, class_names=None, shard_size=SHARD_SIZE):
+    """Materialize {split: (x, y)} into `directory` and return it opened
+
+    Shards and manifest are written to a sibling temp directory that replaces
+    `directory` only when complete, so an interrupted seed leaves no half-store.
+    """
+    staging = _staging_dir(directory)
+    try:
+        for split, (x, y) in splits.items():
+            write_shards(x, y, staging, split, shard_size)
+        _publish(staging, directory, name, source, class_names)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return open_dataset(directory)
+
+
+def _staging_dir(directory):
+    staging = f"{directory.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return staging
+
+
+def _publish(staging, directory, name, source, class_names):
+    """Write the manifest and move `staging` into place as `directory`
+
+    An existing store is renamed aside and deleted only after the new one is
+    in place, so readers never see a half-removed store. The swap is two
+    renames, not one atomic step: between them `directory` does not exist
+    and a concurrent open_dataset fails with FileNotFoundError. Re-seed a
+    store while nothing is reading it.
+    """
+    name = name or os.path.basename(directory.rstrip(os.sep))
+    _write_manifest(staging, build_manifest(staging, name, source, class_names))
+    retired = None
+    if os.path.exists(directory):
+        retired = f"{directory.rstrip(os.sep)}.old-{os.getpid()}"
+        shutil.rmtree(retired, ignore_errors=True)
+        os.replace(directory, retired)
+    try:
+        os.replace(staging, directory)
+    except BaseException:
+        if retired:
+            os.replace(retired, directory)
+        raise
+    if retired:
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def seed_from_npz(directory, path, name=None):
+    """Seed from a Keras-style .npz with x_train, y_train, x_test and y_test arrays"""
+    with np.load(path, allow_pickle=False) as arrays:
+        splits = {
+            split: (arrays[f"x_{split}"], arrays[f"y_{split}"])
+            for split in ("train", "test") if f"x_{split}" in arrays.files
+        }
+    if not splits:
+        raise ValueError(f"{path} has no x_train/y_train or x_test/y_test arrays")
+    return write_dataset(directory, splits, name=name, source=os.path.abspath(path))
+
+
+def _list_images(class_dir):
+    return sorted(
+        os.path.join(class_dir, n) for n in os.listdir(class_dir)
+        if n.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def _subdirs(path):
+    return sorted(n for n in os.listdir(path) if os.path.isdir(os.path.join(path, n)))
+
+
+def seed_from_image_dir(directory, path, name=None, image_size=None, mode="L",
+                        test_fraction=0.1, seed=0, shard_size=SHARD_SIZE):
+    """Seed from a folder of images laid out as [<split>/]<class>/<image>
+
+    With train/ and test/ subfolders each becomes a split; otherwise a
+    `test_fraction` of the images is held out as the test split. Images are
+    decoded one shard at a time (converted to `mode`, resized to `image_size`
+    as (width, height) when given), in a seeded shuffled order so each shard
+    mixes classes.
+    """
+    from PIL import Image
+
+    top = _subdirs(path)
+    if "train" in top:
+        layout = {split: os.path.join(path, split) for split in ("train", "test") if split in top}
+        class_names = sorted({c for split_dir in layout.values() for c in _subdirs(split_dir)})
+        files = {
+            split: [(f, class_names.index(c)) for c in _subdirs(split_dir)
+                    for f in _list_images(os.path.join(split_dir, c))]
+            for split, split_dir in layout.items()
+        }
+    else:
+        class_names = top
+        everything = [(f, label) for label, c in enumerate(class_names)
+                      for f in _list_images(os.path.join(path, c))]
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(everything))
+        n_test = int(round(len(everything) * test_fraction))
+        files = {"train": [everything[i] for i in order[n_test:]]}
+        if n_test:
+            files["test"] = [everything[i] for i in order[:n_test]]
+    if not class_names:
+        raise ValueError(f"No class folders found in {path}")
+    if len(class_names) > 256:
+        raise ValueError(f"{len(class_names)} classes do not fit uint8 labels")
+
+    def decode(file_path):
+        with Image.open(file_path) as image:
+            image = image.convert(mode)
+            if image_size:
+                image = image.resize(tuple(image_size))
+            return np.asarray(image, dtype=np.uint8)
+
+    rng = np.random.default_rng(seed)
+    staging = _staging_dir(directory)
+    try:
+        for split, entries in files.items():
+            if not entries:
+                continue
+            entries = [entries[i] for i in rng.permutation(len(entries))]
+            for i, start in enumerate(range(0, len(entries), shard_size)):
+                batch = entries[start:start + shard_size]
+                x = np.stack([decode(f) for f, _ in batch])
+                y = np.array([label for _, label in batch], dtype=np.uint8)
+                x_name, y_name = _shard_names(split, i)
+                np.save(os.path.join(staging, x_name), x)
+                np.save(os.path.join(staging, y_name), y)
+        _publish(staging, directory, name, os.path.abspath(path), class_names)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return open_dataset(directory)
+
+
+def seed(directory, source, **kwargs):
+    """Seed from a local .npz file or image directory"""
+    if os.path.isdir(source):
+        return seed_from_image_dir(directory, source, **kwargs)
+    return seed_from_npz(directory, source, name=kwargs.get("name"))
+
+
+def ensure_mnist(directory, source=None):
+    """Open the MNIST store, seeding it on first use
+
+    Seeds from `source`, $MNIST_NPZ or the Keras download cache when one of
+    them exists locally; only as a last resort is Keras asked to download.
+    """
+    if has_dataset(directory):
+        return open_dataset(directory)
+
+    source = source or os.environ.get("MNIST_NPZ")
+    if not source and os.path.exists(KERAS_MNIST_NPZ):
+        source = KERAS_MNIST_NPZ
+    if source:
+        print(f"Seeding MNIST store at {directory} from {source}...")
+        return seed_from_npz(directory, source, name="mnist")
+
+    print(f"Downloading MNIST into the store at {directory}...")
+    try:
+        from tensorflow import keras
+        (x_train, y_train), (x_test, y_test) = keras.datasets.mnist.load_data()
+    except Exception as error:
+        raise RuntimeError(
+            f"MNIST is not in the store at {directory} and could not be downloaded ({error}). "
+            f"Seed it offline with: python scripts/dataset_store.py seed mnist --source mnist.npz"
+        ) from error
+    return write_dataset(directory, {"train": (x_train, y_train), "test": (x_test, y_test)},
+                         name="mnist", source="keras.datasets.mnist")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the memory-mapped dataset store")
+    parser.add_argument("--root", default=DATA_ROOT, help=f"Store root directory (default: {DATA_ROOT})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Materialize a dataset from a local .npz or image folder")
+    seed_parser.add_argument("name", help="Dataset name (e.g. mnist)")
+    seed_parser.add_argument("--source", required=True, help="Keras-style .npz file or [<split>/]<class>/ image folder")
+    seed_parser.add_argument("--image-size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                             help="Resize images from a folder to this size")
+    seed_parser.add_argument("--mode", default="L", help="PIL mode for images from a folder (default: L)")
+    seed_parser.add_argument("--test-fraction", type=float, default=0.1,
+                             help="Held-out fraction when the folder has no train/test split")
+
+    verify_parser = commands.add_parser("verify", help="Re-hash every shard against the manifest")
+    verify_parser.add_argument("name")
+
+    commands.add_parser("list", help="List the datasets in the store")
+    return parser.parse_args(argv)
+
+
+def _describe(dataset):
+    splits = ", ".join(
+        f"{split}: {len(data):,} x {tuple(data.image_shape)}" for split, data in dataset.splits.items()
+    )
+    return f"{dataset.manifest['name']:<16}{splits}"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "seed":
+        directory = os.path.join(args.root, args.name)
+        kwargs = {"name": args.name}
+        if os.path.isdir(args.source):
+            kwargs.update(image_size=args.image_size, mode=args.mode, test_fraction=args.test_fraction)
+        dataset = seed(directory, args.source, **kwargs)
+        print(f"Seeded {directory}")
+        print(_describe(dataset))
+    elif args.command == "verify":
+        directory = os.path.join(args.root, args.name)
+        start = time.perf_counter()
+        dataset = open_dataset(directory, verify=True)
+        print(f"{len(dataset.manifest['files'])} files match their checksums "
+              f"({time.perf_counter() - start:.2f}s)")
+    else:
+        names = sorted(n for n in os.listdir(args.root) if has_dataset(os.path.join(args.root, n))) \
+            if os.path.isdir(args.root) else []
+        if not names:
+            print(f"No datasets in {args.root}")
+        for name in names:
+            print(_describe(open_dataset(os.path.join(args.root, name))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Entity Store: Columnar storage for named entities extracted from reviews
+Entities live in NumPy columns with categorical labels and a review_id offset index
+Goal: O(1) per-review lookups and a zero-copy (memory-mapped) on-disk form
+"""
+
+import json
+import os
+from collections import Counter
+
+import numpy as np
+
+META_FILE = "entities.json"
+COLUMNS = ("review_offsets", "label_codes", "start_char", "end_char", "text_offsets", "text_bytes")
+
+
+class EntityStore:
+    """Entities of reviews first_review_id .. first_review_id + n_reviews - 1
+
+    Entities are sorted by review, so the entities of review r occupy rows
+    review_offsets[i]:review_offsets[i + 1] with i = r - first_review_id.
+    Labels are int16 codes into `labels`, with their spaCy descriptions
+    resolved once per label. Entity texts are one UTF-8 buffer plus offsets,
+    Arrow style, so every column is a flat array that can be memory-mapped.
+    """
+
+    def __init__(self, review_offsets, label_codes, start_char, end_char, text_offsets, text_bytes,
+                 labels, descriptions, first_review_id=1):
+        self.review_offsets = review_offsets
+        self.label_codes = label_codes
+        self.start_char = start_char
+        self.end_char = end_char
+        self.text_offsets = text_offsets
+        self.text_bytes = text_bytes
+        self.labels = list(labels)
+        self.descriptions = list(descriptions)
+        self.first_review_id = first_review_id
+
+    def __len__(self):
+        return len(self.label_codes)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def n_reviews(self):
+        return len(self.review_offsets) - 1
+
+    def rows_for(self, review_id):
+        """Row range of one review's entities (empty for unknown ids)"""
+        i = review_id - self.first_review_id
+        if not 0 <= i < self.n_reviews:
+            return range(0)
+        return range(int(self.review_offsets[i]), int(self.review_offsets[i + 1]))
+
+    def text(self, row):
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return bytes(self.text_bytes[start:end]).decode("utf-8")
+
+    def texts(self):
+        return [self.text(row) for row in range(len(self))]
+
+    def entity(self, row):
+        code = self.label_codes[row]
+        return {
+            "text": self.text(row),
+            "label": self.labels[code],
+            "description": self.descriptions[code],
+            "start_char": int(self.start_char[row]),
+            "end_char": int(self.end_char[row]),
+        }
+
+    def entities_for(self, review_id):
+        """Entity dicts of one review"""
+        return [self.entity(row) for row in self.rows_for(review_id)]
+
+    def label_counts(self):
+        """Entity count per label, from one bincount over the label codes"""
+        counts = np.bincount(self.label_codes, minlength=len(self.labels))
+        return Counter({label: int(count) for label, count in zip(self.labels, counts) if count})
+
+    def text_counts(self):
+        return Counter(self.texts())
+
+    def to_frame(self):
+        """The entities as a DataFrame with a categorical label column"""
+        import pandas as pd
+
+        review_ids = np.repeat(
+            np.arange(self.first_review_id, self.first_review_id + self.n_reviews),
+            np.diff(self.review_offsets)
+        )
+        return pd.DataFrame({
+            "review_id": review_ids,
+            "text": self.texts(),
+            "label": pd.Categorical.from_codes(self.label_codes, self.labels),
+            "description": np.asarray(self.descriptions, dtype=object)[self.label_codes],
+            "start_char": self.start_char,
+            "end_char": self.end_char,
+        })
+
+    def save(self, directory):
+        """Write every column as an uncompressed .npy file plus a small JSON header"""
+        os.makedirs(directory, exist_ok=True)
+        for name in COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, META_FILE), "w") as f:
+            json.dump({"labels": self.labels, "descriptions": self.descriptions,
+                       "first_review_id": self.first_review_id}, f, indent=2)
+
+    @classmethod
+    def concat(cls, stores):
+        """Join stores of consecutive review ranges (e.g. per-shard results) into one
+
+        Label codes are remapped onto the union of the stores' labels.
+        """
+        stores = list(stores)
+        if not stores:
+            return EntityStoreBuilder().build()
+        for before, after in zip(stores, stores[1:]):
+            if after.first_review_id != before.first_review_id + before.n_reviews:
+                raise ValueError(f"Entity stores are not consecutive: reviews "
+                                 f"{before.first_review_id}+{before.n_reviews} then {after.first_review_id}")
+
+        label_index, descriptions = {}, []
+        review_offsets, label_codes, text_offsets = [], [], []
+        entity_base = text_base = 0
+        for store in stores:
+            for label, description in zip(store.labels, store.descriptions):
+                if label not in label_index:
+                    label_index[label] = len(label_index)
+                    descriptions.append(description)
+            remap = np.array([label_index[label] for label in store.labels], dtype=np.int16)
+            review_offsets.append(np.asarray(store.review_offsets[:-1]) + entity_base)
+            label_codes.append(remap[store.label_codes] if len(remap) else np.asarray(store.label_codes))
+            text_offsets.append(np.asarray(store.text_offsets[:-1]) + text_base)
+            entity_base += len(store)
+            text_base += int(store.text_offsets[-1])
+
+        return cls(
+            review_offsets=np.concatenate(review_offsets + [np.array([entity_base], dtype=np.int64)]),
+            label_codes=np.concatenate(label_codes).astype(np.int16),
+            start_char=np.concatenate([store.start_char for store in stores]).astype(np.int32),
+            end_char=np.concatenate([store.end_char for store in stores]).astype(np.int32),
+            text_offsets=np.concatenate(text_offsets + [np.array([text_base], dtype=np.int64)]),
+            text_bytes=np.concatenate([store.text_bytes for store in stores]).astype(np.uint8),
+            labels=list(label_index),
+            descriptions=descriptions,
+            first_review_id=stores[0].first_review_id
+        )
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Open a saved store; columns are memory-mapped unless mmap_mode is None"""
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                   for name in COLUMNS}
+        return cls(**columns, **meta)
+
+
+class EntityStoreBuilder:
+    """Accumulates entities review by review, then packs them into an EntityStore
+
+    `explain` maps a label to its description and is called once per distinct
+    label (e.g. spacy.explain).
+    """
+
+    def __init__(self, explain=None, first_review_id=1):
+        self.explain = explain
+        self.first_review_id = first_review_id
+        self.label_index = {}
+        self.review_offsets = [0]
+        self.label_codes = []
+        self.start_char = []
+        self.end_char = []
+        self.text_lengths = []
+        self.text_chunks = []
+
+    def add_review(self, entities):
+        """Append the next review's entities as (text, label, start_char, end_char) tuples"""
+        for text, label, start, end in entities:
+            encoded = text.encode("utf-8")
+            self.text_chunks.append(encoded)
+            self.text_lengths.append(len(encoded))
+            self.label_codes.append(self.label_index.setdefault(label, len(self.label_index)))
+            self.start_char.append(start)
+            self.end_char.append(end)
+        self.review_offsets.append(len(self.label_codes))
+
+    def add_doc(self, doc):
+        """Append the entities of a spaCy Doc as the next review"""
+        self.add_review((ent.text, ent.label_, ent.start_char, ent.end_char) for ent in doc.ents)
+
+    def build(self):
+        labels = list(self.label_index)
+        explain = self.explain or (lambda label: None)
+        text_offsets = np.zeros(len(self.text_lengths) + 1, dtype=np.int64)
+        np.cumsum(np.asarray(self.text_lengths, dtype=np.int64), out=text_offsets[1:])
+        return EntityStore(
+            review_offsets=np.asarray(self.review_offsets, dtype=np.int64),
+            label_codes=np.asarray(self.label_codes, dtype=np.int16),
+            start_char=np.asarray(self.start_char, dtype=np.int32),
+            end_char=np.asarray(self.end_char, dtype=np.int32),
+            text_offsets=text_offsets,
+            text_bytes=np.frombuffer(b"".join(self.text_chunks), dtype=np.uint8),
+            labels=labels,
+            descriptions=[explain(label) for label in labels],
+            first_review_id=self.first_review_id
+        )
@@ -0,0 +1,71 @@
+"""
+Events: Machine-readable result channel for the task scripts
+Writes newline-delimited JSON events (progress, result, error) to a dedicated channel
+Goal: Let callers parse results without scraping stdout for the "JSON RESULTS:" banner
+"""
+
+import json
+import os
+import time
+
+# File descriptor inherited from the parent process (e.g. fd 3 from Node's spawn)
+EVENTS_FD_ENV = "ML_EVENTS_FD"
+# Alternatively, a file that events are appended to
+EVENTS_FILE_ENV = "ML_EVENTS_FILE"
+
+_channel = None
+_channel_opened = False
+
+
+def _get_channel():
+    global _channel, _channel_opened
+    if not _channel_opened:
+        _channel_opened = True
+        fd = os.environ.get(EVENTS_FD_ENV)
+        path = os.environ.get(EVENTS_FILE_ENV)
+        if fd:
+            _channel = os.fdopen(int(fd), "w", buffering=1, encoding="utf-8", closefd=False)
+        elif path:
+            _channel = open(path, "a", buffering=1, encoding="utf-8")
+    return _channel
+
+
+def enabled():
+    """True when a structured event channel has been configured"""
+    return _get_channel() is not None
+
+
+def emit(event_type, **payload):
+    """Write one compact JSON event line to the channel, if configured"""
+    channel = _get_channel()
+    if channel is None:
+        return
+    event = {"type": event_type, "time": round(time.time(), 3), **payload}
+    channel.write(json.dumps(event, separators=(",", ":"), default=str) + "\n")
+    channel.flush()
+
+
+def progress(stage, step=None, total=None, **fields):
+    """Report that the script has reached a named stage"""
+    emit("progress", stage=stage, step=step, total=total, **fields)
+
+
+def result(results):
+    """Publish the final results
+
+    With a channel configured the results go out as a single "result" event.
+    Otherwise they are printed under the "JSON RESULTS:" banner for humans
+    running the script directly.
+    """
+    if enabled():
+        emit("result", data=results)
+    else:
+        print("\n" + "=" * 50)
+        print("JSON RESULTS:")
+        print("=" * 50)
+        print(json.dumps(results, indent=2))
+
+
+def error(exc):
+    """Publish a failure so callers do not have to infer it from stderr"""
+    emit("error", message=str(exc), error_type=type(exc).__name__)
@@ -0,0 +1,144 @@
+"""
+Instrumentation: Per-stage timing for the task scripts' main() workflows
+Records wall time, CPU time, memory and item throughput for each step, with optional cProfile capture
+Goal: Show where time goes, in the results JSON and on the event channel
+"""
+
+import contextlib
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
+
+import events
+
+PROFILE_STAGES_ENV = "ML_PROFILE_STAGES"
+DEFAULT_PROFILE_DIR = "stage_profiles"
+
+
+def current_rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable, else None)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None without the resource module)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _round(value, digits):
+    return None if value is None else round(value, digits)
+
+
+def add_arguments(parser):
+    """Add the shared --profile-stages flag to a script's argument parser"""
+    parser.add_argument("--profile-stages", nargs="?", metavar="DIR",
+                        const=DEFAULT_PROFILE_DIR, default=os.environ.get(PROFILE_STAGES_ENV),
+                        help=f"Capture a cProfile .prof file per stage in DIR (default: {DEFAULT_PROFILE_DIR})")
+
+
+class StageRecord:
+    """Measurements for one stage; `items` may be set inside the stage"""
+
+    def __init__(self, name, step, unit=None):
+        self.name = name
+        self.step = step
+        self.unit = unit
+        self.items = None
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "step": self.step,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "rss_delta_mb": _round(self.rss_delta_mb, 1),
+            "peak_rss_mb": _round(self.peak_rss_mb, 1),
+            "items": self.items,
+            "unit": self.unit,
+            "items_per_sec": round(self.items / self.wall_seconds, 1)
+                             if self.items and self.wall_seconds > 0 else None,
+            "profile": self.profile,
+            "failed": self.failed,
+        }
+
+
+class StageTimer:
+    """Wraps each step of a workflow and publishes its timings
+
+    Entering a stage emits the usual "progress" event (steps are numbered
+    automatically); leaving it emits a "stage" event with the measurements.
+    With `profile_dir` set, each stage runs under cProfile and its stats are
+    written to <profile_dir>/<script>-<NN>-<stage>.prof.
+    """
+
+    def __init__(self, total=None, profile_dir=None, script="task"):
+        self.total = total
+        self.profile_dir = profile_dir
+        self.script = script
+        self.records = []
+
+    @contextlib.contextmanager
+    def stage(self, name, unit=None):
+        record = StageRecord(name, len(self.records) + 1, unit)
+        events.progress(name, step=record.step, total=self.total)
+
+        profiler = None
+        if self.profile_dir:
+            import cProfile
+            profiler = cProfile.Profile()
+
+        rss_before = current_rss_mb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        record.failed = True
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+            record.failed = False
+        finally:
+            if profiler:
+                profiler.disable()
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            rss_after = current_rss_mb()
+            record.rss_delta_mb = None if rss_before is None or rss_after is None else rss_after - rss_before
+            record.peak_rss_mb = peak_rss_mb()
+            record.profile = self._save_profile(profiler, record) if profiler else None
+            self.records.append(record)
+            events.emit("stage", **record.as_dict())
+
+    def _save_profile(self, profiler, record):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{self.script}-{record.step:02d}-{record.name}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    def summary(self):
+        """JSON-serializable list of every stage's measurements"""
+        return [record.as_dict() for record in self.records]
+
+    def print_summary(self):
+        print("\nStage Timings:")
+        print(f"  {'Stage':<24}{'Wall':>9}{'CPU':>9}{'RSS Δ':>10}  Throughput")
+        for record in self.records:
+            data = record.as_dict()
+            rate = f"{data['items_per_sec']:,.0f} {record.unit or 'items'}/s" if data["items_per_sec"] else ""
+            rss = f"{data['rss_delta_mb']:>8.1f}MB" if data["rss_delta_mb"] is not None else f"{'-':>10}"
+            print(f"  {record.name:<24}{data['wall_seconds']:>8.3f}s{data['cpu_seconds']:>8.3f}s{rss}  {rate}")
+        if self.profile_dir:
+            print(f"  cProfile stats written to {self.profile_dir}/ (inspect with python -m pstats)")
+
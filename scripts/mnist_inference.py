@@ -0,0 +1,222 @@
+"""
+MNIST Inference: Batch and micro-batched prediction for the task 2 CNN
+Accepts raw 28x28 digit images (0-255 pixels) singly or in bulk
+Goal: Serve many concurrent predictions through one compiled forward pass
+"""
+
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+IMAGE_SHAPE = (28, 28)
+PIXEL_SCALE = 255.0
+MAX_BATCH_SIZE = 64
+
+
+def preprocess_images(images, scale=PIXEL_SCALE):
+    """Convert images to the float32 (n, 28, 28, 1) batch the CNN expects
+
+    Accepts a single image or a batch, as nested lists or arrays shaped
+    (28, 28), (784,), (n, 28, 28), (n, 784) or (n, 28, 28, 1). Pixels are
+    divided by `scale`: the default takes raw 0-255 values, pass 1.0 for
+    images that are already normalized to 0-1. Pixels outside [0, scale]
+    raise ValueError rather than being guessed at.
+    """
+    array = np.asarray(images)
+    if array.size % (IMAGE_SHAPE[0] * IMAGE_SHAPE[1]):
+        raise ValueError(f"Expected 28x28 images, got array of shape {array.shape}")
+    if array.size and (array.min() < 0 or array.max() > scale):
+        raise ValueError(f"Pixel values must lie in [0, {scale:g}]")
+
+    batch = array.reshape(-1, IMAGE_SHAPE[0], IMAGE_SHAPE[1], 1).astype(np.float32)
+    if scale != 1.0:
+        batch /= np.float32(scale)
+    return batch
+
+
+class MnistPredictor:
+    """Runs the CNN through a tf.function-compiled forward pass
+
+    The input signature fixes everything but the batch dimension, so the
+    graph is traced once and reused for every batch size.
+    """
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        self._forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec(shape=(None,) + IMAGE_SHAPE + (1,), dtype=tf.float32)]
+        )
+
+    @classmethod
+    def from_weights(cls, weights_path):
+        """Rebuild the task 2 architecture and load trained weights"""
+        import task2_mnist_cnn as task2
+
+        model = task2.build_cnn_model()
+        model.load_weights(weights_path)
+        return cls(model)
+
+    def predict_proba(self, images, scale=PIXEL_SCALE):
+        """Class probabilities, shape (n, 10)"""
+        return self._forward(preprocess_images(images, scale)).numpy()
+
+    def predict(self, images, scale=PIXEL_SCALE):
+        """Return (labels, confidences) for one or many images"""
+        probabilities = self.predict_proba(images, scale)
+        return np.argmax(probabilities, axis=1), np.max(probabilities, axis=1)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-image requests into micro-batches
+
+    A background thread waits for the first request, then keeps collecting
+    until `max_batch_size` requests are queued or `max_wait_ms` has passed,
+    and scores them all with one call to `predict_batch`. Images are queued
+    as raw 0-255 pixels, so `predict_batch` receives an unscaled batch.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=5.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        """Queue one image; the Future resolves to (label, confidence)"""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        array = np.asarray(image)
+        if array.size != IMAGE_SHAPE[0] * IMAGE_SHAPE[1]:
+            raise ValueError(f"submit takes exactly one 28x28 image, got array of shape {array.shape}")
+        # Check pixel values here so a bad image fails its own request, not the whole micro-batch
+        preprocess_images(array)
+        future = Future()
+        self._queue.put((array.reshape(IMAGE_SHAPE).astype(np.float32), future))
+        return future
+
+    def predict(self, image, timeout=None):
+        return self.submit(image).result(timeout)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            images = np.stack([image for image, _ in batch])
+            try:
+                labels, confidences = self.predict_batch(images)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), label, confidence in zip(batch, labels, confidences):
+                future.set_result((int(label), float(confidence)))
+
+
+def benchmark(model, images, concurrency=32, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=5.0):
+    """Compare per-call model.predict with micro-batched compiled inference
+
+    `images` are raw 0-255 pixels, as clients send them.
+    """
+    predictor = MnistPredictor(model)
+    images = np.asarray(images)
+    batch = preprocess_images(images)
+    n = len(batch)
+
+    # Warm up both paths so tracing is not timed
+    model.predict(batch[:1], verbose=0)
+    predictor.predict(images[:max_batch_size])
+
+    def timed(fn, items):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(fn, items))
+        return n / (time.perf_counter() - start)
+
+    baseline = timed(lambda image: model.predict(image[np.newaxis], verbose=0), batch)
+
+    batcher = MicroBatcher(predictor.predict, max_batch_size, max_wait_ms)
+    try:
+        batched = timed(batcher.predict, images)
+    finally:
+        batcher.close()
+
+    start = time.perf_counter()
+    predictor.predict(images)
+    bulk = n / (time.perf_counter() - start)
+
+    return {
+        "requests": n,
+        "concurrency": concurrency,
+        "per_call_predict_per_sec": round(baseline, 1),
+        "micro_batched_per_sec": round(batched, 1),
+        "bulk_compiled_per_sec": round(bulk, 1),
+        "speedup": round(batched / baseline, 1),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched MNIST CNN inference")
+    parser.add_argument("--weights", help="Trained weights (.weights.h5); random weights if omitted")
+    parser.add_argument("--requests", type=int, default=2000, help="Number of single-image requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent client threads")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import task2_mnist_cnn as task2
+
+    model = task2.build_cnn_model()
+    if args.weights:
+        model.load_weights(args.weights)
+
+    # Throughput does not depend on image content, so synthetic digits suffice
+    images = np.random.default_rng(0).integers(0, 256, size=(args.requests,) + IMAGE_SHAPE, dtype=np.uint8)
+    results = benchmark(model, images, args.concurrency, args.max_batch_size, args.max_wait_ms)
+
+    print("\nInference Benchmark:")
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
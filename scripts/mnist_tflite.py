@@ -0,0 +1,214 @@
+"""
+MNIST TFLite: Quantized export and interpreter backend for the task 2 CNN
+Converts the trained Keras model to .tflite with dynamic-range or full-int8 quantization
+Goal: Cheaper CPU inference with a measured size, speed and accuracy trade-off
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from mnist_inference import PIXEL_SCALE, MnistPredictor, preprocess_images
+
+QUANTIZATION_MODES = ("none", "dynamic", "int8")
+CALIBRATION_SAMPLES = 500
+DEFAULT_EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exports")
+
+
+def calibration_sample(train_split, num_samples=CALIBRATION_SAMPLES, seed=0):
+    """Random training images for int8 calibration, as a normalized float32 batch"""
+    rng = np.random.default_rng(seed)
+    indices = np.sort(rng.choice(len(train_split), size=min(num_samples, len(train_split)), replace=False))
+    return preprocess_images(train_split.take(indices))
+
+
+def export_tflite(model, output_path, quantization="dynamic", calibration_images=None):
+    """Convert a Keras model to a .tflite file and return its size in bytes
+
+    "dynamic" stores weights as int8 and keeps float activations; "int8"
+    quantizes activations too, using `calibration_images` to pick their
+    ranges, and takes raw uint8 pixels as input.
+    """
+    import tensorflow as tf
+
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode: {quantization}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantization != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "int8":
+        if calibration_images is None:
+            raise ValueError("int8 quantization needs calibration images")
+
+        def representative_dataset():
+            for image in calibration_images:
+                yield [image[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+
+    flatbuffer = converter.convert()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(flatbuffer)
+    return len(flatbuffer)
+
+
+class TFLitePredictor:
+    """Predictor backend that runs a .tflite file through the TFLite interpreter
+
+    Same interface as MnistPredictor, so it can sit behind a MicroBatcher.
+    The interpreter is not thread-safe, so calls are serialized. Its input is
+    resized only when a batch is larger than any before (or than `batch_size`,
+    allocated up front); smaller batches are zero-padded, so micro-batches of
+    varying size do not reallocate tensors on every flush.
+    """
+
+    def __init__(self, model_path, num_threads=None, batch_size=None):
+        import tensorflow as tf
+
+        self.model_path = model_path
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+        self.lock = threading.Lock()
+        if batch_size:
+            self._allocate(batch_size)
+
+    def _allocate(self, batch_size):
+        self.interpreter.resize_tensor_input(self.input["index"], (batch_size,) + tuple(self.input["shape"][1:]))
+        self.interpreter.allocate_tensors()
+        self.batch_size = batch_size
+
+    def _quantize(self, batch):
+        scale, zero_point = self.input["quantization"]
+        if not scale:
+            return batch.astype(self.input["dtype"], copy=False)
+        info = np.iinfo(self.input["dtype"])
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self.input["dtype"])
+
+    def _dequantize(self, output):
+        scale, zero_point = self.output["quantization"]
+        if not scale:
+            return output.astype(np.float32, copy=False)
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict_proba(self, images, scale=PIXEL_SCALE):
+        """Class probabilities, shape (n, 10)"""
+        batch = self._quantize(preprocess_images(images, scale))
+        n = batch.shape[0]
+        with self.lock:
+            if self.batch_size is None or n > self.batch_size:
+                self._allocate(n)
+            if n < self.batch_size:
+                padding = np.zeros((self.batch_size - n,) + batch.shape[1:], dtype=batch.dtype)
+                batch = np.concatenate([batch, padding])
+            self.interpreter.set_tensor(self.input["index"], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output["index"])[:n]
+        return self._dequantize(output)
+
+    def predict(self, images, scale=PIXEL_SCALE):
+        """Return (labels, confidences) for one or many images"""
+        probabilities = self.predict_proba(images, scale)
+        return np.argmax(probabilities, axis=1), np.max(probabilities, axis=1)
+
+
+def measure(predictor, images, labels, batch_size=256, latency_samples=200):
+    """Single-image latency, batched throughput and accuracy of one backend"""
+    predictor.predict(images[:1])
+    latencies = []
+    for image in images[:latency_samples]:
+        start = time.perf_counter()
+        predictor.predict(image)
+        latencies.append(time.perf_counter() - start)
+
+    predictor.predict(images[:batch_size])
+    predictions = []
+    start = time.perf_counter()
+    for offset in range(0, len(images), batch_size):
+        predictions.append(predictor.predict(images[offset:offset + batch_size])[0])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "throughput_per_sec": round(len(images) / elapsed, 1),
+        "accuracy": round(float(np.mean(np.concatenate(predictions) == labels)), 4),
+    }
+
+
+def benchmark(model, train_split, test_split, export_dir=DEFAULT_EXPORT_DIR, modes=QUANTIZATION_MODES,
+              weights_path=None):
+    """Export each quantization mode and compare it with the Keras model on the test split"""
+    images = test_split.take(np.arange(len(test_split)))
+    labels = test_split.labels()
+
+    if weights_path is None:
+        weights_path = os.path.join(export_dir, "mnist_cnn.weights.h5")
+        os.makedirs(export_dir, exist_ok=True)
+        model.save_weights(weights_path)
+    keras_row = {
+        "backend": "keras",
+        "size_bytes": os.path.getsize(weights_path),
+        **measure(MnistPredictor(model), images, labels)
+    }
+    rows = [keras_row]
+
+    calibration = calibration_sample(train_split) if "int8" in modes else None
+    for mode in modes:
+        path = os.path.join(export_dir, f"mnist_cnn_{mode}.tflite")
+        size = export_tflite(model, path, mode, calibration)
+        row = {"backend": f"tflite-{mode}", "size_bytes": size, **measure(TFLitePredictor(path), images, labels)}
+        row["accuracy_delta"] = round(row["accuracy"] - keras_row["accuracy"], 4)
+        rows.append(row)
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export the MNIST CNN to TFLite and benchmark it")
+    parser.add_argument("--weights", help="Trained weights (.weights.h5); trains via task 2 (cached) if omitted")
+    parser.add_argument("--export-dir", default=DEFAULT_EXPORT_DIR, help="Where .tflite files are written")
+    parser.add_argument("--modes", nargs="+", choices=QUANTIZATION_MODES, default=list(QUANTIZATION_MODES))
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import task2_mnist_cnn as task2
+    from model_cache import ModelCache
+
+    train_split, test_split = task2.load_and_preprocess_data()
+    model = task2.build_cnn_model()
+    if args.weights:
+        model.load_weights(args.weights)
+    else:
+        task2.train_model(model, train_split, test_split, epochs=15, cache=ModelCache.from_env())
+
+    rows = benchmark(model, train_split, test_split, args.export_dir, args.modes, args.weights)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"\n{'Backend':<16}{'Size':>10}{'p50':>10}{'p95':>10}{'Images/s':>12}{'Accuracy':>10}{'Delta':>9}")
+    for row in rows:
+        size = f"{row['size_bytes'] / 1024:.0f}KB"
+        delta = f"{row['accuracy_delta']:+.4f}" if "accuracy_delta" in row else "-"
+        print(f"{row['backend']:<16}{size:>10}{row['latency_p50_ms']:>8.2f}ms{row['latency_p95_ms']:>8.2f}ms"
+              f"{row['throughput_per_sec']:>12.0f}{row['accuracy']:>10.4f}{delta:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Model Cache: Content-addressed store for trained models
+Keys hash the dataset bytes, split parameters and model configuration
+Goal: Skip retraining when nothing that affects the fitted model has changed
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".model_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+METRICS_FILE = "metrics.json"
+HASH_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def _update_with_array(hasher, array):
+    """Feed an array-like (ndarray, memmap, DataFrame, Series) into a hash"""
+    columns = getattr(array, "columns", None)
+    if columns is not None:
+        hasher.update(json.dumps([str(c) for c in columns]).encode("utf-8"))
+    array = np.ascontiguousarray(np.asarray(array))
+    hasher.update(f"{array.dtype.str}{array.shape}".encode("utf-8"))
+    view = memoryview(array).cast("B")
+    for start in range(0, len(view), HASH_CHUNK_BYTES):
+        hasher.update(view[start:start + HASH_CHUNK_BYTES])
+
+
+def fingerprint(arrays, split_params, model_config):
+    """Return a hex digest identifying a (data, split, config) combination"""
+    hasher = hashlib.sha256()
+    for array in arrays:
+        _update_with_array(hasher, array)
+    hasher.update(json.dumps(split_params, sort_keys=True, default=str).encode("utf-8"))
+    hasher.update(json.dumps(model_config, sort_keys=True, default=str).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _directory_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
+
+
+class ModelCache:
+    """LRU-evicted directory of cached model artifacts and metrics
+
+    Each entry is a directory named by its fingerprint containing whatever
+    artifact files the caller saved plus a metrics.json. The entry directory's
+    mtime records the last access and drives eviction once the cache grows
+    past max_bytes.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        # Lookups and stores made through this instance, reported by summary()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from MODEL_CACHE_* variables, or None when disabled"""
+        if os.environ.get("MODEL_CACHE_DISABLE", "").lower() in ("1", "true", "yes"):
+            return None
+        root = os.environ.get("MODEL_CACHE_DIR", DEFAULT_CACHE_DIR)
+        max_mb = os.environ.get("MODEL_CACHE_MAX_MB")
+        max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+        return cls(root, max_bytes)
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """Return (entry_dir, metrics) for a cached key, or None on a miss"""
+        path = self.entry_path(key)
+        metrics_path = os.path.join(path, METRICS_FILE)
+        if not os.path.isfile(metrics_path):
+            self.misses += 1
+            return None
+        with open(metrics_path) as f:
+            metrics = json.load(f)
+        now = time.time()
+        os.utime(path, (now, now))
+        self.hits += 1
+        return path, metrics
+
+    def put(self, key, save_artifacts, metrics):
+        """Store an entry; save_artifacts(entry_dir) writes the model files
+
+        Entries are content-addressed, so when another process has already
+        stored `key` its entry is kept and the new one is discarded; an
+        existing entry is never removed while readers may be using it.
+        """
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=self.root)
+        path = self.entry_path(key)
+        try:
+            save_artifacts(tmp_dir)
+            with open(os.path.join(tmp_dir, METRICS_FILE), "w") as f:
+                json.dump(metrics, f)
+            if os.path.exists(path):
+                shutil.rmtree(tmp_dir)
+            else:
+                try:
+                    os.replace(tmp_dir, path)
+                except OSError:
+                    # Lost the race to a concurrent put of the same key
+                    if not os.path.exists(path):
+                        raise
+                    shutil.rmtree(tmp_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.stored += 1
+        self.evict(keep=key)
+        return path
+
+    def summary(self):
+        """What this run did with the cache, for the task results"""
+        if self.hits and not self.misses:
+            status = "hit"
+        elif self.misses and not self.hits:
+            status = "miss"
+        else:
+            status = "mixed" if self.hits else "unused"
+        return {"enabled": True, "status": status, "root": self.root,
+                "hits": self.hits, "misses": self.misses, "stored": self.stored}
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            entries.append((os.path.getmtime(path), _directory_size(path), name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= size
+        return total
+
+
+def cache_summary(cache):
+    """ModelCache.summary(), or a disabled marker when `cache` is None"""
+    return cache.summary() if cache is not None else {"enabled": False, "status": "disabled"}
+
+
+def describe_cache(cache):
+    """One line for the task output saying whether training ran or was reused"""
+    summary = cache_summary(cache)
+    if summary["status"] == "hit":
+        return f"Model cache: reused a cached model from {summary['root']} (training skipped)"
+    if summary["status"] == "miss":
+        return f"Model cache: no cached model; trained and stored it in {summary['root']}"
+    if summary["status"] == "disabled":
+        return "Model cache: disabled (MODEL_CACHE_DISABLE); trained from scratch"
+    return f"Model cache: {summary['hits']} hit(s), {summary['misses']} miss(es) in {summary['root']}"
@@ -0,0 +1,354 @@
+"""
+Model Server: Persistent worker for the three ML tasks
+Imports TensorFlow, spaCy and scikit-learn once and keeps fitted models warm
+Goal: Serve train, evaluate, predict and run operations over local HTTP
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import traceback
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import plotting
+import task1_iris_classification as task1
+import task2_mnist_cnn as task2
+import task3_nlp_spacy as task3
+from mnist_inference import MAX_BATCH_SIZE, MicroBatcher, MnistPredictor
+from mnist_tflite import DEFAULT_EXPORT_DIR, TFLitePredictor, export_tflite, calibration_sample
+from model_cache import ModelCache
+from tree_predictor import FlatTree
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Upper bound on epochs a request may ask for when task2 is (re)trained
+MAX_EPOCHS = 30
+
+
+class TaskError(Exception):
+    """Raised for client errors such as predicting before training (409)"""
+
+
+class InvalidParams(TaskError):
+    """Raised when a request's parameters are malformed (400)"""
+
+
+# Everything a fitted model is served from, published as one tuple so a reader
+# never sees the model of one training run with the names or predictor of another
+IrisState = namedtuple("IrisState", ["model", "flat_tree", "target_names", "split"])
+MnistState = namedtuple("MnistState", ["model", "history", "predictor", "epochs"])
+
+
+class IrisWorker:
+    """Keeps the fitted DecisionTreeClassifier and its data split in memory
+
+    The training table is fixed when the server starts (--task1-data); request
+    bodies cannot point the server at other files.
+    """
+
+    def __init__(self, cache=None, data_path=None, target=None):
+        self.lock = threading.Lock()
+        self.cache = cache
+        self.data_path = data_path
+        self.target = target
+        self.state = None
+
+    def train(self, params):
+        with self.lock:
+            data = task1.load_and_explore_data(self.data_path, self.target)
+            X, y = task1.preprocess_data(data)
+            model, X_train, X_test, y_train, y_test = task1.train_decision_tree(
+                X, y, cache=self.cache
+            )
+            # Predictions are served from flat node arrays, no DataFrame per request
+            self.state = IrisState(
+                model, FlatTree.from_sklearn(model), data.target_names, (X_train, X_test, y_train, y_test)
+            )
+        return {"train_size": int(len(X_train)), "test_size": int(len(X_test)), "status": "trained"}
+
+    def evaluate(self, params):
+        if self.state is None:
+            self.train(params)
+        state = self.state
+        _, X_test, _, y_test = state.split
+        accuracy, precision, recall, cm, feature_importance = task1.evaluate_model(
+            state.model, X_test, y_test, state.target_names
+        )
+        return task1.build_results(accuracy, precision, recall, cm, feature_importance)
+
+    def predict(self, params):
+        state = self.state
+        if state is None:
+            raise TaskError("task1 model is not trained yet")
+        try:
+            predictions = state.flat_tree.predict(np.asarray(params.get("features", []), dtype=np.float32))
+        except (TypeError, ValueError) as e:
+            raise InvalidParams(str(e))
+        return {
+            "predictions": [int(p) for p in predictions],
+            "species": [str(state.target_names[p]) for p in predictions],
+        }
+
+    def run(self, params):
+        if self.state is None or params.get("retrain"):
+            self.train(params)
+        return self.evaluate(params)
+
+
+class MnistWorker:
+    """Keeps the memory-mapped MNIST shards and the trained Keras CNN warm"""
+
+    def __init__(self, cache=None, backend="keras"):
+        self.lock = threading.Lock()
+        self.cache = cache
+        # "keras", or a TFLite quantization mode ("none", "dynamic", "int8")
+        self.backend = backend
+        self.train_split = None
+        self.test_split = None
+        self.state = None
+        # Concurrent single-image requests are coalesced into micro-batches; the
+        # batcher thread starts with the first such request, not at import
+        self.batcher = None
+        self.batcher_lock = threading.Lock()
+
+    def _ensure_data(self):
+        if self.train_split is None:
+            self.train_split, self.test_split = task2.load_and_preprocess_data()
+
+    def _get_batcher(self):
+        with self.batcher_lock:
+            if self.batcher is None:
+                self.batcher = MicroBatcher(self._predict_batch)
+            return self.batcher
+
+    def _predict_batch(self, images):
+        return self.state.predictor.predict(images)
+
+    def _make_predictor(self, model):
+        if self.backend == "keras":
+            return MnistPredictor(model)
+        path = os.path.join(DEFAULT_EXPORT_DIR, f"mnist_cnn_{self.backend}.tflite")
+        calibration = calibration_sample(self.train_split) if self.backend == "int8" else None
+        export_tflite(model, path, self.backend, calibration)
+        # Sized for a full micro-batch, so smaller flushes are padded rather than reallocated
+        return TFLitePredictor(path, batch_size=MAX_BATCH_SIZE)
+
+    @staticmethod
+    def _epochs(params):
+        epochs = params.get("epochs", 15)
+        if not isinstance(epochs, int) or isinstance(epochs, bool) or not 1 <= epochs <= MAX_EPOCHS:
+            raise InvalidParams(f"epochs must be an integer between 1 and {MAX_EPOCHS}")
+        return epochs
+
+    def _stale(self, params):
+        """True when there is no model yet or the request asks for a different number of epochs"""
+        state = self.state
+        return state is None or ("epochs" in params and self._epochs(params) != state.epochs)
+
+    def _train(self, epochs):
+        """Train and publish a new model; the caller holds self.lock"""
+        self._ensure_data()
+        model = task2.build_cnn_model()
+        history = task2.train_model(
+            model,
+            self.train_split,
+            self.test_split,
+            epochs=epochs,
+            cache=self.cache
+        )
+        self.state = MnistState(model, history.history, self._make_predictor(model), epochs)
+        return {"epochs_run": len(history.history["accuracy"]), "status": "trained"}
+
+    def train(self, params):
+        epochs = self._epochs(params)
+        with self.lock:
+            return self._train(epochs)
+
+    def evaluate(self, params):
+        with self.lock:
+            # Checked under the lock so concurrent requests for a stale model train it once
+            if self._stale(params):
+                self._train(self._epochs(params))
+            state = self.state
+            confusion, samples, test_accuracy, test_loss = task2.evaluate_model(
+                state.model, self.test_split
+            )
+        return task2.build_results(test_accuracy, test_loss, state.history, samples)
+
+    def predict(self, params):
+        """Score {"image": 28x28} via the micro-batcher or {"images": [...]} in bulk"""
+        state = self.state
+        if state is None:
+            raise TaskError("task2 model is not trained yet")
+        try:
+            if "image" in params:
+                label, confidence = self._get_batcher().predict(params["image"])
+                return {"predictions": [label], "confidence": [confidence]}
+            labels, confidences = state.predictor.predict(params.get("images", []))
+        except (TypeError, ValueError) as e:
+            raise InvalidParams(str(e))
+        return {
+            "predictions": [int(p) for p in labels],
+            "confidence": [float(p) for p in confidences],
+        }
+
+    def run(self, params):
+        if params.get("retrain"):
+            self.train(params)
+        return self.evaluate(params)
+
+
+class ReviewWorker:
+    """Keeps the spaCy pipeline loaded for NER and sentiment requests"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.nlp = None
+
+    def _ensure_model(self):
+        if self.nlp is None:
+            self.nlp = task3.add_review_signals(task3.load_spacy_model())
+
+    def train(self, params):
+        with self.lock:
+            self._ensure_model()
+        return {"pipeline": list(self.nlp.pipe_names), "status": "loaded"}
+
+    @staticmethod
+    def _reviews(params):
+        reviews = params.get("reviews")
+        if reviews is None:
+            return None
+        if not isinstance(reviews, list) or not reviews or not all(isinstance(r, str) for r in reviews):
+            raise InvalidParams("reviews must be a non-empty list of strings")
+        return reviews
+
+    def predict(self, params):
+        reviews = self._reviews(params)
+        with self.lock:
+            self._ensure_model()
+            if reviews:
+                df = pd.DataFrame({
+                    'review_id': range(1, len(reviews) + 1),
+                    'review_text': reviews
+                })
+            else:
+                df = task3.create_sample_dataset()
+            entities, brands, product_names = task3.process_reviews(self.nlp, df)
+            sentiment_counts, brand_counter, product_counter = task3.analyze_results(
+                df, entities, brands, product_names
+            )
+        return task3.build_results(df, entities, sentiment_counts, brand_counter, product_counter)
+
+    evaluate = predict
+    run = predict
+
+
+MODEL_CACHE = ModelCache.from_env()
+
+WORKERS = {
+    "task1": IrisWorker(MODEL_CACHE),
+    "task2": MnistWorker(MODEL_CACHE),
+    "task3": ReviewWorker(),
+}
+
+OPERATIONS = ("train", "evaluate", "predict", "run")
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    """Routes POST /<task>/<operation> to the matching warm worker"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "trained": {
+                    "task1": WORKERS["task1"].state is not None,
+                    "task2": WORKERS["task2"].state is not None,
+                    "task3": WORKERS["task3"].nlp is not None,
+                }
+            })
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] not in WORKERS or parts[1] not in OPERATIONS:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": "Invalid JSON body", "details": str(e)})
+            return
+
+        task, operation = parts
+        try:
+            result = getattr(WORKERS[task], operation)(params)
+            self._send_json(200, result)
+        except InvalidParams as e:
+            self._send_json(400, {"error": str(e)})
+        except TaskError as e:
+            self._send_json(409, {"error": str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            self._send_json(500, {"error": "Task execution failed", "details": str(e)})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent model server for the ML tasks")
+    parser.add_argument("--host", default=os.environ.get("MODEL_SERVER_HOST", DEFAULT_HOST))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MODEL_SERVER_PORT", DEFAULT_PORT)))
+    parser.add_argument("--warm", nargs="*", default=[], choices=sorted(WORKERS),
+                        help="Tasks to train/load before accepting requests")
+    parser.add_argument("--task1-data", help="CSV or Parquet table task1 trains on (default: the Iris dataset)")
+    parser.add_argument("--task1-target", help="Label column in --task1-data")
+    parser.add_argument("--plot-dir", help="Save figures as PNGs here (plots are skipped otherwise)")
+    parser.add_argument("--mnist-backend", default=os.environ.get("MNIST_BACKEND", "keras"),
+                        choices=["keras", "none", "dynamic", "int8"],
+                        help="Serve task2 predictions from Keras or a TFLite export with this quantization")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Start the model server and block until interrupted"""
+    args = parse_args(argv)
+    plotting.configure(headless=True, plot_dir=args.plot_dir)
+    WORKERS["task2"].backend = args.mnist_backend
+    WORKERS["task1"].data_path = args.task1_data
+    WORKERS["task1"].target = args.task1_target
+
+    for task in args.warm:
+        print(f"Warming {task}...")
+        WORKERS[task].train({})
+
+    server = ThreadingHTTPServer((args.host, args.port), ModelRequestHandler)
+    print(f"Model server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down model server...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Plotting: Shared figure handling for the task scripts
+Shows figures interactively, renders them to PNG in the background, or skips them
+Goal: Keep matplotlib/seaborn off the server-side path unless plots are wanted
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+HEADLESS_ENV = "ML_HEADLESS"
+PLOT_DIR_ENV = "ML_PLOT_DIR"
+
+_executor = None
+_pending = []
+
+
+def configure(headless=False, plot_dir=None):
+    """Apply --headless/--plot-dir flags; a plot directory implies headless"""
+    if headless or plot_dir:
+        os.environ[HEADLESS_ENV] = "1"
+    if plot_dir:
+        os.makedirs(plot_dir, exist_ok=True)
+        os.environ[PLOT_DIR_ENV] = plot_dir
+
+
+def is_headless():
+    return os.environ.get(HEADLESS_ENV, "").lower() in ("1", "true", "yes")
+
+
+def plot_dir():
+    return os.environ.get(PLOT_DIR_ENV) or None
+
+
+def enabled():
+    """True when figures should be built at all (shown or saved)"""
+    return not is_headless() or plot_dir() is not None
+
+
+def add_arguments(parser):
+    """Register the shared --headless and --plot-dir command line flags"""
+    parser.add_argument("--headless", action="store_true",
+                        help=f"Skip all plotting (or set {HEADLESS_ENV}=1)")
+    parser.add_argument("--plot-dir",
+                        help=f"Headless, but save figures as PNGs here (or set {PLOT_DIR_ENV})")
+
+
+def _save(name, draw, directory):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    draw(plt)
+    path = os.path.join(directory, f"{name}.png")
+    plt.savefig(path, dpi=100)
+    plt.close("all")
+    return path
+
+
+def render(name, draw):
+    """Build a figure with draw(plt) and show it, or save it to the plot dir
+
+    In headless mode with a plot directory the figure is rendered with the
+    Agg backend on a single background thread, so the caller can continue
+    with the next step. draw must only use data it does not mutate later.
+    Returns False when plotting is disabled.
+    """
+    global _executor
+
+    if not is_headless():
+        import matplotlib.pyplot as plt
+
+        draw(plt)
+        plt.show()
+        return True
+
+    directory = plot_dir()
+    if directory is None:
+        return False
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plot")
+    _pending.append(_executor.submit(_save, name, draw, directory))
+    return True
+
+
+def wait_for_plots():
+    """Block until background renders finish and return the saved paths"""
+    paths = [future.result() for future in _pending]
+    _pending.clear()
+    return paths
@@ -0,0 +1,102 @@
+"""
+Streaming Metrics: Incremental confusion matrix for batched evaluation
+Every classification metric is derived from one matrix updated batch by batch
+Goal: Evaluate large test sets in a single pass without keeping all predictions
+"""
+
+import numpy as np
+
+
+class ConfusionMatrix:
+    """Confusion matrix accumulated with np.bincount, one batch at a time
+
+    Rows are true classes and columns predicted classes (the
+    sklearn.metrics.confusion_matrix layout). Metrics follow sklearn's
+    definitions with zero_division=0; like sklearn without `labels=`, the
+    macro average covers only classes that occur as a true or predicted label.
+    """
+
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+        self.matrix = np.zeros((n_classes, n_classes), dtype=np.int64)
+
+    def update(self, y_true, y_pred):
+        """Add a batch of integer labels and predictions"""
+        y_true = np.asarray(y_true, dtype=np.int64).ravel()
+        y_pred = np.asarray(y_pred, dtype=np.int64).ravel()
+        self.matrix += np.bincount(
+            y_true * self.n_classes + y_pred, minlength=self.n_classes ** 2
+        ).reshape(self.n_classes, self.n_classes)
+        return self
+
+    def merge(self, other):
+        """Combine with a matrix accumulated elsewhere (e.g. another worker)"""
+        self.matrix += other.matrix
+        return self
+
+    @property
+    def total(self):
+        return int(self.matrix.sum())
+
+    @property
+    def support(self):
+        return self.matrix.sum(axis=1)
+
+    def accuracy(self):
+        return float(np.trace(self.matrix) / self.total) if self.total else 0.0
+
+    @staticmethod
+    def _ratio(numerator, denominator):
+        return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+    def precision_per_class(self):
+        return self._ratio(np.diag(self.matrix).astype(np.float64), self.matrix.sum(axis=0))
+
+    def recall_per_class(self):
+        return self._ratio(np.diag(self.matrix).astype(np.float64), self.support)
+
+    def f1_per_class(self):
+        precision, recall = self.precision_per_class(), self.recall_per_class()
+        return self._ratio(2 * precision * recall, precision + recall)
+
+    @property
+    def present(self):
+        """Mask of classes seen as a true or a predicted label"""
+        return (self.matrix.sum(axis=0) + self.matrix.sum(axis=1)) > 0
+
+    def _average(self, values, average):
+        if average == "macro":
+            present = self.present
+            return float(values[present].mean()) if present.any() else 0.0
+        if average == "weighted":
+            return float(np.average(values, weights=self.support)) if self.total else 0.0
+        raise ValueError(f"Unknown average: {average}")
+
+    def precision(self, average="weighted"):
+        return self._average(self.precision_per_class(), average)
+
+    def recall(self, average="weighted"):
+        return self._average(self.recall_per_class(), average)
+
+    def f1(self, average="weighted"):
+        return self._average(self.f1_per_class(), average)
+
+    def report(self, target_names=None, digits=2):
+        """Text report in the layout of sklearn.metrics.classification_report"""
+        names = [str(n) for n in target_names] if target_names is not None else [str(i) for i in range(self.n_classes)]
+        width = max(len(name) for name in names + ["weighted avg"])
+        headers = ["precision", "recall", "f1-score", "support"]
+
+        lines = [" " * width + " " + "".join(f" {h:>9}" for h in headers), ""]
+        rows = zip(names, self.precision_per_class(), self.recall_per_class(), self.f1_per_class(), self.support)
+        for name, precision, recall, f1, support in rows:
+            lines.append(f"{name:>{width}} " + "".join(f" {v:>9.{digits}f}" for v in (precision, recall, f1))
+                         + f" {support:>9}")
+        lines.append("")
+        lines.append(f"{'accuracy':>{width}} " + f" {'':>9}" * 2 + f" {self.accuracy():>9.{digits}f}"
+                     + f" {self.total:>9}")
+        for average in ("macro", "weighted"):
+            values = (self.precision(average), self.recall(average), self.f1(average))
+            lines.append(f"{average + ' avg':>{width}} " + "".join(f" {v:>9.{digits}f}" for v in values)
+                         + f" {self.total:>9}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,231 @@
+"""
+Tabular Data: Chunked loader for tabular classification files (CSV or Parquet)
+Reads features as float32 and labels as categorical codes, one chunk at a time
+Goal: Let the task 1 pipeline train on files far larger than pandas' default dtypes allow
+"""
+
+import os
+
+import numpy as np
+
+DEFAULT_CHUNKSIZE = 100_000
+MEDIAN_BINS = 4096
+
+
+class TabularData:
+    """Features as one float32 matrix plus integer label codes"""
+
+    def __init__(self, X, y, feature_names, target_names, missing_counts):
+        self.X = X
+        self.y = y
+        self.feature_names = list(feature_names)
+        self.target_names = np.asarray(target_names)
+        self.missing_counts = missing_counts
+
+    def __len__(self):
+        return len(self.y)
+
+    def row_blocks(self, block_rows=DEFAULT_CHUNKSIZE):
+        """Yield row slices (views) of the feature matrix"""
+        for start in range(0, len(self.X), block_rows):
+            yield self.X[start:start + block_rows]
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet files requires pyarrow: pip install pyarrow")
+    return pq
+
+
+def _read_schema(path, sample_rows):
+    """Column names and the subset that holds numbers (CSV types are inferred from a sample)"""
+    if _is_parquet(path):
+        import pyarrow as pa
+        schema = _parquet().ParquetFile(path).schema_arrow
+        numeric = {
+            field.name for field in schema
+            if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or pa.types.is_boolean(field.type)
+        }
+        return schema.names, numeric
+    import pandas as pd
+    from pandas.api.types import is_numeric_dtype
+    sample = pd.read_csv(path, nrows=sample_rows)
+    return list(sample.columns), {column for column in sample.columns if is_numeric_dtype(sample[column])}
+
+
+def _count_rows(path, target, chunksize):
+    """Row count from the Parquet metadata, or from a pass over the CSV's target column"""
+    if _is_parquet(path):
+        return _parquet().ParquetFile(path).metadata.num_rows
+    import pandas as pd
+    return sum(len(chunk) for chunk in pd.read_csv(path, usecols=[target], chunksize=chunksize))
+
+
+def iter_chunks(path, feature_columns, target, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrame chunks of the feature columns and a categorical target"""
+    import pandas as pd
+
+    dtypes = {target: "category"}
+    columns = list(feature_columns) + [target]
+
+    if _is_parquet(path):
+        for batch in _parquet().ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas().astype(dtypes)
+    else:
+        yield from pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+
+def _copy_features(chunk, feature_columns, out):
+    """Cast each feature column of `chunk` into the float32 rows `out`"""
+    for i, column in enumerate(feature_columns):
+        try:
+            out[:, i] = chunk[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Feature column '{column}' is not numeric: {e}") from None
+
+
+def load_table(path, target, features=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Read a CSV/Parquet classification table chunk by chunk
+
+    The row count is taken first (Parquet metadata, or a pass over the CSV's
+    target column) so the features go straight into one preallocated float32
+    matrix. Only one chunk is ever held as a DataFrame, so the peak footprint
+    is about one float32 copy of the features plus one chunk.
+
+    Without `features`, every numeric column except the target is used and
+    other columns (strings, dates) are skipped. A selected column that cannot
+    be cast to float32 raises ValueError.
+    """
+    from pandas.api.types import union_categoricals
+
+    columns, numeric = _read_schema(path, chunksize)
+    if target not in columns:
+        raise ValueError(f"Target column '{target}' not found in {path}")
+    if features:
+        unknown = [c for c in features if c not in columns]
+        if unknown:
+            raise ValueError(f"Feature columns {unknown} not found in {path}")
+        feature_columns = list(features)
+    else:
+        feature_columns = [c for c in columns if c != target and c in numeric]
+    if not feature_columns:
+        raise ValueError(f"No numeric feature columns in {path}")
+
+    rows = _count_rows(path, target, chunksize)
+    X = np.empty((rows, len(feature_columns)), dtype=np.float32)
+    labels = []
+    missing = np.zeros(len(feature_columns), dtype=np.int64)
+    start = 0
+    for chunk in iter_chunks(path, feature_columns, target, chunksize):
+        stop = start + len(chunk)
+        if stop > rows:
+            raise ValueError(f"{path} changed while it was being read")
+        block = X[start:stop]
+        _copy_features(chunk, feature_columns, block)
+        missing += np.isnan(block).sum(axis=0)
+        labels.append(chunk[target].array)
+        start = stop
+        del chunk
+    if start != rows:
+        raise ValueError(f"{path} changed while it was being read")
+    if not labels:
+        raise ValueError(f"{path} has no rows")
+
+    # Chunks can see different label sets, so unify the categories before coding
+    categorical = union_categoricals(labels, sort_categories=True)
+    if categorical.isna().any():
+        raise ValueError(f"Target column '{target}' has missing labels")
+
+    return TabularData(
+        X,
+        categorical.codes.astype(np.int32),
+        feature_columns,
+        [str(c) for c in categorical.categories],
+        dict(zip(feature_columns, missing.tolist()))
+    )
+
+
+def chunked_nanmedian(make_chunks, n_columns, bins=MEDIAN_BINS):
+    """Exact per-column median ignoring NaNs, computed out of core
+
+    `make_chunks` returns a fresh iterator of (rows, n_columns) arrays and is
+    called three times: for the column ranges, for a histogram that locates
+    the median's bin, and to collect the few values inside that bin. Memory
+    use is O(bins * n_columns) plus the values in the median bins.
+    """
+    count = np.zeros(n_columns, dtype=np.int64)
+    low = np.full(n_columns, np.inf)
+    high = np.full(n_columns, -np.inf)
+    for chunk in make_chunks():
+        count += (~np.isnan(chunk)).sum(axis=0)
+        with np.errstate(invalid="ignore"):
+            low = np.fmin(low, np.nanmin(chunk, axis=0, initial=np.inf))
+            high = np.fmax(high, np.nanmax(chunk, axis=0, initial=-np.inf))
+
+    medians = np.full(n_columns, np.nan)
+    valid = count > 0
+    if not valid.any():
+        return medians
+    low = np.where(valid, low, 0.0)
+    width = np.where(high > low, high - low, 1.0)
+    offsets = np.arange(n_columns) * bins
+
+    def bin_index(chunk):
+        index = ((chunk - low) / width * bins).astype(np.int64)
+        return np.clip(index, 0, bins - 1) + offsets
+
+    histogram = np.zeros(n_columns * bins, dtype=np.int64)
+    for chunk in make_chunks():
+        finite = ~np.isnan(chunk)
+        with np.errstate(invalid="ignore"):
+            histogram += np.bincount(bin_index(np.where(finite, chunk, low))[finite],
+                                     minlength=n_columns * bins)
+    cumulative = histogram.reshape(n_columns, bins).cumsum(axis=1)
+
+    # Ranks of the one or two middle values, and the bins that contain them
+    lower_rank = (count - 1) // 2
+    upper_rank = count // 2
+    lower_bin = np.array([np.searchsorted(cumulative[c], lower_rank[c], side="right") for c in range(n_columns)])
+    upper_bin = np.array([np.searchsorted(cumulative[c], upper_rank[c], side="right") for c in range(n_columns)])
+
+    collected = [[] for _ in range(n_columns)]
+    for chunk in make_chunks():
+        bins_of = bin_index(np.where(np.isnan(chunk), low, chunk)) - offsets
+        for c in np.flatnonzero(valid):
+            values = chunk[:, c]
+            keep = ~np.isnan(values) & (bins_of[:, c] >= lower_bin[c]) & (bins_of[:, c] <= upper_bin[c])
+            if keep.any():
+                collected[c].append(values[keep])
+
+    for c in np.flatnonzero(valid):
+        values = np.sort(np.concatenate(collected[c]))
+        before = cumulative[c, lower_bin[c] - 1] if lower_bin[c] > 0 else 0
+        lower = values[lower_rank[c] - before]
+        upper = values[upper_rank[c] - before]
+        medians[c] = (float(lower) + float(upper)) / 2.0
+    return medians
+
+
+def fill_missing_with_medians(data, block_rows=DEFAULT_CHUNKSIZE):
+    """Median-fill NaNs in every feature column at once, in place
+
+    Returns the medians of the columns that had missing values.
+    """
+    columns = [i for i, name in enumerate(data.feature_names) if data.missing_counts[name]]
+    if not columns:
+        return {}
+
+    medians = chunked_nanmedian(lambda: (block[:, columns] for block in data.row_blocks(block_rows)), len(columns))
+    fill = np.zeros(data.X.shape[1], dtype=np.float32)
+    fill[columns] = medians
+    for block in data.row_blocks(block_rows):
+        np.copyto(block, fill, where=np.isnan(block))
+    for name in (data.feature_names[i] for i in columns):
+        data.missing_counts[name] = 0
+    return {data.feature_names[i]: float(m) for i, m in zip(columns, medians)}
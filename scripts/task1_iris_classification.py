@@ -4,180 +4,328 @@ Dataset: Iris Species Dataset
 Goal: Preprocess data, train decision tree classifier, evaluate performance
 """
 
+import argparse
 import numpy as np
-import pandas as pd
-import json
-from sklearn.datasets import load_iris
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, classification_report, confusion_matrix
-from sklearn.preprocessing import LabelEncoder
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
+import pickle
 
-def load_and_explore_data():
-    """Load the Iris dataset and explore its structure"""
+# pandas and scikit-learn are imported inside the functions that use them so
+# that importing this module (e.g. from the model server or --help) stays cheap
+import events
+import instrumentation
+import plotting
+from model_cache import ModelCache, cache_summary, describe_cache, fingerprint
+from streaming_metrics import ConfusionMatrix
+from tabular_data import DEFAULT_CHUNKSIZE, TabularData, fill_missing_with_medians, load_table
+
+MODEL_FILE = "decision_tree.pkl"
+EVAL_BATCH_SIZE = 100_000
+IRIS_FEATURE_NAMES = ['sepal length', 'sepal width', 'petal length', 'petal width']
+
+def load_and_explore_data(data_path=None, target=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Load the Iris dataset (or any CSV/Parquet classification table) and explore its structure"""
     print("=" * 50)
     print("TASK 1: IRIS SPECIES CLASSIFICATION")
     print("=" * 50)
     
-    # Load the iris dataset
-    iris = load_iris()
+    import pandas as pd
     
-    # Create a DataFrame for easier manipulation
-    df = pd.DataFrame(data=iris.data, columns=iris.feature_names)
-    df['species'] = iris.target
-    df['species_name'] = df['species'].map({0: 'setosa', 1: 'versicolor', 2: 'virginica'})
+    if data_path is None:
+        from sklearn.datasets import load_iris
+        
+        # Load the iris dataset
+        iris = load_iris()
+        data = TabularData(
+            iris.data.astype(np.float32),
+            iris.target.astype(np.int32),
+            IRIS_FEATURE_NAMES,
+            iris.target_names,
+            {name: 0 for name in IRIS_FEATURE_NAMES}
+        )
+    else:
+        # Stream the file in chunks with float32 features and categorical labels
+        print(f"Reading {data_path} in chunks of {chunksize} rows...")
+        data = load_table(data_path, target, chunksize=chunksize)
     
     print("Dataset Overview:")
-    print(f"Shape: {df.shape}")
-    print(f"Features: {list(iris.feature_names)}")
-    print(f"Target classes: {list(iris.target_names)}")
+    print(f"Shape: {data.X.shape[0]} rows x {data.X.shape[1]} features ({data.X.nbytes / 1e6:.1f} MB as float32)")
+    print(f"Features: {data.feature_names}")
+    print(f"Target classes: {[str(name) for name in data.target_names]}")
     print("\nFirst 5 rows:")
-    print(df.head())
-    
-    print("\nDataset Info:")
-    print(df.info())
+    head = pd.DataFrame(data.X[:5], columns=data.feature_names)
+    head['target'] = data.target_names[data.y[:5]]
+    print(head)
     
+    # Column statistics straight from the float32 matrix (no object-dtype frame)
     print("\nBasic Statistics:")
-    print(df.describe())
+    with np.errstate(invalid='ignore'):
+        print(pd.DataFrame({
+            'mean': np.nanmean(data.X, axis=0, dtype=np.float64),
+            'min': np.nanmin(data.X, axis=0),
+            'max': np.nanmax(data.X, axis=0),
+        }, index=data.feature_names))
     
-    return df, iris
+    return data
 
-def preprocess_data(df):
+def preprocess_data(data):
     """Preprocess the data - handle missing values and encode labels"""
     print("\n" + "=" * 30)
     print("DATA PREPROCESSING")
     print("=" * 30)
     
-    # Check for missing values
-    missing_values = df.isnull().sum()
+    import pandas as pd
+    
+    # Missing values were counted while the data was loaded
     print("Missing values per column:")
-    print(missing_values)
+    for name, count in data.missing_counts.items():
+        print(f"  {name}: {count}")
     
-    if missing_values.sum() == 0:
+    if not any(data.missing_counts.values()):
         print("✓ No missing values found!")
     else:
         print("Handling missing values...")
-        # Fill missing values with median for numerical columns
-        for col in df.select_dtypes(include=[np.number]).columns:
-            if df[col].isnull().sum() > 0:
-                df[col].fillna(df[col].median(), inplace=True)
+        # Fill missing values with each column's median, all columns at once
+        medians = fill_missing_with_medians(data)
+        print(f"Filled with medians: {medians}")
     
-    # Prepare features and target
-    X = df.drop(['species', 'species_name'], axis=1)
-    y = df['species']
+    # Prepare features and target (labels are already integer-encoded)
+    X = pd.DataFrame(data.X, columns=data.feature_names, copy=False)
+    y = data.y
     
     print(f"\nFeatures shape: {X.shape}")
     print(f"Target shape: {y.shape}")
-    print(f"Target distribution:\n{y.value_counts()}")
+    counts = np.bincount(y, minlength=len(data.target_names))
+    print("Target distribution:")
+    for name, count in zip(data.target_names, counts):
+        print(f"  {name}: {count}")
     
     return X, y
 
-def train_decision_tree(X, y):
-    """Train a decision tree classifier"""
+def split_data(X, y, test_size=0.3, random_state=42):
+    """Stratified train/test split shared by training and hyperparameter search"""
+    from sklearn.model_selection import train_test_split
+    
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+def train_decision_tree(X, y, test_size=0.3, random_state=42, max_depth=5,
+                        min_samples_split=5, min_samples_leaf=2, criterion='gini', cache=None):
+    """Train a decision tree classifier, reusing a cached fit when available"""
     print("\n" + "=" * 30)
     print("MODEL TRAINING")
     print("=" * 30)
     
+    from sklearn.tree import DecisionTreeClassifier
+    
     # Split the data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.3, random_state=42, stratify=y
-    )
+    X_train, X_test, y_train, y_test = split_data(X, y, test_size, random_state)
     
     print(f"Training set size: {X_train.shape[0]}")
     print(f"Testing set size: {X_test.shape[0]}")
     
+    model_params = {
+        "max_depth": max_depth,  # Prevent overfitting
+        "min_samples_split": min_samples_split,
+        "min_samples_leaf": min_samples_leaf,
+        "criterion": criterion,
+    }
+    
+    cache_key = None
+    if cache is not None:
+        cache_key = fingerprint(
+            [X, y],
+            {"test_size": test_size, "random_state": random_state, "stratify": True},
+            {"estimator": "DecisionTreeClassifier", **model_params}
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            entry_dir, metrics = cached
+            with open(os.path.join(entry_dir, MODEL_FILE), "rb") as f:
+                dt_classifier = pickle.load(f)
+            print(f"\n✓ Loaded cached model {cache_key[:12]} "
+                  f"(train accuracy: {metrics['train_accuracy']:.4f})")
+            return dt_classifier, X_train, X_test, y_train, y_test
+    
     # Create and train the decision tree classifier
-    dt_classifier = DecisionTreeClassifier(
-        random_state=42,
-        max_depth=5,  # Prevent overfitting
-        min_samples_split=5,
-        min_samples_leaf=2
-    )
+    dt_classifier = DecisionTreeClassifier(random_state=random_state, **model_params)
     
     print("\nTraining Decision Tree Classifier...")
     dt_classifier.fit(X_train, y_train)
     print("✓ Training completed!")
     
+    if cache is not None:
+        def save_artifacts(entry_dir):
+            with open(os.path.join(entry_dir, MODEL_FILE), "wb") as f:
+                pickle.dump(dt_classifier, f)
+        
+        cache.put(cache_key, save_artifacts, {
+            "train_accuracy": float(dt_classifier.score(X_train, y_train)),
+            "train_size": int(X_train.shape[0]),
+            "test_size": int(X_test.shape[0]),
+        })
+    
     return dt_classifier, X_train, X_test, y_train, y_test
 
-def evaluate_model(model, X_test, y_test, target_names):
+def evaluate_model(model, X_test, y_test, target_names, batch_size=EVAL_BATCH_SIZE):
     """Evaluate the model using accuracy, precision, and recall"""
     print("\n" + "=" * 30)
     print("MODEL EVALUATION")
     print("=" * 30)
     
-    # Make predictions
-    y_pred = model.predict(X_test)
+    import pandas as pd
+    
+    # Predict in batches, folding each into one confusion matrix
+    confusion = ConfusionMatrix(len(target_names))
+    y_test = np.asarray(y_test)
+    for start in range(0, len(X_test), batch_size):
+        stop = start + batch_size
+        confusion.update(y_test[start:stop], model.predict(X_test.iloc[start:stop]))
     
-    # Calculate metrics
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred, average='weighted')
-    recall = recall_score(y_test, y_pred, average='weighted')
+    # Calculate metrics (all derived from the confusion matrix)
+    accuracy = confusion.accuracy()
+    precision = confusion.precision('weighted')
+    recall = confusion.recall('weighted')
     
     print(f"Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
     print(f"Precision (weighted): {precision:.4f}")
     print(f"Recall (weighted): {recall:.4f}")
     
     print("\nDetailed Classification Report:")
-    print(classification_report(y_test, y_pred, target_names=target_names))
+    print(confusion.report(target_names))
     
     # Confusion Matrix
-    cm = confusion_matrix(y_test, y_pred)
+    cm = confusion.matrix
     print("\nConfusion Matrix:")
     print(cm)
     
     # Feature importance
-    feature_names = ['sepal length', 'sepal width', 'petal length', 'petal width']
     feature_importance = pd.DataFrame({
-        'feature': feature_names,
+        'feature': list(X_test.columns),
         'importance': model.feature_importances_
     }).sort_values('importance', ascending=False)
     
     print("\nFeature Importance:")
     print(feature_importance)
     
-    return y_pred, accuracy, precision, recall, cm, feature_importance
+    return accuracy, precision, recall, cm, feature_importance
 
-def visualize_results(y_test, y_pred, target_names):
+def visualize_results(cm, target_names):
     """Create visualizations for the results"""
     print("\n" + "=" * 30)
     print("VISUALIZATION")
     print("=" * 30)
     
-    # Confusion Matrix Heatmap
-    cm = confusion_matrix(y_test, y_pred)
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=target_names, yticklabels=target_names)
-    plt.title('Confusion Matrix - Iris Classification')
-    plt.xlabel('Predicted')
-    plt.ylabel('Actual')
-    plt.tight_layout()
-    plt.show()
+    if not plotting.enabled():
+        print("Headless mode: skipping visualizations")
+        return
+    
+    # Confusion Matrix Heatmap (reuses the matrix accumulated during evaluation)
+    def draw(plt):
+        import seaborn as sns
+        
+        plt.figure(figsize=(8, 6))
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
+                    xticklabels=target_names, yticklabels=target_names)
+        plt.title('Confusion Matrix - Iris Classification')
+        plt.xlabel('Predicted')
+        plt.ylabel('Actual')
+        plt.tight_layout()
+    
+    plotting.render("task1_confusion_matrix", draw)
     
     print("✓ Confusion matrix visualization created!")
 
-def main():
+def build_results(accuracy, precision, recall, cm, feature_importance):
+    """Assemble the JSON-serializable results consumed by the web API"""
+    return {
+        "accuracy": float(accuracy),
+        "precision": float(precision),
+        "recall": float(recall),
+        "feature_importance": [
+            {"feature": row['feature'], "importance": float(row['importance'])}
+            for _, row in feature_importance.iterrows()
+        ],
+        "confusion_matrix": cm.tolist(),
+        "status": "completed"
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Iris species classification with a decision tree")
+    plotting.add_arguments(parser)
+    instrumentation.add_arguments(parser)
+    
+    data = parser.add_argument_group("input data")
+    data.add_argument("--data", help="CSV or Parquet classification table (default: the built-in Iris dataset)")
+    data.add_argument("--target", help="Label column in --data")
+    data.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows read per chunk")
+    
+    search = parser.add_argument_group("hyperparameter search")
+    search.add_argument("--search", choices=["grid", "random"],
+                        help="Choose tree parameters by stratified k-fold CV on the training split")
+    search.add_argument("--n-iter", type=int, default=30, help="Candidates sampled by random search")
+    search.add_argument("--cv", type=int, default=5, help="Number of CV folds")
+    search.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    search.add_argument("--prune-margin", type=float, default=0.05,
+                        help="Drop candidates whose mean CV accuracy trails the leader by more than this")
+    args = parser.parse_args(argv)
+    if args.data and not args.target:
+        parser.error("--data requires --target")
+    return args
+
+def main(argv=None):
     """Main function to execute the complete workflow"""
+    args = parse_args(argv)
+    plotting.configure(args.headless, args.plot_dir)
+    stages = instrumentation.StageTimer(
+        total=6 if args.search else 5, profile_dir=args.profile_stages, script="task1"
+    )
+    model_cache = ModelCache.from_env()
     try:
         # Step 1: Load and explore data
-        df, iris = load_and_explore_data()
+        with stages.stage("load_data", unit="rows") as stage:
+            data = load_and_explore_data(args.data, args.target, args.chunksize)
+            stage.items = len(data)
         
         # Step 2: Preprocess data
-        X, y = preprocess_data(df)
+        with stages.stage("preprocess", unit="rows") as stage:
+            X, y = preprocess_data(data)
+            stage.items = len(X)
+        
+        # Optional: Search tree parameters with cross-validation on the training split
+        search = None
+        tree_params = {}
+        if args.search:
+            from tree_search import search_decision_tree
+            
+            with stages.stage("search", unit="fits") as stage:
+                X_train, _, y_train, _ = split_data(X, y)
+                search = search_decision_tree(
+                    X_train, y_train, mode=args.search, n_iter=args.n_iter, cv=args.cv,
+                    prune_margin=args.prune_margin, max_workers=args.workers
+                )
+                stage.items = sum(row["folds_completed"] for row in search["candidates"])
+            tree_params = search["best_params"]
         
         # Step 3: Train decision tree classifier
-        model, X_train, X_test, y_train, y_test = train_decision_tree(X, y)
+        with stages.stage("train", unit="rows") as stage:
+            model, X_train, X_test, y_train, y_test = train_decision_tree(
+                X, y, cache=model_cache, **tree_params
+            )
+            print(describe_cache(model_cache))
+            stage.items = len(X_train)
         
         # Step 4: Evaluate model
-        y_pred, accuracy, precision, recall, cm, feature_importance = evaluate_model(
-            model, X_test, y_test, iris.target_names
-        )
+        with stages.stage("evaluate", unit="rows") as stage:
+            accuracy, precision, recall, cm, feature_importance = evaluate_model(
+                model, X_test, y_test, data.target_names
+            )
+            stage.items = len(X_test)
         
         # Step 5: Visualize results
-        visualize_results(y_test, y_pred, iris.target_names)
+        with stages.stage("visualize"):
+            visualize_results(cm, data.target_names)
+            plotting.wait_for_plots()
+        
+        stages.print_summary()
         
         print("\n" + "=" * 50)
         print("TASK 1 COMPLETED SUCCESSFULLY!")
@@ -188,25 +336,17 @@ def main():
         print("=" * 50)
         
         # Return JSON results for API
-        results = {
-            "accuracy": float(accuracy),
-            "precision": float(precision),
-            "recall": float(recall),
-            "feature_importance": [
-                {"feature": row['feature'], "importance": float(row['importance'])}
-                for _, row in feature_importance.iterrows()
-            ],
-            "confusion_matrix": cm.tolist(),
-            "status": "completed"
-        }
+        results = build_results(accuracy, precision, recall, cm, feature_importance)
+        if search:
+            results['hyperparameter_search'] = search
+        results['model_cache'] = cache_summary(model_cache)
+        results['timings'] = stages.summary()
         
-        # Print JSON results at the end for API to capture
-        print("\n" + "=" * 50)
-        print("JSON RESULTS:")
-        print("=" * 50)
-        print(json.dumps(results, indent=2))
+        # Publish results on the event channel (or print them for CLI users)
+        events.result(results)
         
     except Exception as e:
+        events.error(e)
         print(f"Error occurred: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -4,70 +4,170 @@ Dataset: MNIST Handwritten Digits
 Goal: Build CNN model, achieve >95% accuracy, visualize predictions
 """
 
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.metrics import classification_report, confusion_matrix
-import seaborn as sns
-import json
+import argparse
+import os
+import time
 
-def load_and_preprocess_data():
-    """Load and preprocess the MNIST dataset"""
+# TensorFlow and scikit-learn are imported inside the functions that use them
+# so that importing this module (e.g. for the shard helpers or --help) stays cheap
+import dataset_store
+import events
+import instrumentation
+import plotting
+from model_cache import ModelCache, cache_summary, describe_cache, fingerprint
+from streaming_metrics import ConfusionMatrix
+
+WEIGHTS_FILE = "cnn.weights.h5"
+DATA_DIR = os.environ.get("MNIST_DATA_DIR", os.path.join(dataset_store.DATA_ROOT, "mnist"))
+READ_CHUNK = 1024
+PROGRESS_BATCH_INTERVAL = 50
+EVAL_BATCH_SIZE = 512
+NUM_SAMPLE_PREDICTIONS = 5
+
+def prepare_mnist_shards(directory=DATA_DIR):
+    """Open MNIST from the dataset store, seeding it on first use"""
+    dataset = dataset_store.ensure_mnist(directory)
+    return dataset["train"], dataset["test"]
+
+def make_dataset(split, batch_size=128, shuffle=False, cache=False, shuffle_buffer=10000, seed=None):
+    """Build a tf.data pipeline that streams a sharded split
+    
+    Shards are read in parallel straight from the memory maps and stay uint8
+    until a parallel map normalizes each batch, so no float32 copy of the
+    whole split is ever materialized. By default nothing is cached and each
+    epoch streams from the shards again; `cache` may be True (in memory, uint8,
+    for splits that fit in RAM) or a file path (on-disk cache).
+    """
+    import tensorflow as tf
+    
+    image_shape = split.image_shape
+    
+    def read_shard(shard):
+        x_shard = split.x_shards[shard]
+        y_shard = split.y_shards[shard]
+        for start in range(0, len(y_shard), READ_CHUNK):
+            yield x_shard[start:start + READ_CHUNK], y_shard[start:start + READ_CHUNK]
+    
+    signature = (
+        tf.TensorSpec(shape=(None,) + image_shape, dtype=tf.uint8),
+        tf.TensorSpec(shape=(None,), dtype=tf.uint8)
+    )
+    dataset = tf.data.Dataset.range(len(split.x_shards)).interleave(
+        lambda shard: tf.data.Dataset.from_generator(read_shard, output_signature=signature, args=(shard,)),
+        cycle_length=tf.data.AUTOTUNE,
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=not shuffle
+    ).unbatch()
+    
+    if cache:
+        dataset = dataset.cache(cache if isinstance(cache, str) else "")
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    
+    def normalize(x, y):
+        x = tf.cast(x, tf.float32) / 255.0
+        return tf.expand_dims(x, -1), tf.cast(y, tf.int32)
+    
+    return (
+        dataset.batch(batch_size)
+        .map(normalize, num_parallel_calls=tf.data.AUTOTUNE)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+def _cache_path(cache, suffix):
+    """A separate cache file for a second pipeline; in-memory caches need none"""
+    return f"{cache}-{suffix}" if isinstance(cache, str) else cache
+
+def load_and_preprocess_data(directory=DATA_DIR):
+    """Load the MNIST dataset as memory-mapped shards from the dataset store"""
     print("=" * 50)
     print("TASK 2: MNIST HANDWRITTEN DIGITS CLASSIFICATION")
     print("=" * 50)
     
     # Load MNIST dataset
     print("Loading MNIST dataset...")
-    (x_train, y_train), (x_test, y_test) = keras.datasets.mnist.load_data()
-    
-    print(f"Training data shape: {x_train.shape}")
-    print(f"Training labels shape: {y_train.shape}")
-    print(f"Test data shape: {x_test.shape}")
-    print(f"Test labels shape: {y_test.shape}")
-    
-    # Normalize pixel values to [0, 1]
-    print("\nNormalizing pixel values...")
-    x_train = x_train.astype('float32') / 255.0
-    x_test = x_test.astype('float32') / 255.0
+    train_split, test_split = prepare_mnist_shards(directory)
     
-    # Reshape data to add channel dimension (for CNN)
-    x_train = x_train.reshape(x_train.shape[0], 28, 28, 1)
-    x_test = x_test.reshape(x_test.shape[0], 28, 28, 1)
+    print(f"Training data shape: {(len(train_split),) + train_split.image_shape} "
+          f"in {len(train_split.x_shards)} shards")
+    print(f"Test data shape: {(len(test_split),) + test_split.image_shape} "
+          f"in {len(test_split.x_shards)} shards")
     
-    # Convert labels to categorical (one-hot encoding)
-    y_train_categorical = keras.utils.to_categorical(y_train, 10)
-    y_test_categorical = keras.utils.to_categorical(y_test, 10)
-    
-    print(f"Reshaped training data: {x_train.shape}")
-    print(f"Categorical labels shape: {y_train_categorical.shape}")
+    # Pixels stay uint8 on disk; normalization to [0, 1] and the channel
+    # dimension are applied per batch in make_dataset. Labels stay sparse
+    # integers, so no one-hot copy is made.
+    print("\nPixel values are normalized on the fly by the tf.data pipeline")
     
     # Display sample images
-    visualize_sample_data(x_train, y_train)
+    visualize_sample_data(train_split.x_shards[0], train_split.y_shards[0])
     
-    return (x_train, y_train, y_train_categorical), (x_test, y_test, y_test_categorical)
+    return train_split, test_split
 
 def visualize_sample_data(x_data, y_data, num_samples=10):
     """Visualize sample images from the dataset"""
-    print("\nSample images from the dataset:")
+    if not plotting.enabled():
+        return
     
-    plt.figure(figsize=(12, 4))
-    for i in range(num_samples):
-        plt.subplot(2, 5, i + 1)
-        plt.imshow(x_data[i].reshape(28, 28), cmap='gray')
-        plt.title(f'Label: {y_data[i]}')
-        plt.axis('off')
-    plt.tight_layout()
-    plt.show()
+    print("\nSample images from the dataset:")
+    x_samples = np.array(x_data[:num_samples])
+    y_samples = np.array(y_data[:num_samples])
+    
+    def draw(plt):
+        plt.figure(figsize=(12, 4))
+        for i in range(num_samples):
+            plt.subplot(2, 5, i + 1)
+            plt.imshow(x_samples[i].reshape(28, 28), cmap='gray')
+            plt.title(f'Label: {y_samples[i]}')
+            plt.axis('off')
+        plt.tight_layout()
+    
+    plotting.render("task2_sample_data", draw)
 
-def build_cnn_model():
+def cpu_supports_bfloat16():
+    """True when the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    flags = set(line.split(":", 1)[1].split())
+                    return bool(flags & {"avx512_bf16", "amx_bf16"})
+    except OSError:
+        pass
+    return False
+
+def configure_performance(intra_op_threads=0, inter_op_threads=0, mixed_precision="off"):
+    """Apply the training performance profile before TensorFlow runs any op
+    
+    Thread counts of 0 keep TensorFlow's defaults. `mixed_precision` is
+    "off", "bfloat16", or "auto" (bfloat16 only where the CPU supports it).
+    """
+    import tensorflow as tf
+    from tensorflow import keras
+    
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    
+    use_bfloat16 = mixed_precision == "bfloat16" or (mixed_precision == "auto" and cpu_supports_bfloat16())
+    keras.mixed_precision.set_global_policy("mixed_bfloat16" if use_bfloat16 else "float32")
+    
+    return {
+        "intra_op_threads": tf.config.threading.get_intra_op_parallelism_threads(),
+        "inter_op_threads": tf.config.threading.get_inter_op_parallelism_threads(),
+        "precision": "mixed_bfloat16" if use_bfloat16 else "float32",
+    }
+
+def build_cnn_model(jit_compile=False):
     """Build a Convolutional Neural Network model"""
     print("\n" + "=" * 30)
     print("BUILDING CNN MODEL")
     print("=" * 30)
     
+    from tensorflow import keras
+    from tensorflow.keras import layers
+    
     model = keras.Sequential([
         # First Convolutional Block
         layers.Conv2D(32, (3, 3), activation='relu', input_shape=(28, 28, 1)),
@@ -84,14 +184,16 @@ def build_cnn_model():
         layers.Flatten(),
         layers.Dense(64, activation='relu'),
         layers.Dropout(0.5),  # Prevent overfitting
-        layers.Dense(10, activation='softmax')  # 10 classes for digits 0-9
+        # 10 classes for digits 0-9; softmax stays float32 under mixed precision
+        layers.Dense(10, activation='softmax', dtype='float32')
     ])
     
     # Compile the model
     model.compile(
         optimizer='adam',
-        loss='categorical_crossentropy',
-        metrics=['accuracy']
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy'],
+        jit_compile=jit_compile  # XLA-compile the train step
     )
     
     print("Model Architecture:")
@@ -99,14 +201,106 @@ def build_cnn_model():
     
     return model
 
-def train_model(model, train_data, validation_data, epochs=10):
-    """Train the CNN model"""
+def layer_spec(model):
+    """Describe the architecture without the auto-generated layer names"""
+    spec = []
+    for layer in model.layers:
+        config = {k: v for k, v in layer.get_config().items() if k != 'name'}
+        spec.append({"class": layer.__class__.__name__, "config": config})
+    return spec
+
+def learning_rate_of(model):
+    """Current optimizer learning rate as a float (handles schedules)"""
+    learning_rate = model.optimizer.learning_rate
+    if callable(learning_rate):
+        learning_rate = learning_rate(model.optimizer.iterations)
+    return float(np.asarray(learning_rate))
+
+def progress_callback(batch_size, epochs, batch_interval=PROGRESS_BATCH_INTERVAL):
+    """Build a Keras callback that publishes training progress as events
+    
+    A "batch" event is emitted every `batch_interval` batches and an "epoch"
+    event at the end of every epoch, each with loss, accuracy, throughput in
+    samples/sec and the current learning rate.
+    """
+    from tensorflow import keras
+    
+    class TrainingProgressCallback(keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self.epoch = epoch
+            self.epoch_start = self.window_start = self.last_batch_end = time.perf_counter()
+            self.window_batches = 0
+            self.epoch_batches = 0
+        
+        def on_train_batch_end(self, batch, logs=None):
+            now = self.last_batch_end = time.perf_counter()
+            self.window_batches += 1
+            self.epoch_batches += 1
+            if (batch + 1) % batch_interval:
+                return
+            logs = logs or {}
+            events.emit(
+                "batch",
+                epoch=self.epoch + 1,
+                epochs=epochs,
+                batch=batch + 1,
+                loss=float(logs.get("loss", 0.0)),
+                accuracy=float(logs.get("accuracy", 0.0)),
+                samples_per_sec=self.window_batches * batch_size / max(now - self.window_start, 1e-9),
+                learning_rate=learning_rate_of(self.model)
+            )
+            self.window_start = now
+            self.window_batches = 0
+        
+        def on_epoch_end(self, epoch, logs=None):
+            elapsed = time.perf_counter() - self.epoch_start
+            # Throughput covers the training batches only, not validation
+            train_seconds = self.last_batch_end - self.epoch_start
+            logs = logs or {}
+            events.emit(
+                "epoch",
+                epoch=epoch + 1,
+                epochs=epochs,
+                loss=float(logs.get("loss", 0.0)),
+                accuracy=float(logs.get("accuracy", 0.0)),
+                val_loss=float(logs["val_loss"]) if "val_loss" in logs else None,
+                val_accuracy=float(logs["val_accuracy"]) if "val_accuracy" in logs else None,
+                samples_per_sec=self.epoch_batches * batch_size / max(train_seconds, 1e-9),
+                learning_rate=learning_rate_of(self.model),
+                seconds=elapsed
+            )
+    
+    return TrainingProgressCallback()
+
+def train_model(model, train_split, validation_split, epochs=10, batch_size=128, cache=None, data_cache=False):
+    """Train the CNN model, reusing cached weights when available
+    
+    `data_cache` is passed to make_dataset for the training and validation
+    pipelines (False, True for in memory, or a file path).
+    """
     print("\n" + "=" * 30)
     print("TRAINING MODEL")
     print("=" * 30)
     
-    x_train, y_train_cat = train_data
-    x_val, y_val_cat = validation_data
+    from tensorflow import keras
+    
+    cache_key = None
+    if cache is not None:
+        cache_key = fingerprint(
+            train_split.x_shards + train_split.y_shards
+            + validation_split.x_shards + validation_split.y_shards,
+            {"split": "mnist-train/test", "validation_size": len(validation_split)},
+            {"layers": layer_spec(model), "epochs": epochs, "batch_size": batch_size}
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            entry_dir, metrics = cached
+            model.load_weights(os.path.join(entry_dir, WEIGHTS_FILE))
+            history = keras.callbacks.History()
+            history.history = metrics["history"]
+            print(f"✓ Loaded cached weights {cache_key[:12]} "
+                  f"({len(history.history['accuracy'])} epochs)")
+            return history
     
     # Define callbacks
     early_stopping = keras.callbacks.EarlyStopping(
@@ -122,30 +316,61 @@ def train_model(model, train_data, validation_data, epochs=10):
         min_lr=0.001
     )
     
+    callbacks = [early_stopping, reduce_lr]
+    if events.enabled():
+        callbacks.append(progress_callback(batch_size, epochs))
+    
     print(f"Training for {epochs} epochs...")
     
+    train_ds = make_dataset(train_split, batch_size=batch_size, shuffle=True, cache=data_cache)
+    val_ds = make_dataset(validation_split, batch_size=EVAL_BATCH_SIZE, cache=_cache_path(data_cache, "val"))
+    
     # Train the model
     history = model.fit(
-        x_train, y_train_cat,
-        batch_size=128,
+        train_ds,
         epochs=epochs,
-        validation_data=(x_val, y_val_cat),
-        callbacks=[early_stopping, reduce_lr],
-        verbose=1
+        validation_data=val_ds,
+        callbacks=callbacks,
+        # Per-step progress bars are noise when progress goes out as events
+        verbose=2 if events.enabled() else 1
     )
     
+    if cache is not None:
+        cache.put(
+            cache_key,
+            lambda entry_dir: model.save_weights(os.path.join(entry_dir, WEIGHTS_FILE)),
+            {"history": {k: [float(v) for v in values] for k, values in history.history.items()}}
+        )
+    
     return history
 
-def evaluate_model(model, test_data):
+def evaluate_model(model, test_split):
     """Evaluate the trained model"""
     print("\n" + "=" * 30)
     print("MODEL EVALUATION")
     print("=" * 30)
     
-    x_test, y_test, y_test_cat = test_data
+    from tensorflow import keras
+    
+    test_ds = make_dataset(test_split, batch_size=EVAL_BATCH_SIZE)
+    
+    # One streaming pass: loss and the confusion matrix are accumulated per
+    # batch, and only the first few predictions are kept for the results
+    confusion = ConfusionMatrix(10)
+    loss_sum = 0.0
+    samples = []
+    for x_batch, y_batch in test_ds:
+        probabilities = model(x_batch, training=False)
+        labels = y_batch.numpy()
+        loss_sum += float(np.sum(keras.losses.sparse_categorical_crossentropy(y_batch, probabilities)))
+        probabilities = np.asarray(probabilities)
+        predicted = np.argmax(probabilities, axis=1)
+        confusion.update(labels, predicted)
+        for i in range(min(NUM_SAMPLE_PREDICTIONS - len(samples), len(labels))):
+            samples.append((int(labels[i]), int(predicted[i]), float(probabilities[i].max())))
     
-    # Evaluate on test set
-    test_loss, test_accuracy = model.evaluate(x_test, y_test_cat, verbose=0)
+    test_loss = loss_sum / confusion.total
+    test_accuracy = confusion.accuracy()
     
     print(f"Test Loss: {test_loss:.4f}")
     print(f"Test Accuracy: {test_accuracy:.4f} ({test_accuracy*100:.2f}%)")
@@ -156,108 +381,203 @@ def evaluate_model(model, test_data):
     else:
         print("⚠ WARNING: Did not achieve >95% test accuracy")
     
-    # Make predictions
-    y_pred = model.predict(x_test)
-    y_pred_classes = np.argmax(y_pred, axis=1)
-    
     # Classification report
     print("\nClassification Report:")
-    print(classification_report(y_test, y_pred_classes))
+    print(confusion.report())
     
-    return y_pred, y_pred_classes, test_accuracy
+    return confusion, samples, test_accuracy, test_loss
 
-def visualize_predictions(model, test_data, num_samples=5):
+def visualize_predictions(model, test_split, num_samples=5):
     """Visualize model predictions on sample images"""
     print("\n" + "=" * 30)
     print("PREDICTION VISUALIZATION")
     print("=" * 30)
     
-    x_test, y_test, _ = test_data
+    if not plotting.enabled():
+        print("Headless mode: skipping prediction visualization")
+        return
     
     # Select random samples
-    indices = np.random.choice(len(x_test), num_samples, replace=False)
+    indices = np.random.choice(len(test_split), num_samples, replace=False)
+    x_samples = test_split.take(indices)
+    y_samples = test_split.labels()[indices]
     
     # Make predictions
-    predictions = model.predict(x_test[indices])
+    predictions = model.predict(x_samples[..., np.newaxis].astype('float32') / 255.0, verbose=0)
     predicted_classes = np.argmax(predictions, axis=1)
     
     # Create visualization
-    plt.figure(figsize=(15, 6))
-    
-    for i, idx in enumerate(indices):
-        # Original image
-        plt.subplot(2, num_samples, i + 1)
-        plt.imshow(x_test[idx].reshape(28, 28), cmap='gray')
-        plt.title(f'True: {y_test[idx]}')
-        plt.axis('off')
+    def draw(plt):
+        plt.figure(figsize=(15, 6))
+        
+        for i in range(num_samples):
+            # Original image
+            plt.subplot(2, num_samples, i + 1)
+            plt.imshow(x_samples[i], cmap='gray')
+            plt.title(f'True: {y_samples[i]}')
+            plt.axis('off')
+            
+            # Prediction probabilities
+            plt.subplot(2, num_samples, i + 1 + num_samples)
+            plt.bar(range(10), predictions[i])
+            plt.title(f'Pred: {predicted_classes[i]} ({predictions[i][predicted_classes[i]]:.3f})')
+            plt.xlabel('Digit')
+            plt.ylabel('Probability')
+            plt.xticks(range(10))
         
-        # Prediction probabilities
-        plt.subplot(2, num_samples, i + 1 + num_samples)
-        plt.bar(range(10), predictions[i])
-        plt.title(f'Pred: {predicted_classes[i]} ({predictions[i][predicted_classes[i]]:.3f})')
-        plt.xlabel('Digit')
-        plt.ylabel('Probability')
-        plt.xticks(range(10))
+        plt.tight_layout()
     
-    plt.tight_layout()
-    plt.show()
+    plotting.render("task2_predictions", draw)
     
     print("✓ Prediction visualization completed!")
 
 def plot_training_history(history):
     """Plot training history"""
+    if not plotting.enabled():
+        return
+    
     print("\nTraining History:")
+    values = {k: list(v) for k, v in history.history.items()}
+    
+    def draw(plt):
+        plt.figure(figsize=(12, 4))
+        
+        # Plot accuracy
+        plt.subplot(1, 2, 1)
+        plt.plot(values['accuracy'], label='Training Accuracy')
+        plt.plot(values['val_accuracy'], label='Validation Accuracy')
+        plt.title('Model Accuracy')
+        plt.xlabel('Epoch')
+        plt.ylabel('Accuracy')
+        plt.legend()
+        
+        # Plot loss
+        plt.subplot(1, 2, 2)
+        plt.plot(values['loss'], label='Training Loss')
+        plt.plot(values['val_loss'], label='Validation Loss')
+        plt.title('Model Loss')
+        plt.xlabel('Epoch')
+        plt.ylabel('Loss')
+        plt.legend()
+        
+        plt.tight_layout()
     
-    plt.figure(figsize=(12, 4))
-    
-    # Plot accuracy
-    plt.subplot(1, 2, 1)
-    plt.plot(history.history['accuracy'], label='Training Accuracy')
-    plt.plot(history.history['val_accuracy'], label='Validation Accuracy')
-    plt.title('Model Accuracy')
-    plt.xlabel('Epoch')
-    plt.ylabel('Accuracy')
-    plt.legend()
-    
-    # Plot loss
-    plt.subplot(1, 2, 2)
-    plt.plot(history.history['loss'], label='Training Loss')
-    plt.plot(history.history['val_loss'], label='Validation Loss')
-    plt.title('Model Loss')
-    plt.xlabel('Epoch')
-    plt.ylabel('Loss')
-    plt.legend()
-    
-    plt.tight_layout()
-    plt.show()
+    plotting.render("task2_training_history", draw)
+
+def build_results(test_accuracy, test_loss, history, samples):
+    """Assemble the JSON-serializable results consumed by the web API"""
+    return {
+        "test_accuracy": float(test_accuracy),
+        "test_loss": float(test_loss),
+        "training_history": {
+            "epochs": list(range(1, len(history['accuracy']) + 1)),
+            "accuracy": [float(x) for x in history['accuracy']],
+            "val_accuracy": [float(x) for x in history['val_accuracy']],
+            "loss": [float(x) for x in history['loss']],
+            "val_loss": [float(x) for x in history['val_loss']]
+        },
+        "sample_predictions": [
+            {
+                "image_data": "/placeholder.svg?height=28&width=28",
+                "true_label": true_label,
+                "predicted_label": predicted_label,
+                "confidence": confidence
+            }
+            for true_label, predicted_label, confidence in samples
+        ],
+        "status": "completed"
+    }
 
-def main():
+def export_model(model, train_split, quantization, export_dir):
+    """Export the trained model to a quantized .tflite file"""
+    from mnist_tflite import calibration_sample, export_tflite
+    
+    path = os.path.join(export_dir, f"mnist_cnn_{quantization}.tflite")
+    calibration = calibration_sample(train_split) if quantization == "int8" else None
+    size = export_tflite(model, path, quantization, calibration)
+    print(f"Exported {quantization} TFLite model to {path} ({size / 1024:.0f} KB)")
+    return {"path": path, "quantization": quantization, "size_bytes": size}
+
+def parse_args(argv=None):
+    from mnist_tflite import DEFAULT_EXPORT_DIR, QUANTIZATION_MODES
+    
+    parser = argparse.ArgumentParser(description="MNIST digit classification with a CNN")
+    plotting.add_arguments(parser)
+    instrumentation.add_arguments(parser)
+    parser.add_argument("--export-tflite", choices=QUANTIZATION_MODES, metavar="MODE",
+                        help="After training, export a .tflite model (none, dynamic or int8)")
+    parser.add_argument("--export-dir", default=DEFAULT_EXPORT_DIR, help="Where .tflite files are written")
+    
+    performance = parser.add_argument_group("performance profile")
+    performance.add_argument("--epochs", type=int, default=15)
+    performance.add_argument("--batch-size", type=int, default=128)
+    performance.add_argument("--intra-op-threads", type=int, default=0, help="0 keeps the TensorFlow default")
+    performance.add_argument("--inter-op-threads", type=int, default=0, help="0 keeps the TensorFlow default")
+    performance.add_argument("--data-cache", metavar="memory|PATH",
+                             help="Cache decoded batches after the first epoch: 'memory' for splits that fit "
+                                  "in RAM, or a file path (default: stream from the shards every epoch)")
+    performance.add_argument("--jit-compile", action="store_true", help="Compile the train step with XLA")
+    performance.add_argument("--mixed-precision", choices=["off", "bfloat16", "auto"], default="off",
+                             help="bfloat16 mixed precision; 'auto' enables it only on CPUs with native support")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function to execute the complete workflow"""
+    args = parse_args(argv)
+    plotting.configure(args.headless, args.plot_dir)
+    stages = instrumentation.StageTimer(
+        total=7 if args.export_tflite else 6, profile_dir=args.profile_stages, script="task2"
+    )
+    model_cache = ModelCache.from_env()
     try:
+        profile = configure_performance(args.intra_op_threads, args.inter_op_threads, args.mixed_precision)
+        profile.update(batch_size=args.batch_size, jit_compile=args.jit_compile)
+        print(f"Performance profile: {profile}")
+        
         # Step 1: Load and preprocess data
-        train_data, test_data = load_and_preprocess_data()
-        x_train, y_train, y_train_cat = train_data
-        x_test, y_test, y_test_cat = test_data
+        with stages.stage("load_data", unit="images") as stage:
+            train_split, test_split = load_and_preprocess_data()
+            stage.items = len(train_split) + len(test_split)
         
         # Step 2: Build CNN model
-        model = build_cnn_model()
+        with stages.stage("build_model"):
+            model = build_cnn_model(jit_compile=args.jit_compile)
         
         # Step 3: Train the model
-        history = train_model(
-            model, 
-            (x_train, y_train_cat), 
-            (x_test, y_test_cat),
-            epochs=15
-        )
+        with stages.stage("train", unit="images") as stage:
+            history = train_model(
+                model, 
+                train_split, 
+                test_split,
+                epochs=args.epochs,
+                batch_size=args.batch_size,
+                cache=model_cache,
+                data_cache=True if args.data_cache == "memory" else args.data_cache or False
+            )
+            print(describe_cache(model_cache))
+            stage.items = len(train_split) * len(history.history['accuracy'])
         
         # Step 4: Evaluate the model
-        y_pred, y_pred_classes, test_accuracy = evaluate_model(model, test_data)
+        with stages.stage("evaluate", unit="images") as stage:
+            confusion, samples, test_accuracy, test_loss = evaluate_model(model, test_split)
+            stage.items = confusion.total
         
         # Step 5: Visualize predictions
-        visualize_predictions(model, test_data, num_samples=5)
+        with stages.stage("visualize_predictions"):
+            visualize_predictions(model, test_split, num_samples=5)
         
         # Step 6: Plot training history
-        plot_training_history(history)
+        with stages.stage("plot_history"):
+            plot_training_history(history)
+            plotting.wait_for_plots()
+        
+        # Step 7 (optional): Export a quantized TFLite model
+        export = None
+        if args.export_tflite:
+            with stages.stage("export_tflite"):
+                export = export_model(model, train_split, args.export_tflite, args.export_dir)
+        
+        stages.print_summary()
         
         print("\n" + "=" * 50)
         print("TASK 2 COMPLETED SUCCESSFULLY!")
@@ -267,35 +587,18 @@ def main():
         print("=" * 50)
         
         # Return JSON results for API
-        results = {
-            "test_accuracy": float(test_accuracy),
-            "test_loss": float(test_loss),
-            "training_history": {
-                "epochs": list(range(1, len(history.history['accuracy']) + 1)),
-                "accuracy": [float(x) for x in history.history['accuracy']],
-                "val_accuracy": [float(x) for x in history.history['val_accuracy']],
-                "loss": [float(x) for x in history.history['loss']],
-                "val_loss": [float(x) for x in history.history['val_loss']]
-            },
-            "sample_predictions": [
-                {
-                    "image_data": "/placeholder.svg?height=28&width=28",
-                    "true_label": int(y_test[i]),
-                    "predicted_label": int(y_pred_classes[i]),
-                    "confidence": float(np.max(y_pred[i]))
-                }
-                for i in range(min(5, len(y_test)))
-            ],
-            "status": "completed"
-        }
+        results = build_results(test_accuracy, test_loss, history.history, samples)
+        results['performance_profile'] = profile
+        results['model_cache'] = cache_summary(model_cache)
+        if export:
+            results['tflite_export'] = export
+        results['timings'] = stages.summary()
         
-        # Print JSON results at the end for API to capture
-        print("\n" + "=" * 50)
-        print("JSON RESULTS:")
-        print("=" * 50)
-        print(json.dumps(results, indent=2))
+        # Publish results on the event channel (or print them for CLI users)
+        events.result(results)
         
     except Exception as e:
+        events.error(e)
         print(f"Error occurred: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -4,12 +4,19 @@ Text Data: Amazon Product Reviews (simulated)
 Goal: Perform NER to extract product names/brands, analyze sentiment
 """
 
-import spacy
-import pandas as pd
-from collections import Counter
-import matplotlib.pyplot as plt
-import seaborn as sns
-import json
+import argparse
+import csv
+import os
+import numpy as np
+from collections import Counter, namedtuple
+
+# pandas, spaCy and SciPy are imported inside the functions that use them so that
+# importing this module (e.g. for the sentiment scorer or --help) stays cheap
+import events
+import instrumentation
+import plotting
+from entity_store import EntityStoreBuilder
+from topk_sketch import DEFAULT_CAPACITY, SpaceSaving, capacity_for_error
 
 # Sample Amazon product reviews for demonstration
 SAMPLE_REVIEWS = [
@@ -25,12 +32,49 @@ SAMPLE_REVIEWS = [
     "The Microsoft Surface Pro 8 is versatile but expensive. Good for drawing and note-taking but the keyboard feels flimsy."
 ]
 
+# Pipeline components NER does not depend on; disabled for entity-only passes
+NER_UNUSED_PIPES = ("tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer")
+
+ENTITY_COLUMNS = ['review_id', 'text', 'label', 'start_char', 'end_char']
+
+# Fused pipeline component that adds brand hits and sentiment to each Doc, stored
+# as one Doc extension of the same name (each doc._ access builds a new accessor)
+REVIEW_SIGNALS = "review_signals"
+ReviewSignalValues = namedtuple(
+    "ReviewSignalValues", ["brand_hits", "product_hits", "positive_count", "negative_count", "sentiment_score"]
+)
+
+# Common tech brands for better recognition
+TECH_BRANDS = [
+    'apple', 'samsung', 'google', 'microsoft', 'sony', 'dell', 
+    'nike', 'amazon', 'iphone', 'macbook', 'galaxy', 'pixel',
+    'surface', 'echo', 'airpods'
+]
+
+# Product lines whose following token names a model, e.g. "iPhone 14"
+PRODUCT_LINES = ['iphone', 'galaxy', 'macbook', 'airpods']
+
+# Lexicon for rule-based sentiment analysis
+POSITIVE_WORDS = {
+    'love', 'amazing', 'excellent', 'great', 'fantastic', 'perfect', 
+    'good', 'best', 'awesome', 'wonderful', 'outstanding', 'superb',
+    'recommend', 'satisfied', 'happy', 'pleased', 'impressed'
+}
+
+NEGATIVE_WORDS = {
+    'hate', 'terrible', 'awful', 'bad', 'worst', 'horrible', 'poor',
+    'disappointed', 'unsatisfied', 'broken', 'cheap', 'overpriced',
+    'slow', 'useless', 'defective', 'waste', 'regret'
+}
+
 def load_spacy_model():
     """Load spaCy model for NLP processing"""
     print("=" * 50)
     print("TASK 3: NLP WITH SPACY - NER AND SENTIMENT ANALYSIS")
     print("=" * 50)
     
+    import spacy
+    
     try:
         # Try to load the English model
         nlp = spacy.load("en_core_web_sm")
@@ -50,6 +94,8 @@ def create_sample_dataset():
     print("SAMPLE DATASET CREATION")
     print("=" * 30)
     
+    import pandas as pd
+    
     df = pd.DataFrame({
         'review_id': range(1, len(SAMPLE_REVIEWS) + 1),
         'review_text': SAMPLE_REVIEWS
@@ -62,127 +108,424 @@ def create_sample_dataset():
     
     return df
 
-def perform_named_entity_recognition(nlp, df):
+def synthetic_reviews(count, seed=0):
+    """`count` reviews built by recombining sentences from SAMPLE_REVIEWS"""
+    import pandas as pd
+    
+    rng = np.random.default_rng(seed)
+    sentences = [s.strip() for review in SAMPLE_REVIEWS for s in review.split(".") if s.strip()]
+    picks = rng.integers(0, len(sentences), (count, 3))
+    texts = [". ".join(sentences[i] for i in row) + "." for row in picks]
+    return pd.DataFrame({"review_id": range(1, count + 1), "review_text": texts})
+
+def load_patterns(path):
+    """Read one pattern per line, skipping blanks and '#' comments"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+class BrandMatcher:
+    """Precompiled brand and product-line matcher built once per pipeline
+    
+    All patterns are compiled into a single spaCy PhraseMatcher (matching on
+    the lowercase form), so each document is scanned in one pass regardless
+    of how many brands are registered.
+    """
+    
+    def __init__(self, nlp, brands=TECH_BRANDS, product_lines=PRODUCT_LINES):
+        from spacy.matcher import PhraseMatcher
+        
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        self.matcher.add("BRAND", list(nlp.tokenizer.pipe(brands)))
+        self.matcher.add("PRODUCT_LINE", list(nlp.tokenizer.pipe(product_lines)))
+        self.brand_key = nlp.vocab.strings["BRAND"]
+        self.product_line_key = nlp.vocab.strings["PRODUCT_LINE"]
+        self.brand_count = len(brands)
+        self.product_line_count = len(product_lines)
+    
+    @classmethod
+    def from_files(cls, nlp, brands_path=None, product_lines_path=None):
+        """Build a matcher from pattern files, falling back to the defaults"""
+        brands = load_patterns(brands_path) if brands_path else TECH_BRANDS
+        product_lines = load_patterns(product_lines_path) if product_lines_path else PRODUCT_LINES
+        return cls(nlp, brands, product_lines)
+    
+    def find(self, doc):
+        """Return (brand_spans, product_spans) found in a document
+        
+        Product spans cover a product-line keyword plus the following token,
+        e.g. "iPhone 14" or "Galaxy S23".
+        """
+        brand_hits, product_hits = self.find_offsets(doc)
+        return [doc[start:end] for start, end in brand_hits], [doc[start:end] for start, end in product_hits]
+    
+    def find_offsets(self, doc, matches=None):
+        """Like find, but as (start, end) token offsets instead of spans
+        
+        `matches` may be the result of an earlier self.matcher(doc) call.
+        """
+        brand_hits = []
+        product_hits = []
+        for match_id, start, end in self.matcher(doc) if matches is None else matches:
+            if match_id == self.brand_key:
+                brand_hits.append((start, end))
+            elif match_id == self.product_line_key and end < len(doc) and not (doc[end].is_punct or doc[end].is_space):
+                product_hits.append((start, end + 1))
+        return brand_hits, product_hits
+
+def perform_named_entity_recognition(nlp, df, matcher=None, sketch_capacity=DEFAULT_CAPACITY):
     """Perform Named Entity Recognition to extract product names and brands"""
     print("\n" + "=" * 30)
     print("NAMED ENTITY RECOGNITION")
     print("=" * 30)
     
-    all_entities = []
-    product_names = []
-    brands = []
+    # Mentions are counted in bounded-memory top-K sketches, not kept as lists
+    product_names = SpaceSaving(sketch_capacity)
+    brands = SpaceSaving(sketch_capacity)
     
-    # Define common tech brands for better recognition
-    tech_brands = {
-        'apple', 'samsung', 'google', 'microsoft', 'sony', 'dell', 
-        'nike', 'amazon', 'iphone', 'macbook', 'galaxy', 'pixel',
-        'surface', 'echo', 'airpods'
-    }
+    import spacy
+    
+    matcher = matcher or BrandMatcher(nlp)
+    # Label descriptions are looked up once per distinct label when the store is built
+    builder = EntityStoreBuilder(explain=spacy.explain)
     
     print("Processing reviews for entity extraction...")
     
-    for idx, review in enumerate(df['review_text']):
-        doc = nlp(review)
-        
-        review_entities = []
-        
-        # Extract named entities
-        for ent in doc.ents:
-            entity_info = {
-                'text': ent.text,
-                'label': ent.label_,
-                'description': spacy.explain(ent.label_),
-                'review_id': idx + 1
-            }
-            
-            all_entities.append(entity_info)
-            review_entities.append(entity_info)
-            
-            # Categorize entities
-            if ent.label_ in ['ORG', 'PRODUCT']:
-                if ent.text.lower() in tech_brands or any(brand in ent.text.lower() for brand in tech_brands):
-                    brands.append(ent.text)
-                else:
-                    product_names.append(ent.text)
-        
-        # Also look for product patterns in the text
-        words = review.lower().split()
-        for i, word in enumerate(words):
-            if word in tech_brands:
-                brands.append(word.title())
-            # Look for product patterns like "iPhone 14", "Galaxy S23", etc.
-            if i < len(words) - 1:
-                two_word = f"{word} {words[i+1]}"
-                if any(brand in two_word for brand in ['iphone', 'galaxy', 'macbook', 'airpods']):
-                    product_names.append(two_word.title())
-    
-    # Create summary
-    entities_df = pd.DataFrame(all_entities)
-    
-    print(f"Total entities extracted: {len(all_entities)}")
-    print(f"Unique brands identified: {len(set(brands))}")
-    print(f"Unique products identified: {len(set(product_names))}")
+    docs = nlp.pipe(df['review_text'], disable=unused_pipes(nlp))
+    for doc in docs:
+        brand_spans, product_spans = matcher.find(doc)
+        builder.add_doc(doc)
+        collect_mentions(doc, brand_spans, product_spans, brands, product_names)
+    
+    entities = builder.build()
+    report_entities(entities, brands, product_names)
+    return entities, brands, product_names
+
+def collect_mentions(doc, brand_spans, product_spans, brands, product_names):
+    """Count a document's brand and product mentions in the running sketches"""
+    brand_tokens = {i for span in brand_spans for i in range(span.start, span.end)}
+    
+    # Categorize entities: an ORG/PRODUCT containing a known brand is a brand
+    for ent in doc.ents:
+        if ent.label_ in ['ORG', 'PRODUCT']:
+            if any(i in brand_tokens for i in range(ent.start, ent.end)):
+                brands.add(ent.text)
+            else:
+                product_names.add(ent.text)
+    
+    # Also record brand mentions and product patterns like "iPhone 14", "Galaxy S23"
+    brands.update(span.text.title() for span in brand_spans)
+    product_names.update(span.text.title() for span in product_spans)
+
+def report_entities(entities, brands, product_names):
+    """Print the entity, brand and product summary"""
+    print(f"Total entities extracted: {len(entities)}")
+    print(f"Unique brands identified: {len(brands)}")
+    print(f"Unique products identified: {len(product_names)}")
     
     # Display entity statistics
-    if not entities_df.empty:
+    if not entities.empty:
         print("\nEntity types found:")
-        entity_counts = entities_df['label'].value_counts()
-        print(entity_counts)
+        for label, count in entities.label_counts().most_common():
+            print(f"  {label}: {count}")
         
         print("\nMost common entities:")
-        entity_text_counts = entities_df['text'].value_counts().head(10)
-        print(entity_text_counts)
-    
-    return entities_df, brands, product_names
+        for text, count in entities.text_counts().most_common(10):
+            print(f"  {text}: {count}")
 
-def rule_based_sentiment_analysis(df):
-    """Perform rule-based sentiment analysis"""
+def unused_pipes(nlp):
+    """Names of loaded pipeline components that entity extraction can skip"""
+    return [name for name in NER_UNUSED_PIPES if name in nlp.pipe_names]
+
+def iter_reviews(source):
+    """Yield review texts from a file (one review per line) or any iterable"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+    else:
+        yield from source
+
+def stream_named_entity_recognition(nlp, reviews, output_path, batch_size=1000, n_process=1):
+    """Run NER over an arbitrarily large corpus, writing entity rows to CSV as it goes
+    
+    Only per-label counts are kept in memory, so memory use stays flat
+    regardless of corpus size.
+    """
     print("\n" + "=" * 30)
-    print("SENTIMENT ANALYSIS")
+    print("STREAMING NAMED ENTITY RECOGNITION")
     print("=" * 30)
     
-    # Define positive and negative words
-    positive_words = {
-        'love', 'amazing', 'excellent', 'great', 'fantastic', 'perfect', 
-        'good', 'best', 'awesome', 'wonderful', 'outstanding', 'superb',
-        'recommend', 'satisfied', 'happy', 'pleased', 'impressed'
-    }
+    disabled = unused_pipes(nlp)
+    print(f"Batch size: {batch_size}, processes: {n_process}")
+    print(f"Disabled components: {disabled or 'none'}")
     
-    negative_words = {
-        'hate', 'terrible', 'awful', 'bad', 'worst', 'horrible', 'poor',
-        'disappointed', 'unsatisfied', 'broken', 'cheap', 'overpriced',
-        'slow', 'useless', 'defective', 'waste', 'regret'
+    label_counts = Counter()
+    total_reviews = 0
+    total_entities = 0
+    
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(ENTITY_COLUMNS)
+        
+        docs = nlp.pipe(iter_reviews(reviews), batch_size=batch_size,
+                        n_process=n_process, disable=disabled)
+        for review_id, doc in enumerate(docs, 1):
+            writer.writerows(
+                (review_id, ent.text, ent.label_, ent.start_char, ent.end_char)
+                for ent in doc.ents
+            )
+            label_counts.update(ent.label_ for ent in doc.ents)
+            total_reviews = review_id
+            total_entities += len(doc.ents)
+            
+            if review_id % (batch_size * 10) == 0:
+                print(f"  Processed {review_id} reviews, {total_entities} entities")
+    
+    print(f"✓ Processed {total_reviews} reviews")
+    print(f"✓ Wrote {total_entities} entities to {output_path}")
+    
+    return {
+        "total_reviews": total_reviews,
+        "total_entities": total_entities,
+        "entity_labels": dict(label_counts.most_common()),
+        "entities_path": output_path,
+        "status": "completed"
     }
+
+class LexiconSentimentScorer:
+    """Score whole columns of reviews against the positive/negative lexicon
     
-    sentiments = []
-    sentiment_scores = []
+    Reviews are tokenized column-wise (lowercase + whitespace split), token
+    lookups go through a hashed vocabulary index, and the per-review counts
+    form a sparse review x vocabulary matrix that is dotted with a +1/-1
+    polarity vector.
+    """
     
-    print("Analyzing sentiment for each review...")
+    def __init__(self, positive_words=POSITIVE_WORDS, negative_words=NEGATIVE_WORDS):
+        import pandas as pd
+        
+        positive = sorted(positive_words)
+        negative = sorted(set(negative_words) - set(positive))
+        self.vocabulary = pd.Index(positive + negative)
+        self.n_positive = len(positive)
+        self.polarity = np.concatenate([
+            np.ones(len(positive), dtype=np.int32),
+            -np.ones(len(negative), dtype=np.int32)
+        ])
+    
+    def count_matrix(self, texts):
+        """Sparse (n_reviews, vocabulary) matrix of lexicon word counts"""
+        import pandas as pd
+        from scipy import sparse
+        
+        texts = pd.Series(texts, dtype=object).reset_index(drop=True)
+        tokens = texts.str.lower().str.split().explode()
+        codes = self.vocabulary.get_indexer(tokens.to_numpy())
+        hits = codes >= 0
+        rows = tokens.index.to_numpy()[hits]
+        return sparse.csr_matrix(
+            (np.ones(hits.sum(), dtype=np.int32), (rows, codes[hits])),
+            shape=(len(texts), len(self.vocabulary))
+        )
     
-    for idx, review in enumerate(df['review_text']):
-        words = review.lower().split()
+    def score(self, texts, chunk_size=100_000):
+        """Return (scores, positive_counts, negative_counts) as int arrays"""
+        import pandas as pd
         
-        positive_count = sum(1 for word in words if word in positive_words)
-        negative_count = sum(1 for word in words if word in negative_words)
+        texts = pd.Series(texts, dtype=object)
+        scores = np.empty(len(texts), dtype=np.int32)
+        positive_counts = np.empty(len(texts), dtype=np.int32)
+        negative_counts = np.empty(len(texts), dtype=np.int32)
         
-        # Calculate sentiment score
-        sentiment_score = positive_count - negative_count
-        sentiment_scores.append(sentiment_score)
+        for start in range(0, len(texts), chunk_size):
+            stop = min(start + chunk_size, len(texts))
+            counts = self.count_matrix(texts.iloc[start:stop])
+            scores[start:stop] = counts @ self.polarity
+            positive_counts[start:stop] = counts[:, :self.n_positive].sum(axis=1).A1
+            negative_counts[start:stop] = counts[:, self.n_positive:].sum(axis=1).A1
         
-        # Determine sentiment label
-        if sentiment_score > 0:
-            sentiment = 'Positive'
-        elif sentiment_score < 0:
-            sentiment = 'Negative'
-        else:
-            sentiment = 'Neutral'
+        return scores, positive_counts, negative_counts
+
+class ReviewSignals:
+    """spaCy pipeline component that annotates each Doc with brand hits and sentiment
+    
+    The sentiment lexicon is compiled into the BrandMatcher's PhraseMatcher,
+    so one matcher scan over the Doc the tokenizer already produced yields
+    brand, product-line and lexicon hits; a review is tokenized once for NER,
+    brand matching and sentiment. Results are stored as a ReviewSignalValues
+    in doc._.review_signals: brand_hits and product_hits as (start, end) token
+    offsets, plus positive_count, negative_count and sentiment_score.
+    
+    A lexicon hit counts only when its token is a whole whitespace-delimited
+    word, exactly as LexiconSentimentScorer counts `text.lower().split()`.
+    If the tokenizer would split a lexicon word, counting falls back to
+    rebuilding each word's text.
+    """
+    
+    def __init__(self, nlp, brands=TECH_BRANDS, product_lines=PRODUCT_LINES,
+                 positive_words=POSITIVE_WORDS, negative_words=NEGATIVE_WORDS):
+        from spacy.attrs import IS_SPACE, SPACY
+        
+        self.brand_matcher = BrandMatcher(nlp, brands, product_lines)
+        self.attrs = [SPACY, IS_SPACE]
+        positive = set(positive_words)
+        negative = set(negative_words) - positive
+        self.word_polarity = {word: 1 for word in positive}
+        self.word_polarity.update({word: -1 for word in negative})
+        self.split_words = [
+            word for word in self.word_polarity
+            if any(len(nlp.tokenizer(form)) > 1 for form in (word, word.title(), word.upper()))
+        ]
         
-        sentiments.append(sentiment)
+        phrase_matcher = self.brand_matcher.matcher
+        phrase_matcher.add("POSITIVE", list(nlp.tokenizer.pipe(sorted(positive))))
+        phrase_matcher.add("NEGATIVE", list(nlp.tokenizer.pipe(sorted(negative))))
+        self.polarity_keys = {nlp.vocab.strings["POSITIVE"]: 1, nlp.vocab.strings["NEGATIVE"]: -1}
+    
+    def lexicon_counts(self, doc, matches):
+        """(positive, negative) lexicon word counts of a Doc from its matcher hits"""
+        if self.split_words:
+            return self._count_words(doc)
+        hits = [(self.polarity_keys[match_id], start) for match_id, start, end in matches
+                if match_id in self.polarity_keys]
+        if not hits:
+            return 0, 0
         
-        print(f"Review {idx+1}: {sentiment} (Score: {sentiment_score})")
-        print(f"  Positive words: {positive_count}, Negative words: {negative_count}")
-        print(f"  Text: {review[:80]}...")
-        print()
+        # A hit counts when its token is a whole whitespace-delimited word: it
+        # starts the Doc or follows a trailing space or space token, and ends
+        # the Doc or has a trailing space or precedes a space token
+        spacing = doc.to_array(self.attrs).tolist()
+        last = len(spacing) - 1
+        positive = negative = 0
+        for polarity, i in hits:
+            if ((i == 0 or any(spacing[i - 1]))
+                    and (i == last or spacing[i][0] or spacing[i + 1][1])):
+                if polarity > 0:
+                    positive += 1
+                else:
+                    negative += 1
+        return positive, negative
+    
+    def _count_words(self, doc):
+        """Exact fallback: rebuild each whitespace-delimited word and look it up"""
+        words = doc.text.lower().split()
+        polarities = [self.word_polarity.get(word, 0) for word in words]
+        return polarities.count(1), polarities.count(-1)
+    
+    def analyze(self, doc):
+        """The ReviewSignalValues of a Doc, without storing them on it"""
+        matches = self.brand_matcher.matcher(doc)
+        brand_hits, product_hits = self.brand_matcher.find_offsets(doc, matches)
+        positive, negative = self.lexicon_counts(doc, matches)
+        return ReviewSignalValues(brand_hits, product_hits, positive, negative, positive - negative)
+    
+    def __call__(self, doc):
+        doc._.review_signals = self.analyze(doc)
+        return doc
+
+def register_review_signals():
+    """Register the review_signals factory and Doc extension (idempotent)"""
+    from spacy.language import Language
+    from spacy.tokens import Doc
+    
+    if not Doc.has_extension(REVIEW_SIGNALS):
+        Doc.set_extension(REVIEW_SIGNALS, default=None)
+    if not Language.has_factory(REVIEW_SIGNALS):
+        Language.factory(REVIEW_SIGNALS, default_config={"brands": None, "product_lines": None})(
+            lambda nlp, name, brands, product_lines: ReviewSignals(
+                nlp, brands or TECH_BRANDS, product_lines or PRODUCT_LINES
+            )
+        )
+
+def add_review_signals(nlp, brands_path=None, product_lines_path=None):
+    """Append the review_signals component (registered on first use) to a pipeline"""
+    register_review_signals()
+    if REVIEW_SIGNALS not in nlp.pipe_names:
+        nlp.add_pipe(REVIEW_SIGNALS, last=True, config={
+            "brands": load_patterns(brands_path) if brands_path else None,
+            "product_lines": load_patterns(product_lines_path) if product_lines_path else None,
+        })
+    return nlp
+
+def process_reviews(nlp, df, batch_size=1000, verbose=False, sketch_capacity=DEFAULT_CAPACITY,
+                    on_batch=None):
+    """NER, brand/product matching and sentiment in a single pass over the reviews
+    
+    Each review is tokenized into one Doc; its entities go into the entity
+    store and its brand hits and lexicon counts come from the review_signals
+    component. The component is called directly rather than from nlp.pipe,
+    which would store its values on every Doc only for them to be read back.
+    `on_batch`, if given, is called with the number of reviews done after
+    every `batch_size` reviews.
+    """
+    print("\n" + "=" * 30)
+    print("NER AND SENTIMENT (SINGLE PASS)")
+    print("=" * 30)
+    
+    import spacy
+    
+    review_signals = add_review_signals(nlp).get_pipe(REVIEW_SIGNALS)
+    builder = EntityStoreBuilder(explain=spacy.explain)
+    brands = SpaceSaving(sketch_capacity)
+    product_names = SpaceSaving(sketch_capacity)
+    lexicon_counts = []
+    
+    print("Processing reviews...")
+    
+    docs = nlp.pipe(df['review_text'], batch_size=batch_size,
+                    disable=unused_pipes(nlp) + [REVIEW_SIGNALS])
+    for doc in docs:
+        signals = review_signals.analyze(doc)
+        builder.add_doc(doc)
+        collect_mentions(
+            doc,
+            [doc[start:end] for start, end in signals.brand_hits],
+            [doc[start:end] for start, end in signals.product_hits],
+            brands, product_names
+        )
+        lexicon_counts.append((signals.positive_count, signals.negative_count))
+        if on_batch and len(lexicon_counts) % batch_size == 0:
+            on_batch(len(lexicon_counts))
+    
+    entities = builder.build()
+    report_entities(entities, brands, product_names)
+    counts = np.array(lexicon_counts, dtype=np.int32).reshape(-1, 2)
+    positive_counts, negative_counts = counts[:, 0], counts[:, 1]
+    add_sentiment(df, positive_counts - negative_counts, positive_counts, negative_counts, verbose)
+    return entities, brands, product_names
+
+def rule_based_sentiment_analysis(df, verbose=False, scorer=None):
+    """Perform rule-based sentiment analysis"""
+    print("\n" + "=" * 30)
+    print("SENTIMENT ANALYSIS")
+    print("=" * 30)
+    
+    scorer = scorer or LexiconSentimentScorer()
+    
+    print("Analyzing sentiment for each review...")
+    
+    sentiment_scores, positive_counts, negative_counts = scorer.score(df['review_text'])
+    return add_sentiment(df, sentiment_scores, positive_counts, negative_counts, verbose)
+
+def add_sentiment(df, sentiment_scores, positive_counts, negative_counts, verbose=False):
+    """Label the scores and add the sentiment columns to the dataframe"""
+    # Determine sentiment labels
+    sentiments = np.select(
+        [sentiment_scores > 0, sentiment_scores < 0],
+        ['Positive', 'Negative'],
+        default='Neutral'
+    )
+    
+    if verbose:
+        for idx, review in enumerate(df['review_text']):
+            print(f"Review {idx+1}: {sentiments[idx]} (Score: {sentiment_scores[idx]})")
+            print(f"  Positive words: {positive_counts[idx]}, Negative words: {negative_counts[idx]}")
+            print(f"  Text: {review[:80]}...")
+            print()
+    else:
+        print(f"Scored {len(df)} reviews")
     
     # Add sentiment to dataframe
     df['sentiment'] = sentiments
@@ -190,7 +533,7 @@ def rule_based_sentiment_analysis(df):
     
     return df
 
-def analyze_results(df, entities_df, brands, product_names):
+def analyze_results(df, entities, brands, product_names):
     """Analyze and summarize the results"""
     print("\n" + "=" * 30)
     print("RESULTS ANALYSIS")
@@ -204,18 +547,24 @@ def analyze_results(df, entities_df, brands, product_names):
     print(f"Negative: {sentiment_counts.get('Negative', 0)/len(df)*100:.1f}%")
     print(f"Neutral: {sentiment_counts.get('Neutral', 0)/len(df)*100:.1f}%")
     
-    # Brand analysis
-    brand_counter = Counter(brands)
+    # Brand analysis: brands and product_names are already SpaceSaving sketches,
+    # which answer most_common like a Counter
+    brand_counter = brands
     print(f"\nTop Brands Mentioned:")
     for brand, count in brand_counter.most_common(5):
         print(f"  {brand}: {count} times")
     
     # Product analysis
-    product_counter = Counter(product_names)
+    product_counter = product_names
     print(f"\nTop Products Mentioned:")
     for product, count in product_counter.most_common(5):
         print(f"  {product}: {count} times")
     
+    for name, sketch in (("Brand", brand_counter), ("Product", product_counter)):
+        if not sketch.exact:
+            print(f"{name} counts are approximate: each may be over by at most "
+                  f"{sketch.error_bound:.0f} of {sketch.total} mentions")
+    
     return sentiment_counts, brand_counter, product_counter
 
 def visualize_results(df, sentiment_counts, brand_counter):
@@ -224,46 +573,61 @@ def visualize_results(df, sentiment_counts, brand_counter):
     print("VISUALIZATION")
     print("=" * 30)
     
-    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-    
-    # Sentiment distribution pie chart
-    axes[0, 0].pie(sentiment_counts.values, labels=sentiment_counts.index, autopct='%1.1f%%')
-    axes[0, 0].set_title('Sentiment Distribution')
-    
-    # Sentiment scores histogram
-    axes[0, 1].hist(df['sentiment_score'], bins=10, edgecolor='black')
-    axes[0, 1].set_title('Sentiment Score Distribution')
-    axes[0, 1].set_xlabel('Sentiment Score')
-    axes[0, 1].set_ylabel('Frequency')
-    
-    # Top brands bar chart
-    if brand_counter:
-        top_brands = dict(brand_counter.most_common(5))
-        axes[1, 0].bar(top_brands.keys(), top_brands.values())
-        axes[1, 0].set_title('Top Mentioned Brands')
-        axes[1, 0].set_xlabel('Brand')
-        axes[1, 0].set_ylabel('Mentions')
-        axes[1, 0].tick_params(axis='x', rotation=45)
-    
-    # Sentiment by review length
-    df['review_length'] = df['review_text'].str.len()
-    sentiment_colors = {'Positive': 'green', 'Negative': 'red', 'Neutral': 'gray'}
-    for sentiment in df['sentiment'].unique():
-        mask = df['sentiment'] == sentiment
-        axes[1, 1].scatter(df[mask]['review_length'], df[mask]['sentiment_score'], 
-                          c=sentiment_colors[sentiment], label=sentiment, alpha=0.7)
-    
-    axes[1, 1].set_title('Sentiment Score vs Review Length')
-    axes[1, 1].set_xlabel('Review Length (characters)')
-    axes[1, 1].set_ylabel('Sentiment Score')
-    axes[1, 1].legend()
-    
-    plt.tight_layout()
-    plt.show()
+    if not plotting.enabled():
+        print("Headless mode: skipping visualizations")
+        return
+    
+    import pandas as pd
+    
+    # Snapshot the plotted data so rendering can run in the background
+    plot_df = pd.DataFrame({
+        'review_length': df['review_text'].str.len(),
+        'sentiment': df['sentiment'],
+        'sentiment_score': df['sentiment_score']
+    })
+    sentiment_counts = sentiment_counts.copy()
+    top_brands = dict(brand_counter.most_common(5))
+    
+    def draw(plt):
+        fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+        
+        # Sentiment distribution pie chart
+        axes[0, 0].pie(sentiment_counts.values, labels=sentiment_counts.index, autopct='%1.1f%%')
+        axes[0, 0].set_title('Sentiment Distribution')
+        
+        # Sentiment scores histogram
+        axes[0, 1].hist(plot_df['sentiment_score'], bins=10, edgecolor='black')
+        axes[0, 1].set_title('Sentiment Score Distribution')
+        axes[0, 1].set_xlabel('Sentiment Score')
+        axes[0, 1].set_ylabel('Frequency')
+        
+        # Top brands bar chart
+        if top_brands:
+            axes[1, 0].bar(top_brands.keys(), top_brands.values())
+            axes[1, 0].set_title('Top Mentioned Brands')
+            axes[1, 0].set_xlabel('Brand')
+            axes[1, 0].set_ylabel('Mentions')
+            axes[1, 0].tick_params(axis='x', rotation=45)
+        
+        # Sentiment by review length
+        sentiment_colors = {'Positive': 'green', 'Negative': 'red', 'Neutral': 'gray'}
+        for sentiment in plot_df['sentiment'].unique():
+            mask = plot_df['sentiment'] == sentiment
+            axes[1, 1].scatter(plot_df[mask]['review_length'], plot_df[mask]['sentiment_score'], 
+                              c=sentiment_colors[sentiment], label=sentiment, alpha=0.7)
+        
+        axes[1, 1].set_title('Sentiment Score vs Review Length')
+        axes[1, 1].set_xlabel('Review Length (characters)')
+        axes[1, 1].set_ylabel('Sentiment Score')
+        axes[1, 1].legend()
+        
+        plt.tight_layout()
+    
+    plotting.render("task3_dashboard", draw)
     
     print("✓ Visualizations created!")
 
-def display_sample_outputs(df, entities_df):
+def display_sample_outputs(df, entities):
     """Display sample outputs showing extracted entities and sentiment"""
     print("\n" + "=" * 30)
     print("SAMPLE OUTPUTS")
@@ -278,91 +642,147 @@ def display_sample_outputs(df, entities_df):
         print(f"Text: {review['review_text']}")
         print(f"Sentiment: {review['sentiment']} (Score: {review['sentiment_score']})")
         
-        # Show entities for this review
-        review_entities = entities_df[entities_df['review_id'] == i+1] if not entities_df.empty else pd.DataFrame()
-        if not review_entities.empty:
+        # Show entities for this review (an O(1) offset lookup in the store)
+        review_entities = entities.entities_for(i + 1)
+        if review_entities:
             print("Extracted Entities:")
-            for _, entity in review_entities.iterrows():
+            for entity in review_entities:
                 print(f"  - {entity['text']} ({entity['label']}: {entity['description']})")
         else:
             print("  No formal entities extracted")
         print("-" * 50)
 
-def main():
+def build_results(df, entities, sentiment_counts, brand_counter, product_counter):
+    """Assemble the JSON-serializable results consumed by the web API"""
+    return {
+        "total_reviews": len(df),
+        "sentiment_distribution": {
+            "positive": int(sentiment_counts.get('Positive', 0)),
+            "negative": int(sentiment_counts.get('Negative', 0)),
+            "neutral": int(sentiment_counts.get('Neutral', 0))
+        },
+        "top_brands": [
+            {"brand": brand, "count": count}
+            for brand, count in brand_counter.most_common(5)
+        ],
+        "top_products": [
+            {"product": product, "count": count}
+            for product, count in product_counter.most_common(5)
+        ],
+        "sample_analysis": [
+            {
+                "review": row['review_text'],
+                "sentiment": row['sentiment'],
+                "sentiment_score": int(row['sentiment_score']),
+                "entities": [
+                    {"text": ent['text'], "label": ent['label']}
+                    for ent in entities.entities_for(idx + 1)
+                ]
+            }
+            for idx, row in df.head(3).iterrows()
+        ],
+        "status": "completed"
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="NER and sentiment analysis of product reviews")
+    parser.add_argument("--reviews", help="Stream NER over this file (one review per line)")
+    parser.add_argument("--entities-out", default="entities.csv",
+                        help="CSV file that streamed entity rows are written to")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per nlp.pipe batch")
+    parser.add_argument("--n-process", type=int, default=1, help="Worker processes for nlp.pipe")
+    parser.add_argument("--brands", help="File of brand names to match (one per line)")
+    parser.add_argument("--product-lines", help="File of product-line keywords to match (one per line)")
+    parser.add_argument("--top-k-error", type=float, metavar="EPS",
+                        help="Let brand/product counts overestimate by at most EPS x mentions, "
+                             f"in 1/EPS counters (default: {DEFAULT_CAPACITY} counters)")
+    parser.add_argument("--save-entities", metavar="DIR",
+                        help="Save the columnar entity store to DIR (reload with EntityStore.load)")
+    plotting.add_arguments(parser)
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function to execute the complete NLP workflow"""
+    args = parse_args(argv)
+    plotting.configure(args.headless, args.plot_dir)
+    stages = instrumentation.StageTimer(
+        total=2 if args.reviews else 6, profile_dir=args.profile_stages, script="task3"
+    )
     try:
-        # Step 1: Load spaCy model
-        nlp = load_spacy_model()
+        if args.reviews:
+            with stages.stage("load_model"):
+                nlp = load_spacy_model()
+            with stages.stage("stream_ner", unit="reviews") as stage:
+                results = stream_named_entity_recognition(
+                    nlp, args.reviews, args.entities_out,
+                    batch_size=args.batch_size, n_process=args.n_process
+                )
+                stage.items = results["total_reviews"]
+            stages.print_summary()
+            results['timings'] = stages.summary()
+            events.result(results)
+            return
+        
+        # Step 1: Load spaCy model and add the fused brand/sentiment component
+        with stages.stage("load_model"):
+            nlp = add_review_signals(load_spacy_model(), args.brands, args.product_lines)
         
         # Step 2: Create sample dataset
-        df = create_sample_dataset()
+        with stages.stage("create_dataset", unit="reviews") as stage:
+            df = create_sample_dataset()
+            stage.items = len(df)
         
-        # Step 3: Perform Named Entity Recognition
-        entities_df, brands, product_names = perform_named_entity_recognition(nlp, df)
+        # Step 3: NER, brand/product matching and sentiment in one pass
+        with stages.stage("process_reviews", unit="reviews") as stage:
+            entities, brands, product_names = process_reviews(
+                nlp, df, batch_size=args.batch_size, verbose=True,
+                sketch_capacity=capacity_for_error(args.top_k_error) if args.top_k_error else DEFAULT_CAPACITY
+            )
+            stage.items = len(df)
+            if args.save_entities:
+                entities.save(args.save_entities)
+                print(f"✓ Saved entity store to {args.save_entities}")
         
-        # Step 4: Perform sentiment analysis
-        df = rule_based_sentiment_analysis(df)
+        # Step 4: Analyze results
+        with stages.stage("analyze"):
+            sentiment_counts, brand_counter, product_counter = analyze_results(
+                df, entities, brands, product_names
+            )
         
-        # Step 5: Analyze results
-        sentiment_counts, brand_counter, product_counter = analyze_results(
-            df, entities_df, brands, product_names
-        )
+        # Step 5: Create visualizations
+        with stages.stage("visualize"):
+            visualize_results(df, sentiment_counts, brand_counter)
         
-        # Step 6: Create visualizations
-        visualize_results(df, sentiment_counts, brand_counter)
+        # Step 6: Display sample outputs
+        with stages.stage("sample_outputs"):
+            display_sample_outputs(df, entities)
+            plotting.wait_for_plots()
         
-        # Step 7: Display sample outputs
-        display_sample_outputs(df, entities_df)
+        stages.print_summary()
         
         print("\n" + "=" * 50)
         print("TASK 3 COMPLETED SUCCESSFULLY!")
         print("Key Achievements:")
         print(f"  - Processed {len(df)} reviews")
-        print(f"  - Extracted {len(set(brands))} unique brands")
-        print(f"  - Identified {len(set(product_names))} unique products")
+        print(f"  - Extracted {len(brands)} unique brands")
+        print(f"  - Identified {len(product_names)} unique products")
         print(f"  - Analyzed sentiment for all reviews")
         print("=" * 50)
         
         # Return JSON results for API
-        results = {
-            "total_reviews": len(df),
-            "sentiment_distribution": {
-                "positive": int(sentiment_counts.get('Positive', 0)),
-                "negative": int(sentiment_counts.get('Negative', 0)),
-                "neutral": int(sentiment_counts.get('Neutral', 0))
-            },
-            "top_brands": [
-                {"brand": brand, "count": count}
-                for brand, count in brand_counter.most_common(5)
-            ],
-            "top_products": [
-                {"product": product, "count": count}
-                for product, count in product_counter.most_common(5)
-            ],
-            "sample_analysis": [
-                {
-                    "review": row['review_text'],
-                    "sentiment": row['sentiment'],
-                    "sentiment_score": int(row['sentiment_score']),
-                    "entities": [
-                        {"text": ent['text'], "label": ent['label']}
-                        for _, ent in entities_df[entities_df['review_id'] == idx + 1].iterrows()
-                    ] if not entities_df.empty else []
-                }
-                for idx, row in df.head(3).iterrows()
-            ],
-            "status": "completed"
-        }
-        
-        # Print JSON results at the end for API to capture
-        print("\n" + "=" * 50)
-        print("JSON RESULTS:")
-        print("=" * 50)
-        print(json.dumps(results, indent=2))
+        results = build_results(df, entities, sentiment_counts, brand_counter, product_counter)
+        if args.save_entities:
+            results['entities_path'] = args.save_entities
+        results['timings'] = stages.summary()
+        
+        # Publish results on the event channel (or print them for CLI users)
+        events.result(results)
         
-        return df, entities_df
+        return df, entities
         
     except Exception as e:
+        events.error(e)
         print(f"Error occurred: {str(e)}")
         import traceback
         traceback.print_exc()
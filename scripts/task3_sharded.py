@@ -0,0 +1,494 @@
+"""
+Task 3 Sharded: Map-reduce execution of the review NER and sentiment workflow
+Reviews are split into file shards that any worker process (on any machine sharing the job directory) can claim
+Goal: Scale task 3 across processes and nodes, then reduce partials into the usual results JSON
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import socket
+import time
+import uuid
+
+import events
+
+MANIFEST_FILE = "manifest.json"
+PARTIAL_FILE = "partial.json"
+FORMAT_VERSION = 1
+SHARD_SIZE = 10000
+LEASE_SECONDS = 15 * 60
+# Rounds of mapping run_local tries before giving up on shards whose worker failed
+MAP_ATTEMPTS = 3
+SAMPLE_COUNT = 3
+
+# Job directory layout; every path in the protocol is relative to the job directory:
+#   manifest.json                    shard list and the matcher/sketch settings for workers
+#   shards/shard-NNNNN.jsonl         one JSON-encoded review per line
+#   claims/shard-NNNNN.claim         created exclusively by the worker that maps the shard;
+#                                    its mtime is the lease, renewed after every review batch
+#   partials/shard-NNNNN/            partial.json plus the shard's entity store, published atomically
+#   entities/                        the reduced entity store
+
+
+def _shard_name(index):
+    return f"shard-{index:05d}"
+
+
+def _claim_path(job_dir, name):
+    return os.path.join(job_dir, "claims", f"{name}.claim")
+
+
+def _partial_dir(job_dir, name):
+    return os.path.join(job_dir, "partials", name)
+
+
+def load_manifest(job_dir):
+    with open(os.path.join(job_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard job format in {job_dir}: {manifest.get('format_version')}")
+    return manifest
+
+
+def split_reviews(reviews, job_dir, shard_size=SHARD_SIZE, brands=None, product_lines=None,
+                  sketch_capacity=None):
+    """Write reviews into shard files and the job manifest; returns the manifest
+
+    `reviews` is any iterable of review texts (or a file path, one review per
+    line) and is consumed in a single streaming pass. Matcher patterns and
+    the sketch capacity are recorded so every worker uses the same settings.
+    """
+    from task3_nlp_spacy import iter_reviews
+    from topk_sketch import DEFAULT_CAPACITY
+
+    if os.path.exists(os.path.join(job_dir, MANIFEST_FILE)):
+        raise FileExistsError(f"{job_dir} already holds a shard job")
+    os.makedirs(os.path.join(job_dir, "shards"), exist_ok=True)
+
+    shards = []
+    shard_file = None
+    total = 0
+    try:
+        for text in iter_reviews(reviews):
+            if total % shard_size == 0:
+                if shard_file:
+                    shard_file.close()
+                name = _shard_name(len(shards))
+                path = os.path.join("shards", f"{name}.jsonl")
+                shards.append({"name": name, "path": path, "first_review_id": total + 1, "reviews": 0})
+                shard_file = open(os.path.join(job_dir, path), "w", encoding="utf-8")
+            shard_file.write(json.dumps(text) + "\n")
+            shards[-1]["reviews"] += 1
+            total += 1
+    finally:
+        if shard_file:
+            shard_file.close()
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "total_reviews": total,
+        "shard_size": shard_size,
+        "shards": shards,
+        "brands": brands,
+        "product_lines": product_lines,
+        "sketch_capacity": sketch_capacity or DEFAULT_CAPACITY,
+        "created_at": time.time(),
+    }
+    with open(os.path.join(job_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Split {total} reviews into {len(shards)} shards in {job_dir}")
+    return manifest
+
+
+def read_shard(job_dir, shard):
+    """The reviews of one shard as a task 3 DataFrame"""
+    import pandas as pd
+
+    with open(os.path.join(job_dir, shard["path"]), encoding="utf-8") as f:
+        texts = [json.loads(line) for line in f]
+    first = shard["first_review_id"]
+    return pd.DataFrame({"review_id": range(first, first + len(texts)), "review_text": texts})
+
+
+def _create_claim(path, claim):
+    """Create the claim file exclusively; False when it already exists"""
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(claim)
+    return True
+
+
+def _take_over(path, observed_mtime_ns):
+    """Atomically retire an expired claim; False when another worker got there first
+
+    The claim is renamed to a unique name, so of several workers that found
+    it expired only one rename succeeds. If the renamed file is not the claim
+    that was judged expired (it was renewed or replaced in between), it is
+    linked back into place and the takeover is abandoned.
+    """
+    retired = f"{path}.stale-{uuid.uuid4().hex}"
+    try:
+        os.rename(path, retired)
+    except FileNotFoundError:
+        return False
+    try:
+        if os.stat(retired).st_mtime_ns != observed_mtime_ns:
+            with contextlib.suppress(OSError):
+                os.link(retired, path)
+            return False
+        return True
+    finally:
+        os.remove(retired)
+
+
+def claim_shard(job_dir, shard, worker_id, lease_seconds=LEASE_SECONDS):
+    """Try to take a shard; True when this worker should map it
+
+    Claims are files created with O_EXCL, which is atomic on local disks and
+    NFS alike. A claim older than the lease whose shard never produced a
+    partial is taken to belong to a dead worker: it is retired by an atomic
+    rename (see _take_over) and a fresh claim is created, so racing workers
+    cannot both take it over. If two workers do end up mapping one shard,
+    both compute the same partial and only the first to publish it is kept.
+    """
+    name = shard["name"]
+    if os.path.exists(_partial_dir(job_dir, name)):
+        return False
+    path = _claim_path(job_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    claim = json.dumps({"worker": worker_id, "host": socket.gethostname(),
+                        "pid": os.getpid(), "claimed_at": time.time()})
+    if _create_claim(path, claim):
+        return True
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        # Released since we looked; compete for it like a new shard
+        return _create_claim(path, claim)
+    if time.time() - mtime_ns / 1e9 <= lease_seconds:
+        return False
+    if not _take_over(path, mtime_ns):
+        return False
+    print(f"Reclaiming {name}: its claim is older than {lease_seconds}s")
+    return _create_claim(path, claim)
+
+
+def release_claim(job_dir, shard, worker_id=None):
+    """Remove a claim so the shard can be mapped again; True when one was removed
+
+    With `worker_id`, only a claim held by that worker is removed.
+    """
+    path = _claim_path(job_dir, shard["name"])
+    if worker_id is not None:
+        try:
+            with open(path) as f:
+                owner = json.load(f).get("worker")
+        except (FileNotFoundError, ValueError):
+            return False
+        if owner != worker_id:
+            return False
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def renew_claim(job_dir, shard):
+    """Push back the expiry of this worker's claim on a shard it is still mapping"""
+    try:
+        os.utime(_claim_path(job_dir, shard["name"]))
+    except FileNotFoundError:
+        pass
+
+
+def map_shard(nlp, job_dir, shard, manifest, worker_id=None):
+    """Run NER, brand matching and sentiment over one shard and publish its partial
+
+    The shard's claim is renewed after every review batch, so a slow shard is
+    not reclaimed while its worker is alive; the lease only has to outlast one batch.
+    """
+    import task3_nlp_spacy as task3
+
+    start = time.perf_counter()
+    df = read_shard(job_dir, shard)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        entities, brands, product_names = task3.process_reviews(
+            nlp, df, sketch_capacity=manifest["sketch_capacity"],
+            on_batch=lambda done: renew_claim(job_dir, shard)
+        )
+        # Sentiment counts and sample rows take the same shape as the full run's results
+        summary = task3.build_results(df, entities, df['sentiment'].value_counts(), brands, product_names)
+    entities.first_review_id = shard["first_review_id"]
+    seconds = time.perf_counter() - start
+
+    partial = {
+        "shard": shard["name"],
+        "reviews": len(df),
+        "sentiment_distribution": summary["sentiment_distribution"],
+        "brands": brands.to_dict(),
+        "products": product_names.to_dict(),
+        "samples": summary["sample_analysis"][:SAMPLE_COUNT],
+        "worker": worker_id,
+        "host": socket.gethostname(),
+        "seconds": round(seconds, 3),
+    }
+
+    # Build the partial next to its final path and rename it into place, so a
+    # partial directory only ever exists complete
+    staging = f"{_partial_dir(job_dir, shard['name'])}.tmp-{uuid.uuid4().hex}"
+    entities.save(os.path.join(staging, "entities"))
+    with open(os.path.join(staging, PARTIAL_FILE), "w") as f:
+        json.dump(partial, f)
+    try:
+        os.replace(staging, _partial_dir(job_dir, shard["name"]))
+    except OSError:
+        # Another worker published this shard first
+        shutil.rmtree(staging, ignore_errors=True)
+    return partial
+
+
+def run_worker(job_dir, worker_id=None, max_shards=None, lease_seconds=LEASE_SECONDS):
+    """Claim and map shards until none are left; returns the partials this worker wrote
+
+    spaCy is loaded once per worker, however many shards it maps. Any number
+    of workers, on this machine or others sharing `job_dir`, may run at once.
+    """
+    import task3_nlp_spacy as task3
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    manifest = load_manifest(job_dir)
+    nlp = None
+    partials = []
+    for shard in manifest["shards"]:
+        if max_shards is not None and len(partials) >= max_shards:
+            break
+        if not claim_shard(job_dir, shard, worker_id, lease_seconds):
+            continue
+        if nlp is None:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                nlp = task3.load_spacy_model()
+            task3.register_review_signals()
+            nlp.add_pipe(task3.REVIEW_SIGNALS, last=True, config={
+                "brands": manifest["brands"], "product_lines": manifest["product_lines"]
+            })
+        try:
+            partial = map_shard(nlp, job_dir, shard, manifest, worker_id)
+        except BaseException:
+            # Let another worker (or a retry) map the shard without waiting out the lease
+            release_claim(job_dir, shard, worker_id)
+            raise
+        partials.append(partial)
+        print(f"[{worker_id}] {shard['name']}: {partial['reviews']} reviews in {partial['seconds']:.2f}s")
+    return partials
+
+
+def job_status(job_dir):
+    """(done, claimed, pending) shard names"""
+    manifest = load_manifest(job_dir)
+    done, claimed, pending = [], [], []
+    for shard in manifest["shards"]:
+        name = shard["name"]
+        if os.path.exists(os.path.join(_partial_dir(job_dir, name), PARTIAL_FILE)):
+            done.append(name)
+        elif os.path.exists(_claim_path(job_dir, name)):
+            claimed.append(name)
+        else:
+            pending.append(name)
+    return done, claimed, pending
+
+
+def reduce_partials(job_dir):
+    """Combine every shard's partial result into task 3's results JSON
+
+    Sentiment counts add up, brand/product sketches merge and the shards'
+    entity stores are concatenated into <job_dir>/entities.
+    """
+    manifest = load_manifest(job_dir)
+    done, claimed, pending = job_status(job_dir)
+    if claimed or pending:
+        raise RuntimeError(f"{len(claimed) + len(pending)} of {len(manifest['shards'])} shards "
+                           f"have no partial result yet")
+
+    from entity_store import EntityStore
+    from topk_sketch import SpaceSaving
+
+    sentiment = {"positive": 0, "negative": 0, "neutral": 0}
+    brands = SpaceSaving(manifest["sketch_capacity"])
+    products = SpaceSaving(manifest["sketch_capacity"])
+    samples, stores, map_seconds, workers = [], [], 0.0, set()
+    for shard in manifest["shards"]:
+        directory = _partial_dir(job_dir, shard["name"])
+        with open(os.path.join(directory, PARTIAL_FILE)) as f:
+            partial = json.load(f)
+        for label, count in partial["sentiment_distribution"].items():
+            sentiment[label] += count
+        brands.merge(SpaceSaving.from_dict(partial["brands"]))
+        products.merge(SpaceSaving.from_dict(partial["products"]))
+        samples.extend(partial["samples"][:SAMPLE_COUNT - len(samples)])
+        stores.append(EntityStore.load(os.path.join(directory, "entities")))
+        map_seconds += partial["seconds"]
+        workers.add(partial["worker"])
+
+    for label, sketch in (("Brand", brands), ("Product", products)):
+        if not sketch.exact:
+            print(f"{label} counts are approximate: each may be over by at most "
+                  f"{sketch.error_bound:.0f} of {sketch.total} mentions")
+
+    entities_path = os.path.join(job_dir, "entities")
+    shutil.rmtree(entities_path, ignore_errors=True)
+    entities = EntityStore.concat(stores)
+    entities.save(entities_path)
+
+    return {
+        "total_reviews": manifest["total_reviews"],
+        "sentiment_distribution": sentiment,
+        "top_brands": [{"brand": brand, "count": count} for brand, count in brands.most_common(5)],
+        "top_products": [{"product": product, "count": count} for product, count in products.most_common(5)],
+        "sample_analysis": samples,
+        "total_entities": len(entities),
+        "entities_path": entities_path,
+        "shards": len(manifest["shards"]),
+        "workers": len(workers),
+        "map_seconds": round(map_seconds, 2),
+        "status": "completed"
+    }
+
+
+def _map_round(job_dir, worker_ids, lease_seconds):
+    """Run one local worker per id until they stop; returns the errors they raised"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    errors = []
+    if len(worker_ids) == 1:
+        try:
+            run_worker(job_dir, worker_ids[0], lease_seconds=lease_seconds)
+        except Exception as e:
+            errors.append(e)
+        return errors
+    with ProcessPoolExecutor(max_workers=len(worker_ids)) as pool:
+        futures = [pool.submit(run_worker, job_dir, worker_id, None, lease_seconds) for worker_id in worker_ids]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+    return errors
+
+
+def run_local(job_dir, workers=1, lease_seconds=LEASE_SECONDS, attempts=MAP_ATTEMPTS):
+    """Map every shard with a local process pool, then reduce
+
+    When a worker fails, every local worker has stopped by the end of the
+    round, so the claims they still hold are released and the unmapped
+    shards are retried, up to `attempts` rounds in all.
+    """
+    start = time.perf_counter()
+    worker_ids = [f"local-{i}" for i in range(workers)]
+    for attempt in range(1, attempts + 1):
+        errors = _map_round(job_dir, worker_ids, lease_seconds)
+        if not errors:
+            break
+        done = set(job_status(job_dir)[0])
+        for shard in load_manifest(job_dir)["shards"]:
+            if shard["name"] not in done:
+                for worker_id in worker_ids:
+                    release_claim(job_dir, shard, worker_id)
+        if attempt == attempts:
+            raise errors[0]
+        print(f"{len(errors)} worker(s) failed ({errors[0]}); retrying unmapped shards")
+    results = reduce_partials(job_dir)
+    seconds = time.perf_counter() - start
+    results["wall_seconds"] = round(seconds, 2)
+    results["reviews_per_sec"] = round(results["total_reviews"] / seconds) if seconds > 0 else None
+    return results
+
+
+def _review_source(args):
+    if args.reviews:
+        return args.reviews
+    from task3_nlp_spacy import synthetic_reviews
+    return synthetic_reviews(args.synthetic)["review_text"]
+
+
+def _add_split_arguments(parser):
+    parser.add_argument("job_dir", help="Job directory shared by every worker")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--reviews", help="File with one review per line")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Generate N synthetic reviews")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Reviews per shard")
+    parser.add_argument("--brands", help="File of brand names to match (one per line)")
+    parser.add_argument("--product-lines", help="File of product-line keywords to match (one per line)")
+    parser.add_argument("--top-k-error", type=float, metavar="EPS",
+                        help="Error bound of the brand/product top-K sketches")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded map-reduce execution of task 3")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split_parser = commands.add_parser("split", help="Write reviews into shards and a job manifest")
+    _add_split_arguments(split_parser)
+
+    work_parser = commands.add_parser("work", help="Claim and map shards until none are left")
+    work_parser.add_argument("job_dir")
+    work_parser.add_argument("--worker-id", help="Name recorded in claims and partials")
+    work_parser.add_argument("--max-shards", type=int, help="Stop after mapping this many shards")
+    work_parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS,
+                             help="Age after which an unfinished claim is taken over")
+
+    reduce_parser = commands.add_parser("reduce", help="Combine the partial results")
+    reduce_parser.add_argument("job_dir")
+
+    status_parser = commands.add_parser("status", help="Count done, claimed and pending shards")
+    status_parser.add_argument("job_dir")
+
+    run_parser = commands.add_parser("run", help="Split, map with a local process pool and reduce")
+    _add_split_arguments(run_parser)
+    run_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command in ("split", "run"):
+        from task3_nlp_spacy import load_patterns
+        from topk_sketch import capacity_for_error
+
+        split_reviews(
+            _review_source(args), args.job_dir, args.shard_size,
+            brands=load_patterns(args.brands) if args.brands else None,
+            product_lines=load_patterns(args.product_lines) if args.product_lines else None,
+            sketch_capacity=capacity_for_error(args.top_k_error) if args.top_k_error else None
+        )
+    if args.command == "work":
+        partials = run_worker(args.job_dir, args.worker_id, args.max_shards, args.lease_seconds)
+        print(f"Mapped {len(partials)} shards")
+    elif args.command == "status":
+        done, claimed, pending = job_status(args.job_dir)
+        print(f"done: {len(done)}  claimed: {len(claimed)}  pending: {len(pending)}")
+    elif args.command in ("reduce", "run"):
+        try:
+            if args.command == "run":
+                events.progress("map", step=1, total=2)
+                results = run_local(args.job_dir, args.workers)
+                print(f"Mapped and reduced {results['total_reviews']} reviews with {args.workers} workers "
+                      f"in {results['wall_seconds']:.2f}s ({results['reviews_per_sec']:,} reviews/s)")
+            else:
+                events.progress("reduce", step=1, total=1)
+                results = reduce_partials(args.job_dir)
+            events.result(results)
+        except Exception as e:
+            events.error(e)
+            raise
+
+
+if __name__ == "__main__":
+    main()
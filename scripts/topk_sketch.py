@@ -0,0 +1,180 @@
+"""
+Top-K Sketch: Bounded-memory heavy-hitter counting with the Space-Saving algorithm
+Counts brand/product mentions in at most `capacity` counters, mergeable across shards
+Goal: Counter-compatible top-K whose memory does not grow with the corpus
+"""
+
+import heapq
+import itertools
+import math
+
+DEFAULT_CAPACITY = 1024
+
+
+def capacity_for_error(error):
+    """Counters needed so no count is overestimated by more than error * total"""
+    if not 0 < error < 1:
+        raise ValueError(f"error must be between 0 and 1, got {error}")
+    return math.ceil(1 / error)
+
+
+class SpaceSaving:
+    """Space-Saving top-K counter (Metwally et al.) with a Counter-like interface
+
+    At most `capacity` items are tracked. While fewer distinct items than that
+    have been seen every count is exact, and `most_common` orders ties by first
+    appearance just like collections.Counter. Once the sketch is full, a new
+    item replaces the item with the smallest count and inherits that count as
+    its error, so each reported count c of an item with true count n satisfies
+    n <= c <= n + error(item) <= n + total / capacity, and every item occurring
+    more than total / capacity times is tracked.
+
+    Sketches of different shards combine with `merge` (Agarwal et al.,
+    "Mergeable Summaries"), which keeps the same bound over the combined total.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # Set once a merge has dropped counters, which leaves no per-item error behind
+        self.truncated = False
+        # Lazy min-heap of (count, seq, item), only kept once the sketch is full
+        self._heap = None
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_error(cls, error):
+        """A sketch whose counts are overestimated by at most error * total"""
+        return cls(capacity_for_error(error))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def __getitem__(self, item):
+        return self.counts.get(item, 0)
+
+    @property
+    def exact(self):
+        """True while no item has been evicted or dropped, i.e. every count is exact"""
+        return not self.truncated and not any(self.errors.values())
+
+    @property
+    def error_bound(self):
+        """Largest possible overestimate of any reported count"""
+        return 0 if self.exact else self.total / self.capacity
+
+    def error(self, item):
+        """How much the count of `item` may be overestimated"""
+        return self.errors.get(item, 0)
+
+    def add(self, item, count=1):
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            if self._heap is not None:
+                self._push(item)
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            if len(counts) == self.capacity:
+                self._rebuild_heap()
+            return
+
+        floor, evicted = self._pop_min()
+        del counts[evicted]
+        del self.errors[evicted]
+        counts[item] = floor + count
+        self.errors[item] = floor
+        self._push(item)
+
+    def update(self, items):
+        """Count every item of an iterable, like Counter.update"""
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        """Fold another sketch (e.g. from another shard) into this one; returns self
+
+        An item tracked by only one sketch may have occurred up to the other
+        sketch's minimum count there, so that minimum is added to its count
+        and error before the combined counters are cut back to `capacity`.
+        """
+        own_floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for item, count in self.counts.items():
+            counts[item] = count + other.counts.get(item, other_floor)
+            errors[item] = self.errors[item] + other.errors.get(item, other_floor)
+        for item, count in other.counts.items():
+            if item not in counts:
+                counts[item] = count + own_floor
+                errors[item] = other.errors[item] + own_floor
+
+        if len(counts) > self.capacity:
+            self.truncated = True
+            keep = set(heapq.nlargest(self.capacity, counts, key=counts.get))
+            counts = {item: count for item, count in counts.items() if item in keep}
+            errors = {item: errors[item] for item in counts}
+        self.counts, self.errors = counts, errors
+        self.truncated = self.truncated or other.truncated
+        self.total += other.total
+        self._heap = None
+        if len(counts) == self.capacity:
+            self._rebuild_heap()
+        return self
+
+    def most_common(self, n=None):
+        """(item, count) pairs from the highest count down, like Counter.most_common"""
+        if n is None:
+            return sorted(self.counts.items(), key=lambda pair: pair[1], reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=lambda pair: pair[1])
+
+    def to_dict(self):
+        """JSON-serializable form, e.g. for a shard's partial result"""
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "truncated": self.truncated,
+            "items": [[item, count, self.errors[item]] for item, count in self.counts.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["capacity"])
+        sketch.total = data["total"]
+        sketch.truncated = data.get("truncated", False)
+        for item, count, error in data["items"]:
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+        if len(sketch.counts) >= sketch.capacity:
+            sketch._rebuild_heap()
+        return sketch
+
+    def _floor(self):
+        """Most an untracked item can have occurred: the minimum count once full"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def _push(self, item):
+        heapq.heappush(self._heap, (self.counts[item], next(self._seq), item))
+        # Each increment leaves a stale entry behind; compact before they pile up
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(count, next(self._seq), item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        """Remove and return (count, item) of a currently smallest counter"""
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
@@ -0,0 +1,186 @@
+"""
+Tree Predictor: Array-based serving path for the task 1 decision tree
+Flattens a fitted DecisionTreeClassifier into contiguous NumPy arrays
+Goal: Predict whole ndarray batches without DataFrames or per-row Python
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+LEAF = -1
+# Rows traversed together; keeps the per-level temporaries cache-resident
+BLOCK_ROWS = 65536
+
+
+def _depth(left, right):
+    """Number of edges on the longest root-to-leaf path"""
+    depth = np.zeros(len(left), dtype=np.int64)
+    # Children always have larger ids than their parent in sklearn trees
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max()) if len(depth) else 0
+
+
+class FlatTree:
+    """A fitted decision tree as parallel node arrays
+
+    Node i tests `X[:, feature[i]] <= threshold[i]` and moves to `left[i]`
+    or `right[i]`; leaves have feature == LEAF and predict `value[i]`.
+    Inputs are cast to float32 and compared against float64 thresholds,
+    exactly as scikit-learn does, so predictions match bit for bit.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, missing_left, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_left = missing_left
+        self.classes = classes
+        self.n_features = n_features
+        self.depth = _depth(left, right)
+
+        # Leaves point back to themselves, so every row can take exactly
+        # `depth` steps with no per-level compaction of finished rows
+        is_leaf = feature == LEAF
+        node_ids = np.arange(len(feature), dtype=np.intp)
+        self._feature = np.where(is_leaf, 0, feature).astype(np.intp)
+        self._left = np.where(is_leaf, node_ids, left).astype(np.intp)
+        self._right = np.where(is_leaf, node_ids, right).astype(np.intp)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted single-output DecisionTreeClassifier"""
+        tree = model.tree_
+        is_leaf = tree.children_left == -1
+        missing = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+        return cls(
+            feature=np.where(is_leaf, LEAF, tree.feature).astype(np.int32),
+            threshold=np.ascontiguousarray(tree.threshold, dtype=np.float64),
+            left=np.ascontiguousarray(tree.children_left, dtype=np.int32),
+            right=np.ascontiguousarray(tree.children_right, dtype=np.int32),
+            # Same argmax (first maximum wins) that DecisionTreeClassifier.predict uses
+            value=np.argmax(tree.value[:, 0, :], axis=1).astype(np.int32),
+            missing_left=np.asarray(missing, dtype=bool),
+            classes=np.asarray(model.classes_),
+            n_features=int(tree.n_features)
+        )
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                 value=self.value, missing_left=self.missing_left, classes=self.classes,
+                 n_features=self.n_features)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            fields = {name: arrays[name] for name in arrays.files}
+        fields["n_features"] = int(fields["n_features"])
+        return cls(**fields)
+
+    def apply(self, X, block_rows=BLOCK_ROWS):
+        """Leaf index reached by each row, traversing a block of rows one level at a time"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        X = np.ascontiguousarray(X)
+
+        has_missing = bool(np.isnan(X).any())
+
+        leaves = np.empty(len(X), dtype=np.intp)
+        flat = X.ravel()
+        for start in range(0, len(X), block_rows):
+            n = min(block_rows, len(X) - start)
+            row_offsets = np.arange(start, start + n, dtype=np.intp) * self.n_features
+            nodes = np.zeros(n, dtype=np.intp)
+            for _ in range(self.depth):
+                values = flat.take(row_offsets + self._feature.take(nodes))
+                go_left = values <= self.threshold.take(nodes)
+                if has_missing:
+                    missing = np.isnan(values)
+                    go_left[missing] = self.missing_left.take(nodes[missing])
+                nodes = np.where(go_left, self._left.take(nodes), self._right.take(nodes))
+            leaves[start:start + n] = nodes
+        return leaves
+
+    def predict(self, X):
+        """Predicted class labels for an ndarray batch (or a single row)"""
+        return self.classes[self.value[self.apply(X)]]
+
+
+def _time_per_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def benchmark(model, X, rows=1_000_000, single_repeats=1000, seed=0):
+    """Compare FlatTree.predict with sklearn predict on one row and on `rows` rows"""
+    import pandas as pd
+
+    flat = FlatTree.from_sklearn(model)
+    columns = getattr(model, "feature_names_in_", None)
+
+    # Resample the data with jitter to build a large batch
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=np.float32)
+    big = X[rng.integers(0, len(X), rows)] + rng.normal(0, 0.1, (rows, X.shape[1])).astype(np.float32)
+    big_frame = pd.DataFrame(big, columns=columns)
+    row = big[:1]
+    row_frame = big_frame.iloc[:1]
+
+    sklearn_single = _time_per_call(lambda: model.predict(row_frame), single_repeats)
+    flat_single = _time_per_call(lambda: flat.predict(row), single_repeats)
+    sklearn_batch = _time_per_call(lambda: model.predict(big_frame), 3)
+    flat_batch = _time_per_call(lambda: flat.predict(big), 3)
+
+    identical = bool(np.array_equal(model.predict(big_frame), flat.predict(big)))
+    return {
+        "nodes": int(len(flat.feature)),
+        "depth": int(model.get_depth()),
+        "rows": rows,
+        "identical_predictions": identical,
+        "single_row_us": {"sklearn": round(sklearn_single * 1e6, 1), "flat_tree": round(flat_single * 1e6, 1)},
+        "batch_rows_per_sec": {"sklearn": round(rows / sklearn_batch), "flat_tree": round(rows / flat_batch)},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the flattened decision tree against sklearn")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the large batch")
+    parser.add_argument("--max-depth", type=int, default=5, help="Depth of the task 1 tree")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import task1_iris_classification as task1
+
+    data = task1.load_and_explore_data()
+    X, y = task1.preprocess_data(data)
+    model, _, _, _, _ = task1.train_decision_tree(X, y, max_depth=args.max_depth)
+
+    results = benchmark(model, X, rows=args.rows)
+
+    print("\n" + "=" * 30)
+    print("TREE PREDICTOR BENCHMARK")
+    print("=" * 30)
+    print(f"Tree: {results['nodes']} nodes, depth {results['depth']}")
+    print(f"Identical predictions on {results['rows']:,} rows: {results['identical_predictions']}")
+    for label, key, unit in (("Single row", "single_row_us", "µs"), ("Batch", "batch_rows_per_sec", "rows/s")):
+        sk, flat = results[key]["sklearn"], results[key]["flat_tree"]
+        print(f"{label:<12} sklearn {sk:>12,} {unit}   flat tree {flat:>12,} {unit}")
+
+
+if __name__ == "__main__":
+    main()
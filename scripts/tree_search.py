@@ -0,0 +1,180 @@
+"""
+Tree Search: Parallel cross-validated hyperparameter search for the task 1 decision tree
+Runs stratified k-fold CV over a grid or random space across a process pool
+Goal: Pick tree parameters from data instead of hard-coding them
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import events
+
+# Grid searched by default; random search samples around the same ranges
+PARAM_GRID = {
+    "max_depth": [2, 3, 4, 5, 6, 8, None],
+    "min_samples_split": [2, 5, 10],
+    "min_samples_leaf": [1, 2, 4],
+    "criterion": ["gini", "entropy"],
+}
+DEFAULT_PRUNE_MARGIN = 0.05
+MIN_FOLDS_BEFORE_PRUNING = 2
+
+# Per-process state set once by _init_worker
+_X = None
+_y = None
+_fold_ids = None
+
+
+def grid_candidates(grid=PARAM_GRID):
+    """Every combination of the grid's values"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_candidates(n_iter, seed=42):
+    """`n_iter` distinct parameter sets sampled from the random search space"""
+    rng = np.random.default_rng(seed)
+    candidates = []
+    seen = set()
+    for _ in range(n_iter * 20):
+        if len(candidates) == n_iter:
+            break
+        params = {
+            "max_depth": None if rng.random() < 0.1 else int(rng.integers(2, 13)),
+            "min_samples_split": int(rng.integers(2, 21)),
+            "min_samples_leaf": int(rng.integers(1, 11)),
+            "criterion": str(rng.choice(["gini", "entropy"])),
+        }
+        key = tuple(sorted(params.items(), key=lambda item: item[0]))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def _init_worker(data_dir):
+    """Open the shared arrays once per worker process (memory-mapped, not pickled)"""
+    global _X, _y, _fold_ids
+    _X = np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r")
+    _y = np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r")
+    _fold_ids = np.load(os.path.join(data_dir, "folds.npy"), mmap_mode="r")
+
+
+def _fit_fold(candidate_id, params, fold, random_state):
+    """Fit one candidate on all folds but `fold` and score it on `fold`"""
+    from sklearn.tree import DecisionTreeClassifier
+
+    validation = _fold_ids == fold
+    start = time.perf_counter()
+    model = DecisionTreeClassifier(random_state=random_state, **params)
+    model.fit(_X[~validation], _y[~validation])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    score = float(np.mean(model.predict(_X[validation]) == _y[validation]))
+    score_seconds = time.perf_counter() - start
+    return candidate_id, score, fit_seconds, score_seconds
+
+
+def search_decision_tree(X, y, mode="grid", n_iter=30, cv=5, random_state=42,
+                         prune_margin=DEFAULT_PRUNE_MARGIN, max_workers=None):
+    """Cross-validate decision tree candidates in parallel and return a summary
+
+    Folds are run in rounds: each round scores every surviving candidate on
+    the next fold. After MIN_FOLDS_BEFORE_PRUNING rounds, candidates whose
+    mean accuracy trails the leader by more than `prune_margin` are dropped.
+    """
+    print("\n" + "=" * 30)
+    print("HYPERPARAMETER SEARCH")
+    print("=" * 30)
+
+    from sklearn.model_selection import StratifiedKFold
+
+    candidates = grid_candidates() if mode == "grid" else random_candidates(n_iter, seed=random_state)
+    X = np.ascontiguousarray(X, dtype=np.float32)  # the tree splits on float32 anyway
+    y = np.asarray(y)
+
+    fold_ids = np.empty(len(y), dtype=np.int16)
+    splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    for fold, (_, validation) in enumerate(splitter.split(X, y)):
+        fold_ids[validation] = fold
+
+    scores = [[] for _ in candidates]
+    fit_seconds = [0.0] * len(candidates)
+    score_seconds = [0.0] * len(candidates)
+    pruned_after = [None] * len(candidates)
+    alive = list(range(len(candidates)))
+
+    print(f"{mode.capitalize()} search: {len(candidates)} candidates x {cv} folds")
+    start = time.perf_counter()
+
+    data_dir = tempfile.mkdtemp(prefix="tree-search-")
+    try:
+        np.save(os.path.join(data_dir, "X.npy"), X)
+        np.save(os.path.join(data_dir, "y.npy"), y)
+        np.save(os.path.join(data_dir, "folds.npy"), fold_ids)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(data_dir,)) as pool:
+            for fold in range(cv):
+                futures = [
+                    pool.submit(_fit_fold, i, candidates[i], fold, random_state) for i in alive
+                ]
+                for future in futures:
+                    i, score, fit_time, score_time = future.result()
+                    scores[i].append(score)
+                    fit_seconds[i] += fit_time
+                    score_seconds[i] += score_time
+
+                pruned = 0
+                if fold + 1 >= MIN_FOLDS_BEFORE_PRUNING and fold + 1 < cv:
+                    leader = max(np.mean(scores[i]) for i in alive)
+                    survivors = [i for i in alive if np.mean(scores[i]) >= leader - prune_margin]
+                    for i in set(alive) - set(survivors):
+                        pruned_after[i] = fold + 1
+                    pruned = len(alive) - len(survivors)
+                    alive = survivors
+
+                print(f"  Fold {fold + 1}/{cv}: {len(alive)} candidates remaining ({pruned} pruned)")
+                events.emit("search_round", fold=fold + 1, folds=cv, remaining=len(alive), pruned=pruned)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    table = [
+        {
+            "params": params,
+            "mean_score": float(np.mean(scores[i])),
+            "std_score": float(np.std(scores[i])),
+            "folds_completed": len(scores[i]),
+            "pruned_after_fold": pruned_after[i],
+            "fit_seconds": round(fit_seconds[i], 4),
+            "score_seconds": round(score_seconds[i], 4),
+        }
+        for i, params in enumerate(candidates)
+    ]
+    # Fully evaluated candidates rank ahead of pruned ones
+    table.sort(key=lambda row: (row["pruned_after_fold"] is None, row["mean_score"], -row["std_score"]),
+               reverse=True)
+    best = table[0]
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Search completed in {elapsed:.2f}s")
+    print(f"Best parameters: {best['params']}")
+    print(f"Best CV accuracy: {best['mean_score']:.4f} (±{best['std_score']:.4f})")
+
+    return {
+        "mode": mode,
+        "cv_folds": cv,
+        "best_params": best["params"],
+        "best_score": best["mean_score"],
+        "candidates_evaluated": len(candidates),
+        "candidates_pruned": sum(p is not None for p in pruned_after),
+        "search_seconds": round(elapsed, 3),
+        "candidates": table,
+    }
@@ -0,0 +1,138 @@
+"""
+Task 2 Tuning: Training throughput sweep for the MNIST CNN
+Runs task 2 once per performance setting (threads, XLA, precision, batch size) in a fresh process
+Goal: Pick the fastest configuration that still reaches the >95% accuracy target
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TASK2_SCRIPT = os.path.join(SCRIPTS_DIR, "task2_mnist_cnn.py")
+ACCURACY_TARGET = 0.95
+
+
+def run_setting(setting, epochs):
+    """Train once with `setting` and summarize its epoch events
+
+    Thread pools can only be sized before TensorFlow starts, so every
+    setting gets its own interpreter. The model cache is disabled so each
+    run really trains.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        events_path = os.path.join(tmp, "events.ndjson")
+        command = [
+            sys.executable, TASK2_SCRIPT, "--headless",
+            "--epochs", str(epochs),
+            "--batch-size", str(setting["batch_size"]),
+            "--intra-op-threads", str(setting["intra_op_threads"]),
+            "--inter-op-threads", str(setting["inter_op_threads"]),
+            "--mixed-precision", setting["mixed_precision"],
+        ]
+        if setting["jit_compile"]:
+            command.append("--jit-compile")
+        env = {**os.environ, "ML_HEADLESS": "1", "ML_EVENTS_FILE": events_path, "MODEL_CACHE_DISABLE": "1"}
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+
+        events = []
+        if os.path.exists(events_path):
+            with open(events_path, encoding="utf-8") as f:
+                events = [json.loads(line) for line in f if line.strip()]
+
+    epochs_seen = [e for e in events if e["type"] == "epoch"]
+    result = next((e["data"] for e in events if e["type"] == "result"), None)
+    error = next((e["message"] for e in events if e["type"] == "error"), None)
+
+    # The first epoch includes tracing/XLA compilation, so it is reported separately
+    steady = [e["samples_per_sec"] for e in epochs_seen[1:]] or [e["samples_per_sec"] for e in epochs_seen]
+    accuracy = result["test_accuracy"] if result else None
+    return {
+        **setting,
+        "epochs_run": len(epochs_seen),
+        "first_epoch_samples_per_sec": round(epochs_seen[0]["samples_per_sec"], 1) if epochs_seen else None,
+        "samples_per_sec": round(statistics.median(steady), 1) if steady else None,
+        "train_seconds": round(sum(e["seconds"] for e in epochs_seen), 2),
+        "test_accuracy": accuracy,
+        "meets_target": accuracy is not None and accuracy > ACCURACY_TARGET,
+        "error": error,
+    }
+
+
+def parse_threads(value):
+    intra, _, inter = value.partition(":")
+    return int(intra), int(inter or 0)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep task 2 training performance settings")
+    parser.add_argument("--epochs", type=int, default=3, help="Epochs per run")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--threads", type=parse_threads, nargs="+", default=[(0, 0)], metavar="INTRA:INTER",
+                        help="Thread settings to try, e.g. 0:0 8:2 (0 keeps the TensorFlow default)")
+    parser.add_argument("--jit", choices=["off", "on", "both"], default="both")
+    parser.add_argument("--precision", choices=["float32", "bfloat16", "both"], default="both",
+                        help="bfloat16 runs are skipped on CPUs without native support")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from task2_mnist_cnn import cpu_supports_bfloat16
+
+    jit_options = {"off": [False], "on": [True], "both": [False, True]}[args.jit]
+    precisions = {"float32": ["off"], "bfloat16": ["bfloat16"], "both": ["off", "bfloat16"]}[args.precision]
+    if not cpu_supports_bfloat16():
+        if "off" not in precisions:
+            print("This CPU has no native bfloat16 support; nothing to run")
+            return 1
+        precisions = ["off"]
+
+    results = []
+    for (intra, inter), jit, precision, batch_size in itertools.product(
+            args.threads, jit_options, precisions, args.batch_sizes):
+        setting = {
+            "intra_op_threads": intra,
+            "inter_op_threads": inter,
+            "jit_compile": jit,
+            "mixed_precision": precision,
+            "batch_size": batch_size,
+        }
+        if not args.json:
+            print(f"Running {setting}...", flush=True)
+        results.append(run_setting(setting, args.epochs))
+
+    passing = [r for r in results if r["meets_target"] and r["samples_per_sec"]]
+    best = max(passing, key=lambda r: r["samples_per_sec"]) if passing else None
+
+    if args.json:
+        print(json.dumps({"results": results, "best": best}, indent=2))
+        return 0
+
+    print(f"\n{'Threads':<9}{'XLA':<5}{'Precision':<11}{'Batch':>6}{'Samples/s':>11}{'1st epoch':>11}{'Accuracy':>10}")
+    for r in results:
+        threads = f"{r['intra_op_threads']}:{r['inter_op_threads']}"
+        precision = "bfloat16" if r["mixed_precision"] == "bfloat16" else "float32"
+        accuracy = f"{r['test_accuracy']:.4f}" if r["test_accuracy"] is not None else "failed"
+        print(f"{threads:<9}{'on' if r['jit_compile'] else 'off':<5}{precision:<11}{r['batch_size']:>6}"
+              f"{r['samples_per_sec'] or 0:>11.0f}{r['first_epoch_samples_per_sec'] or 0:>11.0f}{accuracy:>10}")
+
+    if best:
+        print(f"\nFastest setting meeting the >{ACCURACY_TARGET:.0%} target: {best['samples_per_sec']:.0f} samples/sec")
+        print(f"  python scripts/task2_mnist_cnn.py --batch-size {best['batch_size']} "
+              f"--intra-op-threads {best['intra_op_threads']} --inter-op-threads {best['inter_op_threads']} "
+              f"--mixed-precision {best['mixed_precision']}" + (" --jit-compile" if best["jit_compile"] else ""))
+    else:
+        print(f"\nNo setting reached the >{ACCURACY_TARGET:.0%} accuracy target; try more --epochs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
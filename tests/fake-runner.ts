@@ -0,0 +1,54 @@
+import type { RunTaskOptions, TaskEvent, TaskName, TaskOutcome } from "@/lib/task-runner"
+
+export interface FakeRun {
+  task: TaskName
+  args: string[]
+  signal: AbortSignal | undefined
+  emit: (event: Omit<TaskEvent, "time">) => void
+  succeed: (result?: unknown) => void
+  fail: (error?: string) => void
+}
+
+/**
+ * In-process stand-in for runTask, passed to JobQueue as its `runner`.
+ *
+ * Every call is recorded in `runs` and stays running until the test calls
+ * succeed() or fail() on it. Aborting the run's signal settles it the way
+ * runTask does when it kills the script.
+ */
+export class FakeRunner {
+  readonly runs: FakeRun[] = []
+
+  readonly runner = (task: TaskName, options: RunTaskOptions): Promise<TaskOutcome> =>
+    new Promise((resolve) => {
+      const { args = [], signal, onEvent } = options
+      let settled = false
+      const settle = (outcome: TaskOutcome) => {
+        if (settled) return
+        settled = true
+        resolve(outcome)
+      }
+      signal?.addEventListener(
+        "abort",
+        () => settle({ result: null, error: "Task was cancelled", exitCode: null, stderrTail: "" }),
+        { once: true },
+      )
+      this.runs.push({
+        task,
+        args,
+        signal,
+        emit: (event) => onEvent?.({ time: Date.now() / 1000, ...event }),
+        succeed: (result = { ok: true }) => settle({ result, error: null, exitCode: 0, stderrTail: "" }),
+        fail: (error = "boom") => settle({ result: null, error, exitCode: 1, stderrTail: "" }),
+      })
+    })
+
+  runsOf(task: TaskName): FakeRun[] {
+    return this.runs.filter((run) => run.task === task)
+  }
+}
+
+// Let the queue start runs and react to settled ones (it schedules both as microtasks)
+export function flush(): Promise<void> {
+  return new Promise((resolve) => setImmediate(resolve))
+}
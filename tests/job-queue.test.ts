@@ -0,0 +1,148 @@
+import assert from "node:assert/strict"
+import { describe, it } from "node:test"
+import { JobQueue, QueueFullError, queueFullResponse } from "@/lib/job-queue"
+import { FakeRunner, flush } from "./fake-runner"
+
+function makeQueue(options: ConstructorParameters<typeof JobQueue>[0] = {}) {
+  const fake = new FakeRunner()
+  const queue = new JobQueue({ runner: fake.runner, ...options })
+  return { fake, queue }
+}
+
+describe("JobQueue worker pools", () => {
+  it("runs at most `concurrency` jobs per task and keeps each task's pool separate", async () => {
+    const { fake, queue } = makeQueue({ concurrency: { task1: 2, task2: 1 } })
+    const a = queue.submit("task1", { args: ["a"], detached: true })
+    queue.submit("task1", { args: ["b"], detached: true })
+    const c = queue.submit("task1", { args: ["c"], detached: true })
+    queue.submit("task2", { args: ["x"], detached: true })
+    await flush()
+
+    assert.equal(fake.runsOf("task1").length, 2)
+    assert.equal(fake.runsOf("task2").length, 1)
+    assert.equal(queue.view(c.job).status, "queued")
+    assert.equal(queue.view(c.job).position, 1)
+
+    fake.runsOf("task1")[0].succeed()
+    await a.done
+    await flush()
+    assert.equal(fake.runsOf("task1").length, 3)
+    assert.equal(queue.view(c.job).status, "running")
+  })
+
+  it("starts queued jobs in FIFO order", async () => {
+    const { fake, queue } = makeQueue({ concurrency: { task3: 1 } })
+    const submissions = ["a", "b", "c"].map((arg) => queue.submit("task3", { args: [arg], detached: true }))
+    await flush()
+
+    for (const [index, submission] of submissions.entries()) {
+      assert.deepEqual(fake.runs[index].args, submission.job.args)
+      assert.equal(fake.runs.length, index + 1)
+      fake.runs[index].succeed()
+      await submission.done
+      await flush()
+    }
+    assert.deepEqual(fake.runs.map((run) => run.args[0]), ["a", "b", "c"])
+  })
+})
+
+describe("JobQueue backpressure", () => {
+  it("rejects submissions beyond maxQueued with a 429 and Retry-After", async () => {
+    const { queue } = makeQueue({ concurrency: { task2: 1 }, maxQueued: 2 })
+    queue.submit("task2", { args: ["running"], detached: true })
+    await flush()
+    const queued = queue.submit("task2", { args: ["q1"], detached: true })
+    queue.submit("task2", { args: ["q2"], detached: true })
+
+    assert.throws(
+      () => queue.submit("task2", { args: ["q3"], detached: true }),
+      (error: unknown) => error instanceof QueueFullError && error.task === "task2",
+    )
+    // Joining an already queued job takes no queue slot
+    assert.equal(queue.submit("task2", { args: ["q1"] }).job, queued.job)
+
+    try {
+      queue.submit("task2", { args: ["q4"], detached: true })
+      assert.fail("expected QueueFullError")
+    } catch (error) {
+      assert.ok(error instanceof QueueFullError)
+      const response = queueFullResponse(error)
+      assert.equal(response.status, 429)
+      assert.ok(Number(response.headers.get("Retry-After")) >= 1)
+    }
+  })
+})
+
+describe("JobQueue single flight", () => {
+  it("attaches identical submissions to one run and replays its events", async () => {
+    const { fake, queue } = makeQueue()
+    const first = queue.submit("task1", { args: ["--cv", "5"] })
+    await flush()
+    fake.runs[0].emit({ type: "progress", stage: "train" })
+
+    const seen: string[] = []
+    const second = queue.submit("task1", {
+      args: ["--cv", "5"],
+      onEvent: (event) => seen.push(String(event.stage ?? event.type)),
+    })
+    assert.equal(second.job, first.job)
+    assert.equal(second.deduplicated, true)
+    assert.deepEqual(seen, ["train"])
+
+    fake.runs[0].emit({ type: "progress", stage: "evaluate" })
+    fake.runs[0].succeed({ accuracy: 1 })
+    const [a, b] = await Promise.all([first.done, second.done])
+    assert.equal(a.status, "succeeded")
+    assert.equal(b, a)
+    assert.deepEqual(seen, ["train", "evaluate"])
+    assert.equal(fake.runs.length, 1)
+  })
+
+  it("keys runs by task and arguments, and starts afresh once a run has finished", async () => {
+    const { fake, queue } = makeQueue({ concurrency: { task1: 4 } })
+    const base = queue.submit("task1", { args: ["--cv", "5"] })
+    const other = queue.submit("task1", { args: ["--cv", "3"] })
+    assert.notEqual(other.job, base.job)
+    assert.equal(other.deduplicated, false)
+
+    await flush()
+    fake.runs.forEach((run) => run.succeed())
+    await Promise.all([base.done, other.done])
+
+    const again = queue.submit("task1", { args: ["--cv", "5"] })
+    assert.notEqual(again.job, base.job)
+    assert.equal(again.deduplicated, false)
+  })
+})
+
+describe("JobQueue cancellation", () => {
+  it("cancels a run once its last waiter detaches, unless it was submitted detached", async () => {
+    const { fake, queue } = makeQueue({ concurrency: { task1: 2 } })
+    const controller = new AbortController()
+    const attached = queue.submit("task1", { args: ["a"], signal: controller.signal })
+    const detached = queue.submit("task1", { args: ["b"], detached: true, signal: new AbortController().signal })
+    await flush()
+
+    controller.abort()
+    const job = await attached.done
+    assert.equal(job.status, "cancelled")
+    assert.equal(fake.runs[0].signal?.aborted, true)
+    assert.equal(fake.runs[1].signal?.aborted, false)
+    assert.equal(queue.view(detached.job).status, "running")
+  })
+
+  it("cancels queued and running jobs by id", async () => {
+    const { fake, queue } = makeQueue({ concurrency: { task3: 1 } })
+    const running = queue.submit("task3", { args: ["a"], detached: true })
+    const queued = queue.submit("task3", { args: ["b"], detached: true })
+    await flush()
+
+    assert.equal(queue.cancel(queued.job.id), true)
+    assert.equal((await queued.done).status, "cancelled")
+    assert.equal(queue.cancel(running.job.id), true)
+    assert.equal((await running.done).status, "cancelled")
+    assert.equal(queue.cancel(running.job.id), false)
+    // The cancelled queued job never reached the runner
+    assert.equal(fake.runs.length, 1)
+  })
+})
@@ -0,0 +1,58 @@
+import assert from "node:assert/strict"
+import { afterEach, describe, it } from "node:test"
+import { JobQueue } from "@/lib/job-queue"
+import { streamJob } from "@/lib/job-stream"
+import { FakeRunner, flush } from "./fake-runner"
+
+// streamJob submits through getJobQueue(), which reuses the queue kept on globalThis
+const globalForJobs = globalThis as unknown as { jobQueue?: JobQueue }
+
+function installQueue(maxQueued?: number) {
+  const fake = new FakeRunner()
+  globalForJobs.jobQueue = new JobQueue({ runner: fake.runner, concurrency: { task2: 1 }, maxQueued })
+  return fake
+}
+
+describe("streamJob", () => {
+  afterEach(() => {
+    delete globalForJobs.jobQueue
+  })
+
+  it("streams the job, its events and its result as NDJSON", async () => {
+    const fake = installQueue()
+    const response = streamJob("task2", new AbortController().signal, "ndjson")
+    await flush()
+    fake.runs[0].emit({ type: "epoch", epoch: 1 })
+    fake.runs[0].succeed()
+
+    assert.equal(response.headers.get("Content-Type"), "application/x-ndjson")
+    const events = (await response.text()).trim().split("\n").map((line) => JSON.parse(line))
+    assert.deepEqual(events.map((event) => event.type), ["job", "epoch"])
+    assert.equal(typeof events[0].id, "string")
+  })
+
+  it("replays earlier events to a second viewer and ends SSE with done", async () => {
+    const fake = installQueue()
+    streamJob("task2", new AbortController().signal, "sse")
+    await flush()
+    fake.runs[0].emit({ type: "epoch", epoch: 1 })
+
+    const joined = streamJob("task2", new AbortController().signal, "sse")
+    fake.runs[0].fail("out of memory")
+
+    assert.equal(joined.headers.get("Content-Type"), "text/event-stream")
+    const text = await joined.text()
+    const types = [...text.matchAll(/^event: (\w+)$/gm)].map((match) => match[1])
+    assert.deepEqual(types, ["job", "epoch", "error", "done"])
+    assert.match(text, /"message":"out of memory"/)
+    assert.equal(fake.runs.length, 1)
+  })
+
+  it("answers a full queue with a plain 429 instead of a stream", async () => {
+    const fake = installQueue(0)
+    const response = streamJob("task2", new AbortController().signal, "sse")
+    assert.equal(response.status, 429)
+    assert.ok(response.headers.get("Retry-After"))
+    assert.equal(fake.runs.length, 0)
+  })
+})
@@ -0,0 +1,59 @@
+import assert from "node:assert/strict"
+import { afterEach, describe, it } from "node:test"
+import { DELETE, GET } from "@/app/api/jobs/[id]/route"
+import { JobQueue } from "@/lib/job-queue"
+import { FakeRunner, flush } from "./fake-runner"
+
+// The route handlers use getJobQueue(), which reuses the queue kept on globalThis
+const globalForJobs = globalThis as unknown as { jobQueue?: JobQueue }
+
+function installQueue() {
+  const fake = new FakeRunner()
+  const queue = new JobQueue({ runner: fake.runner, concurrency: { task2: 1 } })
+  globalForJobs.jobQueue = queue
+  return { fake, queue }
+}
+
+function call(handler: typeof GET, id: string) {
+  const request = new Request(`http://localhost/api/jobs/${id}`) as Parameters<typeof GET>[0]
+  return handler(request, { params: Promise.resolve({ id }) })
+}
+
+describe("/api/jobs/[id]", () => {
+  afterEach(() => {
+    delete globalForJobs.jobQueue
+  })
+
+  it("reports queue position and cancels a queued job with DELETE", async () => {
+    const { fake, queue } = installQueue()
+    queue.submit("task2", { args: ["a"], detached: true })
+    const queued = queue.submit("task2", { args: ["b"], detached: true })
+    await flush()
+
+    const polled = await (await call(GET, queued.job.id)).json()
+    assert.equal(polled.status, "queued")
+    assert.equal(polled.position, 1)
+
+    const response = await call(DELETE, queued.job.id)
+    assert.equal(response.status, 200)
+    assert.equal((await response.json()).status, "cancelled")
+    assert.equal(fake.runs.length, 1)
+  })
+
+  it("aborts a running job with DELETE", async () => {
+    const { fake, queue } = installQueue()
+    const running = queue.submit("task2", { args: ["a"], detached: true })
+    await flush()
+
+    await call(DELETE, running.job.id)
+    assert.equal(fake.runs[0].signal?.aborted, true)
+    await running.done
+    assert.equal((await (await call(GET, running.job.id)).json()).status, "cancelled")
+  })
+
+  it("answers 404 for unknown jobs", async () => {
+    installQueue()
+    assert.equal((await call(GET, "missing")).status, 404)
+    assert.equal((await call(DELETE, "missing")).status, 404)
+  })
+})
@@ -0,0 +1,27 @@
+// Module resolution for running the TypeScript tests on Node's built-in runner:
+// maps the "@/..." path alias from tsconfig.json onto the project root and lets
+// imports omit the .ts extension, as they do under the Next.js bundler.
+import { existsSync, statSync } from "node:fs"
+import { fileURLToPath } from "node:url"
+
+const ROOT = new URL("../", import.meta.url)
+const EXTENSIONS = [".ts", ".tsx", "/index.ts"]
+
+function isFile(url) {
+  const path = fileURLToPath(url)
+  return existsSync(path) && statSync(path).isFile()
+}
+
+export async function resolve(specifier, context, nextResolve) {
+  let url = null
+  if (specifier.startsWith("@/")) {
+    url = new URL(specifier.slice(2), ROOT)
+  } else if (specifier.startsWith("./") || specifier.startsWith("../")) {
+    url = new URL(specifier, context.parentURL)
+  }
+  if (url && !isFile(url)) {
+    const match = EXTENSIONS.map((extension) => new URL(url.href + extension)).find(isFile)
+    if (match) url = match
+  }
+  return nextResolve(url ? url.href : specifier, context)
+}
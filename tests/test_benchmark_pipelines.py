@@ -0,0 +1,61 @@
+import json
+
+import benchmark_pipelines
+
+
+def stages(seconds, train_growth=40.0):
+    return {"startup_rss_mb": 50.0, "stages": [
+        {"stage": "imports", "seconds": seconds * 10, "peak_rss_growth_mb": 100.0, "items": None, "items_per_sec": None},
+        {"stage": "train", "seconds": seconds, "peak_rss_growth_mb": train_growth, "items": None, "items_per_sec": None},
+    ]}
+
+
+def run_main(tmp_path, monkeypatch, seconds):
+    monkeypatch.setattr(benchmark_pipelines, "measure", lambda task, size, timeout=None: stages(seconds))
+    return benchmark_pipelines.main([
+        "--tasks", "task1", "--sizes", "10",
+        "--history", str(tmp_path / "history.json"), "--baseline", str(tmp_path / "baseline.json"),
+    ])
+
+
+def test_regression_from_a_zero_baseline_is_reported(tmp_path, monkeypatch, capsys):
+    assert run_main(tmp_path, monkeypatch, 0.0) == 0
+    assert run_main(tmp_path, monkeypatch, 1.0) == 1
+
+    output = capsys.readouterr().out
+    assert "train: seconds 0.0 -> 1.0 (new)" in output
+    # The imports stage is reported but never checked
+    assert "imports:" not in output
+    assert len(json.loads((tmp_path / "history.json").read_text())) == 2
+
+
+def test_missing_peak_rss_is_not_compared():
+    baseline = {"results": [{"task": "task1", "size": 10, **stages(1.0)}]}
+    run = {"results": [{"task": "task1", "size": 10, **stages(1.0)}]}
+    for stage in run["results"][0]["stages"]:
+        stage["peak_rss_growth_mb"] = None
+
+    assert benchmark_pipelines.find_regressions(run, baseline, 0.2, 0.2) == []
+
+
+def test_memory_regression_is_blamed_on_the_stage_that_grew():
+    baseline = {"results": [{"task": "task1", "size": 10, **stages(1.0)}]}
+    run = {"results": [{"task": "task1", "size": 10, **stages(1.0, train_growth=80.0)}]}
+
+    regressions = benchmark_pipelines.find_regressions(run, baseline, 0.2, 0.2)
+
+    assert [(r["stage"], r["metric"]) for r in regressions] == [("train", "peak_rss_growth_mb")]
+
+
+def test_stage_recorder_records_peak_growth_per_stage(monkeypatch):
+    peaks = iter([100.0, 150.0, 150.0, 150.0])
+    monkeypatch.setattr(benchmark_pipelines, "peak_rss_mb", lambda: next(peaks))
+    recorder = benchmark_pipelines.StageRecorder()
+
+    with recorder.stage("load_data"):
+        pass
+    with recorder.stage("train"):
+        pass
+
+    # The second stage stays below the first stage's peak, so it adds nothing
+    assert [s["peak_rss_growth_mb"] for s in recorder.stages] == [50.0, 0.0]
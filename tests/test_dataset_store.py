@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+import dataset_store
+
+IMAGES = np.arange(4 * 28 * 28).reshape(4, 28, 28) % 256
+LABELS = np.array([0, 1, 2, 255])
+
+
+def test_whole_number_arrays_are_stored_as_uint8(tmp_path):
+    store = dataset_store.write_dataset(str(tmp_path / "digits"), {"train": (IMAGES.astype(np.float64), LABELS)})
+    np.testing.assert_array_equal(store["train"].take(np.arange(4)), IMAGES)
+    np.testing.assert_array_equal(store["train"].labels(), LABELS)
+    assert store["train"].x_shards[0].dtype == np.uint8
+
+
+@pytest.mark.parametrize("images, labels", [
+    (IMAGES, np.array([0, 1, 2, 256])),
+    (IMAGES, np.array([0, 1, 2, -1])),
+    (IMAGES / 255.0, LABELS),
+    (IMAGES + 1, LABELS),
+    (IMAGES, LABELS[:3]),
+])
+def test_values_that_do_not_fit_uint8_are_rejected(tmp_path, images, labels):
+    directory = str(tmp_path / "digits")
+    with pytest.raises(ValueError):
+        dataset_store.write_dataset(directory, {"train": (images, labels)})
+    assert not os.path.exists(directory)
+    assert os.listdir(tmp_path) == []
+
+
+def test_any_error_removes_the_staging_directory(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(dataset_store, "write_shards", fail)
+    with pytest.raises(OSError):
+        dataset_store.write_dataset(str(tmp_path / "digits"), {"train": (IMAGES, LABELS)})
+    assert os.listdir(tmp_path) == []
+
+
+def test_undecodable_image_removes_the_staging_directory(tmp_path):
+    images = tmp_path / "images" / "cat"
+    images.mkdir(parents=True)
+    (images / "broken.png").write_bytes(b"not an image")
+    store = tmp_path / "store"
+
+    with pytest.raises(Exception):
+        dataset_store.seed_from_image_dir(str(store), str(tmp_path / "images"))
+    assert sorted(os.listdir(tmp_path)) == ["images"]
+
+
+def test_reseeding_replaces_an_existing_store(tmp_path):
+    directory = str(tmp_path / "digits")
+    dataset_store.write_dataset(directory, {"train": (IMAGES, LABELS)})
+    store = dataset_store.write_dataset(directory, {"train": (IMAGES[:2], LABELS[:2])})
+
+    np.testing.assert_array_equal(store["train"].labels(), LABELS[:2])
+    assert os.listdir(tmp_path) == ["digits"]
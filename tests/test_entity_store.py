@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from entity_store import EntityStore, EntityStoreBuilder
+
+DESCRIPTIONS = {"ORG": "Companies, agencies, institutions, etc.", "PRODUCT": "Objects, vehicles, foods, etc."}
+
+REVIEWS = [
+    [("Apple", "ORG", 0, 5), ("iPhone 15", "PRODUCT", 10, 19)],
+    [],
+    [("Café Müller", "ORG", 4, 15)],
+    [("Sony", "ORG", 0, 4), ("WH-1000XM5", "PRODUCT", 5, 15), ("Sony", "ORG", 20, 24)],
+]
+
+
+def build(reviews, first_review_id=1):
+    builder = EntityStoreBuilder(explain=DESCRIPTIONS.get, first_review_id=first_review_id)
+    for entities in reviews:
+        builder.add_review(entities)
+    return builder.build()
+
+
+def as_tuples(store, review_id):
+    return [(e["text"], e["label"], e["start_char"], e["end_char"]) for e in store.entities_for(review_id)]
+
+
+def assert_same(store, reviews, first_review_id=1):
+    assert store.n_reviews == len(reviews)
+    assert len(store) == sum(map(len, reviews))
+    for offset, entities in enumerate(reviews):
+        assert as_tuples(store, first_review_id + offset) == entities
+
+
+def test_builder_lookups():
+    store = build(REVIEWS)
+    assert_same(store, REVIEWS)
+    assert store.entities_for(0) == [] and store.entities_for(5) == []
+    assert store.entity(0)["description"] == DESCRIPTIONS["ORG"]
+    assert store.label_counts() == {"ORG": 4, "PRODUCT": 2}
+    assert store.text_counts()["Sony"] == 2
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", None])
+def test_save_load_round_trip(tmp_path, mmap_mode):
+    store = build(REVIEWS, first_review_id=101)
+    store.save(str(tmp_path / "entities"))
+    loaded = EntityStore.load(str(tmp_path / "entities"), mmap_mode=mmap_mode)
+
+    assert_same(loaded, REVIEWS, first_review_id=101)
+    assert loaded.labels == store.labels
+    assert loaded.descriptions == store.descriptions
+    assert loaded.to_frame().equals(store.to_frame())
+
+
+@pytest.mark.parametrize("reviews", [[], [[], []]], ids=["no reviews", "no entities"])
+def test_empty_store_round_trip(tmp_path, reviews):
+    store = build(reviews)
+    assert store.empty
+    store.save(str(tmp_path / "entities"))
+    loaded = EntityStore.load(str(tmp_path / "entities"))
+
+    assert loaded.empty
+    assert loaded.n_reviews == len(reviews)
+    assert loaded.labels == []
+    assert loaded.label_counts() == {}
+    assert loaded.entities_for(1) == []
+    assert len(loaded.to_frame()) == 0
+
+
+def test_concat_remaps_labels(tmp_path):
+    first, second = REVIEWS[:2], [[("Pixel 8", "PRODUCT", 0, 7)]] + REVIEWS[2:]
+    left = build(first)
+    # Saved and reloaded, as the sharded reduce does, with PRODUCT as code 0
+    build(second, first_review_id=3).save(str(tmp_path / "shard"))
+    right = EntityStore.load(str(tmp_path / "shard"))
+
+    joined = EntityStore.concat([left, right, build([], first_review_id=3 + len(second))])
+    assert_same(joined, first + second)
+    assert joined.labels == ["ORG", "PRODUCT"]
+    np.testing.assert_array_equal(joined.review_offsets, [0, 2, 2, 3, 4, 7])
+
+
+def test_concat_rejects_gaps():
+    with pytest.raises(ValueError):
+        EntityStore.concat([build(REVIEWS[:1]), build(REVIEWS[1:], first_review_id=3)])
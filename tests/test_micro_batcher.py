@@ -0,0 +1,90 @@
+import threading
+
+import numpy as np
+import pytest
+
+from mnist_inference import MicroBatcher
+
+
+def image(value):
+    return np.full((28, 28), value, dtype=np.uint8)
+
+
+class StubModel:
+    """Labels each image with its first pixel and records the batch sizes it saw"""
+
+    def __init__(self, error=None):
+        self.batch_sizes = []
+        self.error = error
+
+    def __call__(self, images):
+        self.batch_sizes.append(len(images))
+        if self.error:
+            raise self.error
+        return images[:, 0, 0], np.arange(len(images)) / 10.0
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(model, **kwargs):
+        batchers.append(MicroBatcher(model, **kwargs))
+        return batchers[-1]
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+
+def test_full_batch_is_flushed_without_waiting(make_batcher):
+    model = StubModel()
+    batcher = make_batcher(model, max_batch_size=4, max_wait_ms=60_000)
+    futures = [batcher.submit(image(i)) for i in range(4)]
+
+    assert [future.result(timeout=5)[0] for future in futures] == [0, 1, 2, 3]
+    assert model.batch_sizes == [4]
+
+
+def test_partial_batch_is_flushed_after_max_wait(make_batcher):
+    model = StubModel()
+    batcher = make_batcher(model, max_batch_size=64, max_wait_ms=20)
+    futures = [batcher.submit(image(i)) for i in range(3)]
+
+    assert [future.result(timeout=5)[0] for future in futures] == [0, 1, 2]
+    assert model.batch_sizes == [3]
+
+
+def test_batch_error_reaches_every_caller(make_batcher):
+    batcher = make_batcher(StubModel(error=RuntimeError("model failed")), max_batch_size=3, max_wait_ms=60_000)
+    futures = [batcher.submit(image(i)) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(timeout=5)
+
+
+def test_bad_image_fails_only_its_own_request(make_batcher):
+    batcher = make_batcher(StubModel(), max_wait_ms=1)
+    with pytest.raises(ValueError):
+        batcher.submit(np.full((28, 28), 300))
+    assert batcher.predict(image(7), timeout=5)[0] == 7
+
+
+def test_results_go_to_the_right_caller(make_batcher):
+    model = StubModel()
+    batcher = make_batcher(model, max_batch_size=8, max_wait_ms=5)
+    results = {}
+
+    def client(value):
+        results[value] = batcher.predict(image(value), timeout=5)[0]
+
+    threads = [threading.Thread(target=client, args=(value,)) for value in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {value: value for value in range(50)}
+    assert max(model.batch_sizes) <= 8
+    assert sum(model.batch_sizes) == 50
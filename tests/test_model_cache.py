@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from model_cache import ModelCache, cache_summary, fingerprint
+
+X = np.arange(12, dtype=np.float32).reshape(4, 3)
+SPLIT = {"test_size": 0.3, "random_state": 42}
+CONFIG = {"estimator": "DecisionTreeClassifier", "max_depth": 5}
+
+
+def write_file(content):
+    def save(entry_dir):
+        with open(os.path.join(entry_dir, "model.bin"), "w") as f:
+            f.write(content)
+    return save
+
+
+def read_entry(cache, key):
+    entry_dir, metrics = cache.get(key)
+    with open(os.path.join(entry_dir, "model.bin")) as f:
+        return f.read(), metrics
+
+
+def age(cache, key, timestamp):
+    os.utime(cache.entry_path(key), (timestamp, timestamp))
+
+
+def test_fingerprint_is_stable():
+    assert fingerprint([X], SPLIT, CONFIG) == fingerprint([X.copy()], dict(SPLIT), dict(CONFIG))
+
+
+@pytest.mark.parametrize("arrays, split, config", [
+    ([X + 1], SPLIT, CONFIG),
+    ([X.astype(np.float64)], SPLIT, CONFIG),
+    ([X.reshape(3, 4)], SPLIT, CONFIG),
+    ([X], {**SPLIT, "random_state": 0}, CONFIG),
+    ([X], SPLIT, {**CONFIG, "max_depth": 6}),
+])
+def test_fingerprint_changes_with_data_split_and_config(arrays, split, config):
+    assert fingerprint(arrays, split, config) != fingerprint([X], SPLIT, CONFIG)
+
+
+def test_fingerprint_changes_with_column_names():
+    pd = pytest.importorskip("pandas")
+    a = pd.DataFrame(X, columns=["a", "b", "c"])
+    b = pd.DataFrame(X, columns=["a", "b", "d"])
+    assert fingerprint([a], SPLIT, CONFIG) != fingerprint([b], SPLIT, CONFIG)
+
+
+def test_put_keeps_an_existing_entry(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    cache.put("k" * 64, write_file("first"), {"run": 1})
+    cache.put("k" * 64, write_file("second"), {"run": 2})
+
+    assert read_entry(cache, "k" * 64) == ("first", {"run": 1})
+    assert os.listdir(tmp_path) == ["k" * 64]
+
+
+def test_crashed_put_leaves_no_entry(tmp_path):
+    def crash(entry_dir):
+        write_file("half")(entry_dir)
+        raise KeyboardInterrupt
+
+    cache = ModelCache(str(tmp_path))
+    with pytest.raises(KeyboardInterrupt):
+        cache.put("k" * 64, crash, {})
+
+    assert cache.get("k" * 64) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_evicts_least_recently_accessed_first(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    for key in ("a", "b", "c"):
+        cache.put(key, write_file("x" * 100), {})
+    age(cache, "a", 1000)
+    age(cache, "b", 2000)
+    age(cache, "c", 3000)
+    cache.get("a")  # now the most recently used
+
+    entry_bytes = cache.evict()
+    cache.max_bytes = entry_bytes * 2 // 3
+    cache.evict()
+
+    assert sorted(os.listdir(tmp_path)) == ["a", "c"]
+
+
+def test_evict_never_removes_the_kept_key(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    for key in ("a", "b"):
+        cache.put(key, write_file("x" * 100), {})
+    age(cache, "a", 1000)
+    age(cache, "b", 2000)
+
+    cache.max_bytes = 0
+    cache.evict(keep="a")
+
+    assert os.listdir(tmp_path) == ["a"]
+
+
+def test_summary_reports_hits_and_misses(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    assert cache.get("k") is None
+    cache.put("k", write_file("model"), {})
+    assert cache.summary()["status"] == "miss"
+
+    rerun = ModelCache(str(tmp_path))
+    rerun.get("k")
+    assert rerun.summary()["status"] == "hit"
+    assert cache_summary(None) == {"enabled": False, "status": "disabled"}
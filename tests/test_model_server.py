@@ -0,0 +1,52 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import model_server
+from model_server import InvalidParams, IrisState, IrisWorker, ModelRequestHandler, ReviewWorker
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ModelRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("reviews", ["I love my iPhone", [], ["fine", 3], {"0": "text"}])
+def test_reviews_must_be_a_list_of_strings(reviews):
+    with pytest.raises(InvalidParams):
+        ReviewWorker().predict({"reviews": reviews})
+
+
+@pytest.mark.parametrize("features", ["abc", [[1.0, "x"]], {"a": 1}])
+def test_malformed_features_are_invalid_params(features):
+    worker = IrisWorker()
+    worker.state = IrisState(None, SimpleNamespace(predict=lambda X: X), None, None)
+    with pytest.raises(InvalidParams):
+        worker.predict({"features": features})
+
+
+def test_bad_input_is_400_and_untrained_is_409(server, monkeypatch):
+    monkeypatch.setitem(model_server.WORKERS, "task1", IrisWorker())
+
+    assert post(f"{server}/task3/predict", {"reviews": "I love my iPhone"})[0] == 400
+    assert post(f"{server}/task1/predict", {"features": [[5.1, 3.5, 1.4, 0.2]]})[0] == 409
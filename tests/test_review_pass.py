@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("spacy")
+import task3_nlp_spacy as task3
+
+
+@pytest.fixture(scope="module")
+def both_passes():
+    """The fused review_signals pass and the separate NER and sentiment passes over one corpus"""
+    corpus = task3.synthetic_reviews(300)
+    corpus.loc[len(corpus)] = [len(corpus) + 1, "   "]
+    corpus.loc[len(corpus)] = [len(corpus) + 1, "Samsung galaxy and APPLE iPhone: great, bad, worst!"]
+
+    separate_nlp = task3.load_spacy_model()
+    separate = corpus.copy()
+    separate_entities, separate_brands, separate_products = task3.perform_named_entity_recognition(
+        separate_nlp, separate, task3.BrandMatcher(separate_nlp)
+    )
+    task3.rule_based_sentiment_analysis(separate)
+
+    fused = corpus.copy()
+    fused_entities, fused_brands, fused_products = task3.process_reviews(
+        task3.add_review_signals(task3.load_spacy_model()), fused, batch_size=64
+    )
+    return (
+        (separate, separate_entities, separate_brands, separate_products),
+        (fused, fused_entities, fused_brands, fused_products),
+    )
+
+
+def test_entities_match(both_passes):
+    (df, separate, _, _), (_, fused, _, _) = both_passes
+    assert len(fused) == len(separate)
+    for review_id in df["review_id"]:
+        assert fused.entities_for(review_id) == separate.entities_for(review_id)
+
+
+def test_brands_and_products_match(both_passes):
+    (_, _, separate_brands, separate_products), (_, _, fused_brands, fused_products) = both_passes
+    assert fused_brands.most_common() == separate_brands.most_common()
+    assert fused_products.most_common() == separate_products.most_common()
+
+
+def test_sentiment_matches(both_passes):
+    (separate, _, _, _), (fused, _, _, _) = both_passes
+    np.testing.assert_array_equal(fused["sentiment_score"].to_numpy(), separate["sentiment_score"].to_numpy())
+    assert list(fused["sentiment"]) == list(separate["sentiment"])
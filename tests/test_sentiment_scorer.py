@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+from task3_nlp_spacy import NEGATIVE_WORDS, POSITIVE_WORDS, LexiconSentimentScorer, rule_based_sentiment_analysis
+
+
+def baseline_score(review):
+    """The original per-review rule: lowercase, whitespace split, count lexicon words"""
+    words = review.lower().split()
+    positive = sum(1 for word in words if word in POSITIVE_WORDS)
+    negative = sum(1 for word in words if word in NEGATIVE_WORDS)
+    return positive - negative, positive, negative
+
+
+def baseline_label(score):
+    return 'Positive' if score > 0 else 'Negative' if score < 0 else 'Neutral'
+
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "LOVE it, GREAT phone",
+    "love! great. bad,",                      # punctuation keeps words out of the lexicon
+    "love\tgreat\nbad\r\nworst",
+    "love\u00a0great\u2003bad\u3000poor",  # unicode whitespace splits like ASCII spaces
+    "ＧＯＯＤ good Good gOOD",
+    "İmpressed impressed",                    # 'İ'.lower() is two code points
+    "café naïve superb déçu",
+    "good" * 3,
+    "bad bad bad good",
+]
+
+
+def synthetic_reviews(n, seed=0):
+    rng = random.Random(seed)
+    vocabulary = sorted(POSITIVE_WORDS | NEGATIVE_WORDS) + ["the", "phone", "battery", "is", "not", "très"]
+    separators = [" ", "  ", "\t", "\n", "\u00a0", "\u2003"]
+    reviews = []
+    for _ in range(n):
+        words = []
+        for _ in range(rng.randint(0, 25)):
+            word = rng.choice(vocabulary)
+            word = rng.choice([word, word.upper(), word.capitalize(), word + rng.choice("!.,?")])
+            words.append(word)
+            words.append(rng.choice(separators))
+        reviews.append(rng.choice(["", " ", "\n"]) + "".join(words))
+    return reviews
+
+
+@pytest.mark.parametrize("chunk_size", [7, 100_000])
+def test_matches_the_baseline_rule(chunk_size):
+    reviews = EDGE_CASES + synthetic_reviews(2000)
+    scores, positive, negative = LexiconSentimentScorer().score(reviews, chunk_size=chunk_size)
+
+    expected = np.array([baseline_score(review) for review in reviews])
+    np.testing.assert_array_equal(scores, expected[:, 0])
+    np.testing.assert_array_equal(positive, expected[:, 1])
+    np.testing.assert_array_equal(negative, expected[:, 2])
+
+
+def test_labels_match_the_baseline_rule():
+    pd = pytest.importorskip("pandas")
+    reviews = EDGE_CASES + synthetic_reviews(500, seed=1)
+    df = rule_based_sentiment_analysis(pd.DataFrame({"review_text": reviews}))
+
+    assert list(df["sentiment"]) == [baseline_label(baseline_score(review)[0]) for review in reviews]
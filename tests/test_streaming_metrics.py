@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, precision_recall_fscore_support
+
+from streaming_metrics import ConfusionMatrix
+
+N_CLASSES = 4
+
+
+@pytest.fixture(scope="module")
+def labels():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, N_CLASSES - 1, size=5000)
+    y_pred = np.where(rng.random(5000) < 0.7, y_true, rng.integers(0, N_CLASSES, size=5000))
+    # Class 3 is predicted but never true; class 2 is never predicted
+    y_pred[y_pred == 2] = 0
+    return y_true, y_pred
+
+
+def streamed(y_true, y_pred, batch_size=777):
+    matrix = ConfusionMatrix(N_CLASSES)
+    for start in range(0, len(y_true), batch_size):
+        matrix.update(y_true[start:start + batch_size], y_pred[start:start + batch_size])
+    return matrix
+
+
+def test_matrix_matches_sklearn(labels):
+    y_true, y_pred = labels
+    matrix = streamed(y_true, y_pred)
+    np.testing.assert_array_equal(matrix.matrix, confusion_matrix(y_true, y_pred, labels=range(N_CLASSES)))
+    assert matrix.total == len(y_true)
+    assert matrix.accuracy() == pytest.approx(accuracy_score(y_true, y_pred))
+
+
+def test_per_class_metrics_match_sklearn(labels):
+    y_true, y_pred = labels
+    matrix = streamed(y_true, y_pred)
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_true, y_pred, labels=range(N_CLASSES), zero_division=0
+    )
+    np.testing.assert_allclose(matrix.precision_per_class(), precision)
+    np.testing.assert_allclose(matrix.recall_per_class(), recall)
+    np.testing.assert_allclose(matrix.f1_per_class(), f1)
+    np.testing.assert_array_equal(matrix.support, support)
+
+
+@pytest.mark.parametrize("average", ["macro", "weighted"])
+def test_averaged_metrics_match_sklearn(labels, average):
+    y_true, y_pred = labels
+    matrix = streamed(y_true, y_pred)
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        y_true, y_pred, labels=range(N_CLASSES), average=average, zero_division=0
+    )
+    assert matrix.precision(average) == pytest.approx(precision)
+    assert matrix.recall(average) == pytest.approx(recall)
+    assert matrix.f1(average) == pytest.approx(f1)
+
+
+@pytest.mark.parametrize("average", ["macro", "weighted"])
+def test_averages_skip_classes_that_never_occur(labels, average):
+    y_true, y_pred = labels
+    # Drop every row that involves class 3, so it is neither true nor predicted
+    keep = y_pred != 3
+    y_true, y_pred = y_true[keep], y_pred[keep]
+    matrix = streamed(y_true, y_pred)
+    assert not matrix.present[3]
+
+    # Without labels=, sklearn averages over the labels present in y_true or y_pred
+    precision, recall, f1, _ = precision_recall_fscore_support(y_true, y_pred, average=average, zero_division=0)
+    assert matrix.precision(average) == pytest.approx(precision)
+    assert matrix.recall(average) == pytest.approx(recall)
+    assert matrix.f1(average) == pytest.approx(f1)
+
+
+def test_merge_equals_one_pass(labels):
+    y_true, y_pred = labels
+    left, right = streamed(y_true[:2000], y_pred[:2000]), streamed(y_true[2000:], y_pred[2000:])
+    np.testing.assert_array_equal(left.merge(right).matrix, streamed(y_true, y_pred).matrix)
+
+
+def test_report_matches_classification_report(labels):
+    y_true, y_pred = labels
+    names = ["setosa", "versicolor", "virginica", "other"]
+    expected = classification_report(y_true, y_pred, labels=range(N_CLASSES), target_names=names, zero_division=0)
+    assert streamed(y_true, y_pred).report(names).split() == expected.split()
+
+
+def test_empty_matrix_reports_zeros():
+    matrix = ConfusionMatrix(3)
+    assert matrix.accuracy() == 0.0
+    assert matrix.f1("weighted") == 0.0
+    assert matrix.precision("macro") == 0.0
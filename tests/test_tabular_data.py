@@ -0,0 +1,94 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from tabular_data import TabularData, chunked_nanmedian, fill_missing_with_medians, load_table
+
+
+def chunker(X, rows):
+    return lambda: (X[start:start + rows] for start in range(0, len(X), rows))
+
+
+def expected_medians(X):
+    # np.nanmedian warns about the all-NaN column, which chunked_nanmedian leaves as NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmedian(X.astype(np.float64), axis=0)
+
+
+@pytest.fixture(scope="module")
+def table():
+    rng = np.random.default_rng(0)
+    n = 10_001
+    X = np.column_stack([
+        rng.normal(size=n),                        # odd count of values
+        rng.lognormal(sigma=3, size=n),            # heavily skewed
+        rng.integers(0, 3, size=n),                # many duplicates
+        np.full(n, 4.5),                           # constant
+        np.full(n, np.nan),                        # no values at all
+        rng.normal(size=n),                        # even count once a NaN is added below
+    ]).astype(np.float32)
+    X[rng.random(X.shape) < 0.15] = np.nan
+    X[0, 5] = np.nan
+    return X
+
+
+@pytest.mark.parametrize("rows", [1, 333, 100_000])
+def test_matches_nanmedian(table, rows):
+    medians = chunked_nanmedian(chunker(table, rows), table.shape[1])
+    np.testing.assert_array_equal(medians, expected_medians(table))
+
+
+@pytest.mark.parametrize("bins", [1, 2, 4096])
+def test_exact_for_any_bin_count(table, bins):
+    medians = chunked_nanmedian(chunker(table, 1000), table.shape[1], bins=bins)
+    np.testing.assert_array_equal(medians, expected_medians(table))
+
+
+def test_two_values():
+    X = np.array([[1.0], [np.nan], [2.0]], dtype=np.float32)
+    assert chunked_nanmedian(chunker(X, 1), 1)[0] == 1.5
+
+
+def test_fill_missing_with_medians(table):
+    X = table.copy()
+    data = TabularData(X, np.zeros(len(X), dtype=np.int32), [f"f{i}" for i in range(X.shape[1])], ["a"],
+                       {f"f{i}": int(np.isnan(X[:, i]).sum()) for i in range(X.shape[1])})
+    filled = fill_missing_with_medians(data, block_rows=999)
+
+    expected = expected_medians(table)
+    assert filled["f1"] == pytest.approx(expected[1])
+    missing = np.isnan(table[:, :4])
+    fill = np.broadcast_to(expected[:4].astype(np.float32), missing.shape)
+    np.testing.assert_array_equal(X[:, :4][missing], fill[missing])
+    np.testing.assert_array_equal(X[:, :4][~missing], table[:, :4][~missing])
+    assert data.missing_counts["f0"] == 0
+
+
+@pytest.fixture
+def mixed_csv(tmp_path):
+    path = tmp_path / "table.csv"
+    path.write_text(
+        "width,name,day,height,species\n"
+        "1.5,a,2024-01-01,2,setosa\n"
+        ",b,2024-01-02,3,virginica\n"
+        "3.5,c,2024-01-03,4,setosa\n"
+    )
+    return str(path)
+
+
+def test_load_table_skips_non_numeric_columns(mixed_csv):
+    data = load_table(mixed_csv, "species", chunksize=2)
+
+    assert data.feature_names == ["width", "height"]
+    assert data.X.dtype == np.float32
+    np.testing.assert_array_equal(data.X, np.array([[1.5, 2], [np.nan, 3], [3.5, 4]], dtype=np.float32))
+    assert data.missing_counts == {"width": 1, "height": 0}
+    assert list(data.target_names) == ["setosa", "virginica"]
+    np.testing.assert_array_equal(data.y, [0, 1, 0])
+
+
+def test_load_table_names_a_selected_non_numeric_column(mixed_csv):
+    with pytest.raises(ValueError, match="'name'"):
+        load_table(mixed_csv, "species", features=["width", "name"])
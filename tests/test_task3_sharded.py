@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+
+import pytest
+
+import task3_sharded
+from task3_sharded import claim_shard, job_status, reduce_partials, release_claim, renew_claim
+
+SHARD = {"name": "shard-00000"}
+
+
+def make_job(job_dir, shards=2):
+    """A manifest for `shards` shards without any shard files (enough for the claim protocol)"""
+    os.makedirs(job_dir, exist_ok=True)
+    manifest = {
+        "format_version": task3_sharded.FORMAT_VERSION,
+        "total_reviews": 0,
+        "shards": [{"name": task3_sharded._shard_name(i)} for i in range(shards)],
+        "sketch_capacity": 100,
+    }
+    with open(os.path.join(job_dir, task3_sharded.MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def claim_owner(job_dir):
+    with open(task3_sharded._claim_path(str(job_dir), SHARD["name"])) as f:
+        return json.load(f)["worker"]
+
+
+def expire(job_dir, seconds=3600):
+    path = task3_sharded._claim_path(str(job_dir), SHARD["name"])
+    old = os.path.getmtime(path) - seconds
+    os.utime(path, (old, old))
+
+
+def test_live_claim_is_exclusive(tmp_path):
+    assert claim_shard(str(tmp_path), SHARD, "a")
+    assert not claim_shard(str(tmp_path), SHARD, "b")
+    assert claim_owner(tmp_path) == "a"
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    assert claim_shard(str(tmp_path), SHARD, "a", lease_seconds=60)
+    expire(tmp_path)
+
+    assert claim_shard(str(tmp_path), SHARD, "b", lease_seconds=60)
+    assert claim_owner(tmp_path) == "b"
+    assert os.listdir(tmp_path / "claims") == ["shard-00000.claim"]
+
+
+def test_renewed_lease_is_kept(tmp_path):
+    assert claim_shard(str(tmp_path), SHARD, "a", lease_seconds=60)
+    expire(tmp_path)
+    renew_claim(str(tmp_path), SHARD)
+
+    assert not claim_shard(str(tmp_path), SHARD, "b", lease_seconds=60)
+    assert claim_owner(tmp_path) == "a"
+
+
+def test_late_takeover_leaves_the_winners_claim(tmp_path):
+    path = task3_sharded._claim_path(str(tmp_path), SHARD["name"])
+    assert claim_shard(str(tmp_path), SHARD, "a", lease_seconds=60)
+    expire(tmp_path)
+    observed = os.stat(path).st_mtime_ns
+
+    # b takes the expired claim over; c had judged the same claim expired
+    assert claim_shard(str(tmp_path), SHARD, "b", lease_seconds=60)
+    assert not task3_sharded._take_over(path, observed)
+    assert claim_owner(tmp_path) == "b"
+    assert os.listdir(tmp_path / "claims") == ["shard-00000.claim"]
+
+
+def test_racing_claimers_take_an_expired_lease_once(tmp_path):
+    assert claim_shard(str(tmp_path), SHARD, "dead", lease_seconds=60)
+    expire(tmp_path)
+
+    barrier = threading.Barrier(8)
+    won = []
+
+    def claimer(worker_id):
+        barrier.wait()
+        if claim_shard(str(tmp_path), SHARD, worker_id, lease_seconds=60):
+            won.append(worker_id)
+
+    threads = [threading.Thread(target=claimer, args=(f"w{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(won) == 1
+    assert claim_owner(tmp_path) == won[0]
+
+
+def test_release_claim_only_removes_the_owners_claim(tmp_path):
+    assert claim_shard(str(tmp_path), SHARD, "a")
+    assert not release_claim(str(tmp_path), SHARD, "b")
+    assert release_claim(str(tmp_path), SHARD, "a")
+    assert claim_shard(str(tmp_path), SHARD, "b")
+
+
+def test_reduce_refuses_incomplete_jobs(tmp_path):
+    manifest = make_job(str(tmp_path))
+    assert claim_shard(str(tmp_path), manifest["shards"][0], "a")
+
+    assert job_status(str(tmp_path)) == ([], ["shard-00000"], ["shard-00001"])
+    with pytest.raises(RuntimeError, match="2 of 2 shards"):
+        reduce_partials(str(tmp_path))
+
+
+def test_failed_worker_shards_are_retried(tmp_path, monkeypatch):
+    manifest = make_job(str(tmp_path))
+    failures = []
+
+    def flaky_worker(job_dir, worker_id, max_shards=None, lease_seconds=None):
+        for shard in manifest["shards"]:
+            if claim_shard(job_dir, shard, worker_id, lease_seconds):
+                if not failures:
+                    # Crash without releasing the claim, as a killed process would
+                    failures.append(shard["name"])
+                    raise RuntimeError("worker died")
+                os.makedirs(os.path.join(task3_sharded._partial_dir(job_dir, shard["name"])))
+                with open(os.path.join(task3_sharded._partial_dir(job_dir, shard["name"]),
+                                       task3_sharded.PARTIAL_FILE), "w") as f:
+                    f.write("{}")
+
+    monkeypatch.setattr(task3_sharded, "run_worker", flaky_worker)
+    monkeypatch.setattr(task3_sharded, "reduce_partials", lambda job_dir: {"total_reviews": 0})
+
+    task3_sharded.run_local(str(tmp_path), workers=1)
+    assert failures == ["shard-00000"]
+    assert job_status(str(tmp_path)) == (["shard-00000", "shard-00001"], [], [])
+
+
+def test_merged_result_matches_one_pass(tmp_path):
+    pytest.importorskip("numpy")
+    pytest.importorskip("spacy")
+    import task3_nlp_spacy as task3
+
+    reviews = task3.synthetic_reviews(120)
+    job_dir = str(tmp_path / "job")
+    task3_sharded.split_reviews(reviews["review_text"], job_dir, shard_size=25)
+    merged = task3_sharded.run_local(job_dir, workers=1)
+
+    nlp = task3.add_review_signals(task3.load_spacy_model())
+    df = reviews.copy()
+    entities, brands, product_names = task3.process_reviews(nlp, df)
+    single = task3.build_results(df, entities, df["sentiment"].value_counts(), brands, product_names)
+
+    assert merged["total_reviews"] == single["total_reviews"]
+    assert merged["sentiment_distribution"] == single["sentiment_distribution"]
+    assert merged["top_brands"] == single["top_brands"]
+    assert merged["top_products"] == single["top_products"]
+    assert merged["total_entities"] == len(entities)
+    assert merged["sample_analysis"] == single["sample_analysis"]
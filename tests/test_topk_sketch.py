@@ -0,0 +1,77 @@
+import random
+from collections import Counter
+
+import pytest
+
+from topk_sketch import SpaceSaving
+
+
+def zipf_stream(n, vocabulary, seed):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return rng.choices([f"item{i}" for i in range(vocabulary)], weights=weights, k=n)
+
+
+def assert_within_bounds(sketch, truth):
+    for item, count in sketch.counts.items():
+        assert truth[item] <= count <= truth[item] + sketch.error(item)
+        assert count - truth[item] <= sketch.error_bound
+    threshold = sketch.total / sketch.capacity
+    for item, count in truth.items():
+        if count > threshold:
+            assert item in sketch
+
+
+def test_matches_counter_until_full():
+    items = list("abracadabra")
+    sketch = SpaceSaving(capacity=10)
+    sketch.update(items)
+    assert sketch.exact
+    assert sketch.error_bound == 0
+    assert sketch.most_common() == Counter(items).most_common()
+
+
+def test_add_stays_within_error_bound_once_full():
+    stream = zipf_stream(20_000, 500, seed=0)
+    sketch = SpaceSaving(capacity=50)
+    sketch.update(stream)
+    assert not sketch.exact
+    assert sketch.total == len(stream)
+    assert len(sketch) == 50
+    assert_within_bounds(sketch, Counter(stream))
+
+
+def test_merge_stays_within_error_bound():
+    shards = [zipf_stream(5_000, 300, seed=seed) for seed in range(4)]
+    merged = SpaceSaving(capacity=40)
+    for shard in shards:
+        sketch = SpaceSaving(capacity=40)
+        sketch.update(shard)
+        merged.merge(SpaceSaving.from_dict(sketch.to_dict()))
+    assert merged.total == sum(map(len, shards))
+    assert_within_bounds(merged, Counter(item for shard in shards for item in shard))
+
+
+def test_lossy_merge_of_unfilled_sketches_is_not_exact():
+    left, right = SpaceSaving(capacity=3), SpaceSaving(capacity=3)
+    left.update("aaaaab")
+    right.update("cd")
+    assert left.exact and right.exact
+
+    merged = left.merge(right)
+    assert len(merged) == 3
+    assert not merged.exact
+    assert merged.error_bound == pytest.approx(8 / 3)
+    assert_within_bounds(merged, Counter("aaaaabcd"))
+    # The flag survives a shard's JSON round trip and further merges
+    assert not SpaceSaving.from_dict(merged.to_dict()).exact
+    assert not SpaceSaving(capacity=3).merge(merged).exact
+
+
+def test_lossless_merge_stays_exact():
+    left, right = SpaceSaving(capacity=4), SpaceSaving(capacity=4)
+    left.update("aab")
+    right.update("abc")
+    merged = left.merge(right)
+    assert merged.exact
+    assert dict(merged.counts) == {"a": 3, "b": 2, "c": 1}
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.tree import DecisionTreeClassifier
+
+from tree_predictor import FlatTree
+
+
+def fitted_tree(X, y, **params):
+    return DecisionTreeClassifier(random_state=0, **params).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=2000, n_features=8, n_informative=5, n_classes=3, random_state=0)
+    return X, np.array(["setosa", "versicolor", "virginica"])[y]
+
+
+@pytest.mark.parametrize("max_depth", [1, 4, None])
+def test_predictions_match_sklearn(data, max_depth):
+    X, y = data
+    model = fitted_tree(X, y, max_depth=max_depth)
+    flat = FlatTree.from_sklearn(model)
+
+    np.testing.assert_array_equal(flat.apply(X), model.apply(X))
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+    np.testing.assert_array_equal(flat.predict(X[0]), model.predict(X[:1]))
+
+
+def test_small_blocks_match_one_block(data):
+    X, y = data
+    flat = FlatTree.from_sklearn(fitted_tree(X, y))
+    np.testing.assert_array_equal(flat.apply(X, block_rows=7), flat.apply(X))
+
+
+def test_missing_values_follow_sklearn(data):
+    X, y = data
+    rng = np.random.default_rng(0)
+    X = X.copy()
+    X[rng.random(X.shape) < 0.1] = np.nan
+    model = fitted_tree(X, y)
+    flat = FlatTree.from_sklearn(model)
+
+    queries = X.copy()
+    queries[rng.random(queries.shape) < 0.2] = np.nan
+    np.testing.assert_array_equal(flat.predict(queries), model.predict(queries))
+
+
+def test_single_leaf_tree():
+    X = np.arange(20, dtype=np.float64).reshape(10, 2)
+    model = fitted_tree(X, np.full(10, 7))
+    flat = FlatTree.from_sklearn(model)
+
+    assert flat.depth == 0
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+    np.testing.assert_array_equal(flat.predict(np.full((3, 2), np.nan)), [7, 7, 7])
+
+
+def test_save_load_round_trip(data, tmp_path):
+    X, y = data
+    flat = FlatTree.from_sklearn(fitted_tree(X, y, max_depth=6))
+    path = str(tmp_path / "tree.npz")
+    flat.save(path)
+    np.testing.assert_array_equal(FlatTree.load(path).predict(X), flat.predict(X))
+
+
+def test_rejects_wrong_feature_count(data):
+    X, y = data
+    flat = FlatTree.from_sklearn(fitted_tree(X, y, max_depth=2))
+    with pytest.raises(ValueError):
+        flat.predict(X[:, :3])
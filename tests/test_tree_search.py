@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+sklearn = pytest.importorskip("sklearn")
+from sklearn.datasets import load_iris
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, cross_val_score
+from sklearn.tree import DecisionTreeClassifier
+
+from tree_search import PARAM_GRID, search_decision_tree
+
+CV = 5
+RANDOM_STATE = 42
+
+
+@pytest.fixture(scope="module")
+def iris():
+    data = load_iris()
+    return data.data, data.target
+
+
+def folds():
+    return StratifiedKFold(n_splits=CV, shuffle=True, random_state=RANDOM_STATE)
+
+
+def test_unpruned_grid_matches_grid_search_cv(iris, tmp_path, monkeypatch):
+    X, y = iris
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    result = search_decision_tree(X, y, mode="grid", cv=CV, random_state=RANDOM_STATE,
+                                  prune_margin=1.0, max_workers=2)
+
+    reference = GridSearchCV(DecisionTreeClassifier(random_state=RANDOM_STATE), PARAM_GRID, cv=folds()).fit(X, y)
+    expected = {
+        tuple(sorted(params.items(), key=str)): score
+        for params, score in zip(reference.cv_results_["params"], reference.cv_results_["mean_test_score"])
+    }
+
+    assert result["candidates_pruned"] == 0
+    assert len(result["candidates"]) == len(expected)
+    for row in result["candidates"]:
+        assert row["mean_score"] == pytest.approx(expected[tuple(sorted(row["params"].items(), key=str))])
+    assert result["best_score"] == pytest.approx(reference.best_score_)
+    assert expected[tuple(sorted(result["best_params"].items(), key=str))] == pytest.approx(reference.best_score_)
+    # The shared mmap arrays are removed once the pool is done
+    assert os.listdir(tmp_path) == []
+
+
+def test_pruned_search_ranks_fully_evaluated_candidates_first(iris):
+    X, y = iris
+    result = search_decision_tree(X, y, mode="random", n_iter=12, cv=CV, random_state=RANDOM_STATE,
+                                  prune_margin=0.0, max_workers=2)
+
+    completed = [row["pruned_after_fold"] is None for row in result["candidates"]]
+    assert completed == sorted(completed, reverse=True)
+    best = result["candidates"][0]
+    assert best["folds_completed"] == CV
+    scores = cross_val_score(DecisionTreeClassifier(random_state=RANDOM_STATE, **best["params"]), X, y, cv=folds())
+    assert best["mean_score"] == pytest.approx(np.mean(scores))